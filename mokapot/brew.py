@@ -4,7 +4,10 @@ Defines a function to run the Percolator algorithm.
 
 import copy
 import logging
+import tempfile
+from contextlib import nullcontext
 from operator import itemgetter
+from pathlib import Path
 from typing import Generator, Iterable
 
 import numpy as np
@@ -16,6 +19,8 @@ from mokapot import utils
 from mokapot.constants import (
     CHUNK_SIZE_READ_ALL_DATA,
     CHUNK_SIZE_ROWS_PREDICTION,
+    TRAINING_MATRIX_DIR,
+    TRAINING_MEMORY_BUDGET,
 )
 from mokapot.dataset import (
     LinearPsmDataset,
@@ -23,17 +28,21 @@ from mokapot.dataset import (
     calibrate_scores,
     update_labels,
 )
+from mokapot.dataset.training_matrix import TrainingMatrix
+from mokapot.level_scheduler import MemoryBudget
 from mokapot.model import (
     BestFeatureIsBetterError,
+    LinearScorer,
     Model,
     ModelIterationError,
     PercolatorModel,
 )
-from mokapot.parsers.pin import parse_in_chunks
 from mokapot.utils import strictzip
 
 LOGGER = logging.getLogger(__name__)
 
+FOLD_EXECUTORS = ("threads", "processes")
+
 
 # Functions -------------------------------------------------------------------
 @typechecked
@@ -46,6 +55,7 @@ def brew(
     rng=None,
     subset_max_train: int | None = None,
     ensemble: bool = False,
+    fold_executor: str = "threads",
 ) -> tuple[list[Model], list[np.ndarray[np.float64]]]:
     """
     Re-score one or more collection of PSMs.
@@ -91,10 +101,24 @@ def brew(
         will require more memory, but will typically decrease the total
         run time. An integer exceeding the number of folds will have
         no additional effect. Note that logging messages will be garbled
-        if more than one worker is enabled.
+        if more than one worker is enabled. With threads, every fold in
+        training holds a copy of its training set, so folds only run
+        concurrently while their estimated memory fits into
+        ``MOKAPOT_TRAINING_MEMORY_BUDGET`` (default: 4 GB).
     rng : int, np.random.Generator, optional
         A seed or generator used to generate splits, or None to use the
         default random number generator state.
+    subset_max_train : int, optional
+        The maximum number of PSMs used for training each fold.
+    ensemble : bool, optional
+        Whether to score all PSMs with the average of the models of all
+        folds instead of the model of their own fold.
+    fold_executor : {"threads", "processes"}, optional
+        Whether the folds are trained in threads or in worker processes.
+        Processes are not limited by the GIL; the training PSMs are then
+        shared with the workers through a memory mapped file (placed in
+        ``MOKAPOT_TRAINING_MATRIX_DIR`` if set) and only the fitted models
+        are sent back. Both give identical results.
 
     Returns
     -------
@@ -104,6 +128,12 @@ def brew(
     scores : list[np.array[float]]
         The scores
     """
+    if fold_executor not in FOLD_EXECUTORS:
+        raise ValueError(
+            f"Unknown fold executor '{fold_executor}', "
+            f"must be one of {FOLD_EXECUTORS}."
+        )
+
     rng = np.random.default_rng(rng)
     if model is None:
         model = PercolatorModel()
@@ -143,6 +173,8 @@ def brew(
         )
     LOGGER.info("Splitting PSMs into %i folds...", folds)
     test_folds_idx = [dataset._split(folds, rng) for dataset in datasets]
+    fold_ids = make_fold_ids(test_folds_idx, data_size)
+    del test_folds_idx
 
     # If trained models are provided, use them as-is.
     # If the model is not iterable, it means that a single model is pased, thus
@@ -171,23 +203,34 @@ def brew(
     else:
         train_sets = list(
             make_train_sets(
-                test_idx=test_folds_idx,
+                fold_ids=fold_ids,
+                folds=folds,
                 subset_max_train=subset_max_train,
-                data_size=data_size,
                 rng=rng,
             )
         )
-        train_psms = parse_in_chunks(
+        # The training PSMs of all folds are read in a single pass and
+        # stored only once, each fold selects its rows when it is trained
+        memmap_dir = Path(TRAINING_MATRIX_DIR) if TRAINING_MATRIX_DIR else None
+        tmp_dir = None
+        if fold_executor == "processes" and memmap_dir is None:
+            tmp_dir = tempfile.TemporaryDirectory()
+            memmap_dir = Path(tmp_dir.name)
+        train_matrix = TrainingMatrix.from_datasets(
             datasets=datasets,
             train_idx=train_sets,
             chunk_size=CHUNK_SIZE_READ_ALL_DATA,
-            max_workers=max_workers,
+            memmap_dir=memmap_dir,
         )
         del train_sets
-        fitted = Parallel(n_jobs=max_workers, require="sharedmem")(
-            delayed(_fit_model)(d, datasets, copy.deepcopy(model), f)
-            for f, d in enumerate(train_psms)
-        )
+        try:
+            fitted = _fit_folds(
+                train_matrix, model, folds, max_workers, fold_executor
+            )
+        finally:
+            train_matrix.close()
+            if tmp_dir is not None:
+                tmp_dir.cleanup()
 
     # Sort models to have deterministic results with multithreading.
     fitted.sort(key=lambda x: x[0].fold)
@@ -222,23 +265,8 @@ def brew(
                 for dataset in datasets
             ]
         else:
-            # generate model index for each psm in all folds
-            model_to_psm_idx = [
-                [[i] * len(idx) for i, idx in enumerate(test_fold_idx)]
-                for test_fold_idx in test_folds_idx
-            ]
-            # sort test indices and model indices in the original order
-            # (order of input data)
-            original_order_idx = [
-                np.argsort(utils.flatten(test_fold_idx)).tolist()
-                for test_fold_idx in test_folds_idx
-            ]
-            del test_folds_idx
-            model_to_psm_idx = [
-                np.concatenate(model_idx)[idx]
-                for model_idx, idx in zip(model_to_psm_idx, original_order_idx)
-            ]
-            del original_order_idx
+            # The model index for each psm is the fold it is tested in
+            model_to_psm_idx = fold_ids
             scores = list(
                 _predict(
                     models_idx=model_to_psm_idx,
@@ -327,46 +355,72 @@ def brew(
 
 
 # Utility Functions -----------------------------------------------------------
-def make_train_sets(
-    test_idx, subset_max_train, data_size, rng
-) -> Generator[list[list[int]], None, None]:
+def make_fold_ids(
+    test_idx: list, data_size: list[int]
+) -> list[np.ndarray[np.int8]]:
     """
     Parameters
     ----------
     test_idx : list of list of numpy.ndarray
-        The indicies of the test sets
-    subset_max_train : int or None
-        The number of PSMs for training.
+        The indicies of the test sets, for each dataset and each fold.
     data_size : list[int]
         size of the input data
 
+    Returns
+    -------
+    list of numpy.ndarray
+        For each dataset, the fold in which each PSM is part of the test
+        set (-1 for PSMs that are not in any test set).
+    """
+    fold_ids = []
+    for fold_idx, ds in zip(test_idx, data_size):
+        if len(fold_idx) > np.iinfo(np.int8).max:
+            raise ValueError(
+                f"At most {np.iinfo(np.int8).max} folds are supported."
+            )
+        ids = np.full(ds, -1, dtype=np.int8)
+        for fold, idx in enumerate(fold_idx):
+            ids[np.asarray(idx, dtype=np.int64)] = fold
+        fold_ids.append(ids)
+    return fold_ids
+
+
+def make_train_sets(
+    fold_ids: list[np.ndarray[np.int8]],
+    folds: int,
+    subset_max_train: int | None,
+    rng: np.random.Generator,
+) -> Generator[list[np.ndarray[int]], None, None]:
+    """
+    Parameters
+    ----------
+    fold_ids : list of numpy.ndarray
+        The fold in which each PSM is part of the test set, for each
+        dataset (see `make_fold_ids`).
+    folds : int
+        The number of folds.
+    subset_max_train : int or None
+        The number of PSMs for training.
+    rng : numpy.random.Generator
+        The random number generator used for subsetting.
+
     Yields
     ------
-    list of list of int
-        The training set. Each element is a list of ints.
+    list of numpy.ndarray
+        The training set. Each element contains the indices of the training
+        PSMs of one dataset.
     """
     subset_max_train_per_file = []
     if subset_max_train is not None:
         subset_max_train_per_file = [
-            subset_max_train // len(data_size) for _ in range(len(data_size))
+            subset_max_train // len(fold_ids) for _ in range(len(fold_ids))
         ]
         subset_max_train_per_file[-1] += subset_max_train - sum(
             subset_max_train_per_file
         )
-    chunk_range = 5000000
-    for fold_idx in zip(*test_idx):
-        train_idx = [[] for _ in data_size]
-        train_idx_size = 0
-        for file_idx, idx in enumerate(fold_idx):
-            ds = data_size[file_idx]
-            k = 0
-            while k + chunk_range < ds:
-                train_idx[file_idx] += list(
-                    set(range(k, k + chunk_range)) - set(idx)
-                )
-                k += chunk_range
-            train_idx[file_idx] += list(set(range(k, ds)) - set(idx))
-            train_idx_size += len(train_idx[file_idx])
+    for fold in range(folds):
+        train_idx = [np.flatnonzero(ids != fold) for ids in fold_ids]
+        train_idx_size = sum(len(idx) for idx in train_idx)
         if len(subset_max_train_per_file) > 0 and train_idx_size > sum(
             subset_max_train_per_file
         ):
@@ -380,8 +434,10 @@ def make_train_sets(
             ):
                 if current_subset_max_train < train_idx_size:
                     train_idx[i] = rng.choice(
-                        train_idx[i], current_subset_max_train, replace=False
-                    ).tolist()
+                        train_idx[i],
+                        min(current_subset_max_train, len(train_idx[i])),
+                        replace=False,
+                    )
         yield train_idx
 
 
@@ -400,20 +456,14 @@ def _create_linear_dataset(
     )
 
 
-def get_index_values(df, col_name, val, orig_idx):
-    df = df[df[col_name] == val].drop(col_name, axis=1)
-    orig_idx[val] += list(df.index)
-    return df
-
-
 @typechecked
 def predict_fold(
     model: Model,
-    fold: int,
     dataset: LinearPsmDataset,
-    scores: list,
+    scores: np.ndarray,
+    rows: np.ndarray,
 ):
-    scores[fold].append(model.predict(dataset))
+    scores[rows] = model.predict(dataset)
 
 
 @typechecked
@@ -427,88 +477,87 @@ def _predict(
     """
     Return the new scores for the dataset
 
+    Every PSM is scored by the model of the fold in which it is part of the
+    test set. The datasets are read in a single pass and the scores of each
+    chunk are written straight into the output array at the chunk's rows,
+    so the order of the PSMs is kept without any reordering.
+
     Parameters
     ----------
     datasets : Dict
         Contains all required info about the dataset to rescore
     models_idx : list of numpy.ndarray
-        The indicies of the models to predict with
+        For each dataset, the index of the model to predict each PSM with
+        (see `make_fold_ids`).
     models : list of Model
         The models for each dataset and whether it
         was reset or not.
     test_fdr : the fdr to calibrate at.
     max_workers : maximum threads for parallelism
 
-    Returns
-    -------
+    Yields
+    ------
     numpy.ndarray
-        A :py:class:`numpy.ndarray` containing the new scores.
+        A :py:class:`numpy.ndarray` containing the new scores, for each
+        dataset.
     """
+    models = list(models)
+    # Linear models score all folds with a single product per chunk
+    scorer = LinearScorer.from_models(models)
     for dataset, mod_idx in zip(datasets, models_idx):
-        scores = []
-
-        n_folds = len(models)
-        fold_scores = [[] for _ in range(n_folds)]
-        targets = [[] for _ in range(n_folds)]
-        orig_idx = [[] for _ in range(n_folds)]
+        scores = np.empty(len(mod_idx), dtype=np.float64)
+        columns = dataset.columns if scorer is None else scorer.features
         file_iterator = dataset.read_data_chunked(
-            columns=dataset.columns,
+            columns=columns,
             chunk_size=CHUNK_SIZE_ROWS_PREDICTION,
         )
-        model_test_idx = utils.create_chunks(
-            data=mod_idx, chunk_size=CHUNK_SIZE_ROWS_PREDICTION
-        )
-        for i, psms_chunk in enumerate(file_iterator):
-            psms_chunk["fold"] = model_test_idx.pop(0)
-            psms_slices = [
-                get_index_values(psms_chunk, "fold", i, orig_idx)
-                for i in range(n_folds)
-            ]
-            dataset_slices = [
-                _create_linear_dataset(
-                    dataset,
-                    psm_slice,
-                    enforce_checks=False,
-                )
-                for psm_slice in psms_slices
-            ]
-            for i, dataset_slice in enumerate(dataset_slices):
-                targets[i].append(dataset_slice.targets)
-
-            Parallel(n_jobs=max_workers, require="sharedmem")(
-                delayed(predict_fold)(
-                    model=models[mod_idx],
-                    fold=mod_idx,
-                    dataset=dataset_slice,
-                    scores=fold_scores,
+        start = 0
+        for psms_chunk in file_iterator:
+            end = start + len(psms_chunk)
+            chunk_folds = mod_idx[start:end]
+            chunk_scores = scores[start:end]
+            if scorer is not None:
+                chunk_scores[:] = np.take_along_axis(
+                    scorer.score(psms_chunk),
+                    chunk_folds[:, np.newaxis].astype(np.intp),
+                    axis=1,
+                )[:, 0]
+            else:
+                fold_rows = [
+                    np.flatnonzero(chunk_folds == fold)
+                    for fold in range(len(models))
+                ]
+                Parallel(n_jobs=max_workers, require="sharedmem")(
+                    delayed(predict_fold)(
+                        model=model,
+                        dataset=_create_linear_dataset(
+                            dataset,
+                            psms_chunk.iloc[rows].copy(),
+                            enforce_checks=False,
+                        ),
+                        scores=chunk_scores,
+                        rows=rows,
+                    )
+                    for model, rows in zip(models, fold_rows)
                 )
-                for mod_idx, dataset_slice in enumerate(dataset_slices)
-            )
-            del psms_slices, dataset_slices
+            start = end
         del file_iterator
-        del model_test_idx
-        # What is this iteration doing?
-        for mod in models:
+
+        # The scores of each fold are calibrated separately
+        targets = np.asarray(dataset.target_values, dtype=bool)
+        for fold in range(len(models)):
+            in_fold = mod_idx == fold
             try:
-                scores.append(
-                    calibrate_scores(
-                        np.hstack(fold_scores.pop(0)),
-                        np.hstack(targets.pop(0)),
-                        test_fdr,
-                    )
+                scores[in_fold] = calibrate_scores(
+                    scores[in_fold], targets[in_fold], test_fdr
                 )
-            except AttributeError:
-                scores.append(np.hstack(fold_scores.pop(0)))
             except RuntimeError:
                 raise RuntimeError(
                     "Failed to calibrate scores between cross-validation "
                     "folds, because no target PSMs could be found below "
                     "'test_fdr'. Try raising 'test_fdr'."
                 )
-        del targets
-        del fold_scores
-        orig_idx = np.argsort(sum(orig_idx, [])).tolist()
-        yield np.concatenate(scores)[orig_idx]
+        yield scores
 
 
 @typechecked
@@ -529,6 +578,15 @@ def _predict_with_ensemble(
         The models for each dataset and whether it
         was reset or not.
     """
+    scorer = LinearScorer.from_models(list(models))
+    if scorer is not None:
+        # Linear models score all PSMs of a chunk with a single product
+        file_iterator = dataset.read_data_chunked(
+            columns=scorer.features, chunk_size=CHUNK_SIZE_ROWS_PREDICTION
+        )
+        scores = [scorer.score(chunk).mean(axis=1) for chunk in file_iterator]
+        return np.concatenate(scores)
+
     scores = [[] for _ in range(len(models))]
     file_iterator = dataset.read_data_chunked(
         columns=dataset.columns, chunk_size=CHUNK_SIZE_ROWS_PREDICTION
@@ -546,18 +604,81 @@ def _predict_with_ensemble(
     return np.mean(scores, axis=0)
 
 
-def _fit_model(train_set, psms, model: Model, fold):
+def _fit_folds(
+    train_matrix: TrainingMatrix,
+    model: Model,
+    folds: int,
+    max_workers: int,
+    fold_executor: str,
+) -> list[tuple[Model, bool]]:
+    """
+    Fit a copy of the model for each fold.
+
+    Parameters
+    ----------
+    train_matrix : TrainingMatrix
+        The training PSMs of all folds.
+    model : a mokapot.model.Model
+        The model to train a copy of on each fold.
+    folds : int
+        The number of folds.
+    max_workers : int
+        The number of folds to train concurrently.
+    fold_executor : {"threads", "processes"}
+        Whether to train in threads or in worker processes. For processes
+        the feature matrix of `train_matrix` must be memory mapped, so that
+        the workers can open it instead of receiving a pickled copy.
+
+    Returns
+    -------
+    list of tuple of (Model, bool)
+        The results of `_fit_model` for each fold.
+    """
+    memory_budget = None
+    if fold_executor == "processes":
+        if train_matrix.memmap_path is None:
+            raise ValueError(
+                "Training in processes requires a memory mapped matrix."
+            )
+        parallel = Parallel(n_jobs=max_workers, backend="loky")
+    else:
+        parallel = Parallel(n_jobs=max_workers, require="sharedmem")
+        if max_workers > 1:
+            # Every fold trained in a thread materializes its training set,
+            # so only as many folds as fit into the budget run at once
+            memory_budget = MemoryBudget(TRAINING_MEMORY_BUDGET)
+
+    # The models are copied here, in the parent, so the state of their
+    # random number generators does not depend on the executor.
+    return parallel(
+        delayed(_fit_model)(
+            train_matrix, copy.deepcopy(model), f, memory_budget
+        )
+        for f in range(folds)
+    )
+
+
+def _fit_model(
+    train_matrix: TrainingMatrix,
+    model: Model,
+    fold,
+    memory_budget: MemoryBudget | None = None,
+):
     """
     Fit the estimator using the training data.
 
     Parameters
     ----------
-    train_set : PsmDataset
-        A PsmDataset that specifies the training data
+    train_matrix : TrainingMatrix
+        The training PSMs of all folds.
     model : a mokapot.model.Model
         A Classifier to train.
     fold : int
-        The fold number. Only used for logging.
+        The fold number, selects the training PSMs from `train_matrix`.
+    memory_budget : MemoryBudget, optional
+        If given, the estimated memory needed to train the fold is reserved
+        before its training set is materialized, and released after it has
+        been freed again.
 
     Returns
     -------
@@ -569,8 +690,18 @@ def _fit_model(train_set, psms, model: Model, fold):
     model.fold = fold + 1
     LOGGER.debug("")
     LOGGER.debug("=== Analyzing Fold %i ===", fold + 1)
+    reservation = (
+        memory_budget.reserve(train_matrix.fold_memory(fold))
+        if memory_budget is not None
+        else nullcontext()
+    )
+    with reservation:
+        return _fit_fold_dataset(train_matrix.fold_dataset(fold), model, fold)
+
+
+def _fit_fold_dataset(train_set: LinearPsmDataset, model: Model, fold):
+    """Fit the model on the training set of a fold (see `_fit_model`)."""
     reset = False
-    train_set = _create_linear_dataset(psms[0], train_set)
     try:
         model.fit(train_set)
     except BestFeatureIsBetterError as msg:
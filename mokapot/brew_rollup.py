@@ -104,10 +104,24 @@ def add_confidence_options(parser: ArgumentGroup) -> None:
     parser.add_argument(
         "--peps_algorithm",
         default="qvality",
-        choices=["qvality", "qvality_bin", "kde_nnls", "hist_nnls"],
+        choices=[
+            "qvality",
+            "qvality_bin",
+            "qvality_sampled",
+            "kde_nnls",
+            "hist_nnls",
+        ],
         help=(
             "Specify the algorithm for pep computation. 'qvality_bin' works "
-            "only if the qvality binary is on the search path"
+            "only if the qvality binary is on the search path. "
+            "'qvality_sampled' runs qvality on a stratified sample of the "
+            "scores (50000 by default, set with the "
+            "MOKAPOT_QVALITY_SAMPLE_SIZE environment variable), which "
+            "bounds memory for large datasets but is only modestly faster; "
+            "the default keeps PEPs within about 0.01 of 'qvality', and "
+            "smaller samples trade accuracy for little speed. With "
+            "streaming, only 'qvality_sampled', 'kde_nnls' and 'hist_nnls' "
+            "can be used."
         ),
     )
     parser.add_argument(
@@ -128,6 +142,16 @@ def add_confidence_options(parser: ArgumentGroup) -> None:
 
 
 def add_misc_options(parser: ArgumentGroup) -> None:
+    parser.add_argument(
+        "--max_workers",
+        default=1,
+        type=int,
+        help=(
+            "The number of rollup levels for which the confidence estimates "
+            "are computed concurrently. Levels whose PEPs are computed with "
+            "the Python qvality are processed one at a time."
+        ),
+    )
     parser.add_argument(
         "--seed",
         type=int,
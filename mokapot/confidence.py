@@ -24,9 +24,14 @@ rather than initializing the classes below directly.
 
 from __future__ import annotations
 
+import copy
 import logging
+import multiprocessing
+import shutil
+import tempfile
 from collections import defaultdict
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import partial
 from pathlib import Path
 from pprint import pformat
 from typing import Iterator, Sequence
@@ -37,30 +42,38 @@ from joblib import Parallel, delayed
 from typeguard import typechecked
 
 from mokapot.column_defs import STANDARD_COLUMN_NAME_MAP
-from mokapot.constants import CONFIDENCE_CHUNK_SIZE
+from mokapot.constants import CONFIDENCE_CHUNK_SIZE, MAX_CONCURRENT_SORTS
 from mokapot.dataset import PsmDataset
+from mokapot.level_scheduler import run_level_tasks
 from mokapot.peps import (
-    PepsConvergenceError,
     TDHistData,
     peps_from_scores,
+    peps_func_from_hist_kde_nnls,
     peps_func_from_hist_nnls,
+    peps_func_from_hist_qvality,
 )
 from mokapot.picked_protein import picked_protein
 from mokapot.proteins import Proteins
-from mokapot.qvalues import qvalues_from_scores, qvalues_func_from_hist
-from mokapot.statistics import HistData, OnlineStatistics
+from mokapot.qvalues import (
+    StreamingTdc,
+    qvalues_from_scores,
+    qvalues_func_from_hist,
+)
+from mokapot.statistics import HistData, OnlineStatistics, TDQuantileSketch
 from mokapot.tabular_data import (
     BufferType,
     ColumnMappedReader,
     ComputedTabularDataReader,
     ConfidenceSqliteWriter,
-    MergedTabularDataReader,
     TabularDataReader,
     TabularDataWriter,
 )
+from mokapot.tabular_data.external_sort import ExternalSorter
 from mokapot.tabular_data.streaming import JoinedTabularDataReader
 from mokapot.tabular_data.target_decoy_writer import TargetDecoyWriter
 from mokapot.utils import (
+    SeenHashes,
+    hash_rows,
     make_bool_trarget,
     strictzip,
 )
@@ -117,6 +130,11 @@ class Confidence:
         Whether to stream confidence calculations, by default False
     score_stats : OnlineStatistics, optional
         Pre-computed score statistics if streaming
+    score_sketches : dict[str, TDQuantileSketch], optional
+        Pre-computed quantile sketches of the target and decoy scores per
+        level, used to place the histogram bins if streaming
+    max_workers : int, optional
+        The number of levels processed concurrently, by default 1
     """
 
     def __init__(
@@ -137,6 +155,8 @@ class Confidence:
         qvalue_algorithm: str = "tdc",
         stream_confidence: bool = False,
         score_stats: OnlineStatistics | None = None,
+        score_sketches: dict[str, TDQuantileSketch] | None = None,
+        max_workers: int = 1,
     ):
         # As far as I can tell, the dataset is only used to export to flashlfq
         self.dataset = dataset
@@ -154,6 +174,7 @@ class Confidence:
         self.peps_error = peps_error
         self.rng = rng
         self.score_stats = score_stats
+        self.score_sketches = score_sketches or {}
 
         if proteins:
             self._write_protein_level_data(level_paths, proteins, rng)
@@ -168,7 +189,9 @@ class Confidence:
             qvalue_algorithm=qvalue_algorithm,
             stream_confidence=stream_confidence,
             score_stats=score_stats,
+            score_sketches=self.score_sketches,
             eval_fdr=eval_fdr,
+            max_workers=max_workers,
         )
 
     def __repr__(self) -> str:
@@ -200,7 +223,9 @@ class Confidence:
         qvalue_algorithm: str = "tdc",
         stream_confidence: bool = False,
         score_stats: OnlineStatistics | None = None,
+        score_sketches: dict[str, TDQuantileSketch] | None = None,
         eval_fdr: float = 0.01,
+        max_workers: int = 1,
     ):
         """Assign confidence estimates to PSMs and peptides.
 
@@ -236,16 +261,25 @@ class Confidence:
         score_stats : OnlineStatistics | None, optional
             Pre-computed score statistics if streaming is enabled
             by default None.
+        score_sketches : dict[str, TDQuantileSketch] | None, optional
+            Pre-computed quantile sketches of the scores per level. If
+            streaming is enabled, the histogram bins of a level with a
+            sketch adapt to its score distribution, by default None.
         eval_fdr : float, optional
             FDR threshold for evaluation metrics, by default 0.01.
+        max_workers : int, optional
+            The number of levels processed concurrently, by default 1. The
+            levels share the memory budget `CONFIDENCE_MEMORY_BUDGET`. With
+            the Python qvality PEPs, the levels are processed one at a time.
         """
+        score_sketches = score_sketches or {}
         if stream_confidence:
             if score_stats is None:
                 raise ValueError(
                     "score stats must be provided for streamed confidence"
                 )
 
-        for level in levels:
+        def assign_level(level):
             level_path = level_path_map[level]
             out_writers = out_writers_map[level]
 
@@ -271,6 +305,7 @@ class Confidence:
                 peps_error,
                 level,
                 eval_fdr,
+                score_sketch=score_sketches.get(level),
             )
             # todo: discuss: This should probably not be done here, but rather
             #  in the calling code, that intializes the writers
@@ -279,6 +314,25 @@ class Confidence:
 
             level_path.unlink(missing_ok=True)
 
+        # Sqlite connections can only be used by the thread that created them
+        if any(
+            isinstance(writer, ConfidenceSqliteWriter)
+            for writers in out_writers_map.values()
+            for writer in writers
+        ):
+            max_workers = 1
+
+        run_level_tasks(
+            {level: partial(assign_level, level) for level in levels},
+            max_workers=level_max_workers(max_workers, peps_algorithm),
+            memory_estimates={
+                level: estimate_level_memory(
+                    level_path_map[level], stream_confidence
+                )
+                for level in levels
+            },
+        )
+
     def _write_protein_level_data(
         self,
         level_paths: dict[str, Path],
@@ -381,6 +435,7 @@ def assign_confidence(
     qvalue_algorithm="tdc",
     sqlite_path: Path | None = None,
     stream_confidence: bool = False,
+    dataset_workers: int = 1,
 ):
     """Assign confidence to PSMs, peptides, and optionally proteins.
 
@@ -419,16 +474,26 @@ def assign_confidence(
         Random number generator or seed for reproducibility, by default 0.
     peps_error : bool, optional
         Whether to raise error on PEP calculation failure, by default False.
-    peps_algorithm : {'qvality', 'qvality_bin', 'kde_nnls', 'hist_nnls'}
+    peps_algorithm : {'qvality', 'qvality_bin', 'qvality_sampled', 'kde_nnls',
+                      'hist_nnls'}
         Algorithm for posterior error probability calculation
-        by default "qvality".
-    qvalue_algorithm : {'tdc', 'hist'}, optional
-        Algorithm for q-value calculation, by default "tdc".
+        by default "qvality". With streaming, only 'qvality_sampled',
+        'kde_nnls' and 'hist_nnls' are supported.
+    qvalue_algorithm : {'tdc', 'from_peps', 'from_counts'}, optional
+        Algorithm for q-value calculation, by default "tdc". With streaming,
+        'tdc' gives the exact TDC q-values, while the others are estimated
+        from score histograms.
     sqlite_path : Path | None, optional
         Path to the SQLite database to write mokapot results, by default None.
     stream_confidence : bool, optional
         Whether to stream confidence calculations for large datasets
         by default False.
+    dataset_workers : int, optional
+        The number of datasets processed concurrently in worker processes,
+        by default 1. Only datasets with distinct, non-empty prefixes that
+        are not written to a sqlite database can be processed concurrently.
+        Each worker uses up to `max_workers` threads itself, and the memory
+        budgets apply to each worker separately.
 
     Returns
     -------
@@ -492,7 +557,11 @@ def assign_confidence(
         LOGGER.info("No scores passed, attempting to find them.")
         if any(dataset.scores is None for dataset in datasets):
             LOGGER.info("No scores found, attempting to find best feature.")
-            feature = datasets[0].find_best_feature(eval_fdr).feature
+            feature = (
+                datasets[0]
+                .find_best_feature(eval_fdr, max_workers=max_workers)
+                .feature
+            )
             LOGGER.info("Best feature found: %s", feature)
             scores_use = [
                 dataset.read_data(columns=[feature.name])[
@@ -505,18 +574,216 @@ def assign_confidence(
             LOGGER.info("Scores found in psms, using them.")
             scores_use = [dataset.scores for dataset in datasets]
 
-    out = []
+    confidence_options = dict(
+        eval_fdr=eval_fdr,
+        write_decoys=write_decoys,
+        do_rollup=do_rollup,
+        proteins=proteins,
+        rng=rng,
+        peps_error=peps_error,
+        peps_algorithm=peps_algorithm,
+        qvalue_algorithm=qvalue_algorithm,
+        stream_confidence=stream_confidence,
+        max_workers=max_workers,
+    )
+    dataset_options = dict(
+        level_manager=level_manager,
+        output_writers_factory=output_writers_factory,
+        level_input_output_column_mapping=level_input_output_column_mapping,
+        deduplication=deduplication,
+        confidence_options=confidence_options,
+    )
+
+    if dataset_workers > 1 and len(datasets) > 1:
+        if sqlite_path is not None:
+            LOGGER.info(
+                "Processing the datasets one after another, since the "
+                "results are written to a single sqlite database."
+            )
+            dataset_workers = 1
+        elif not all(prefixes) or len(set(prefixes)) < len(prefixes):
+            LOGGER.info(
+                "Processing the datasets one after another, since their "
+                "results are written to the same files."
+            )
+            dataset_workers = 1
+
+    if dataset_workers > 1 and len(datasets) > 1:
+        return _assign_confidence_in_workers(
+            datasets,
+            scores_use,
+            prefixes,
+            dataset_workers=dataset_workers,
+            **dataset_options,
+        )
 
+    out = []
     for dataset, score, prefix in strictzip(datasets, scores_use, prefixes):
-        # todo: nice to have: move this column renaming stuff into the
-        #   column defs module, and further, have standardized columns
-        #   directly from the pin reader (applying the renaming itself)
+        con = _assign_dataset_confidence(
+            dataset, score, prefix, **dataset_options
+        )
+        out.append(con)
+        if not prefix:
+            # Having None as a prefix means that all outputs will be
+            # written to a single file, thus after the first iteration
+            # we stop initializing the writers (bc that generates over-writing
+            # the files instead of appending to them).
+            output_writers_factory.append_to_output_file = True
+
+    return out
 
-        output_writers, file_prefix = output_writers_factory.build_writers(
-            level_manager,
-            prefix=prefix,
+
+def _assign_confidence_in_workers(
+    datasets: list[PsmDataset],
+    scores_list: list[np.ndarray[float]],
+    prefixes: list[str | None],
+    *,
+    dataset_workers: int,
+    **dataset_options,
+) -> list[Confidence]:
+    """Assign confidence to independent datasets in worker processes.
+
+    Every worker sorts its dataset and writes its level files in a temporary
+    directory of its own. At most `MAX_CONCURRENT_SORTS` datasets are sorted
+    at the same time, so the workers do not compete too much for the disk.
+    The log records of each worker are emitted by the parent process as soon
+    as its dataset and all previous ones are done. The memory budgets (e.g.
+    `CONFIDENCE_MEMORY_BUDGET`) apply to each worker separately.
+    """
+    num_workers = min(dataset_workers, len(datasets))
+    LOGGER.info(
+        "Assigning confidence to %i datasets in %i worker processes...",
+        len(datasets),
+        num_workers,
+    )
+    log_level = logging.getLogger("mokapot").getEffectiveLevel()
+    with multiprocessing.Manager() as manager:
+        sort_slots = manager.Semaphore(MAX_CONCURRENT_SORTS)
+        results = Parallel(
+            n_jobs=num_workers, backend="loky", return_as="generator"
+        )(
+            delayed(_assign_dataset_confidence_in_worker)(
+                dataset,
+                score,
+                prefix,
+                log_level=log_level,
+                use_temp_dir=True,
+                sort_slots=sort_slots,
+                **dataset_options,
+            )
+            for dataset, score, prefix in strictzip(
+                datasets, scores_list, prefixes
+            )
         )
 
+        out = []
+        for dataset, (con, records) in strictzip(datasets, results):
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            # The worker returns the confidence without its (copied) dataset
+            con.dataset = dataset
+            out.append(con)
+    return out
+
+
+def _assign_dataset_confidence_in_worker(
+    *args, log_level: int, **kwargs
+) -> tuple[Confidence, list[logging.LogRecord]]:
+    """Run `_assign_dataset_confidence` and collect its log records."""
+    records = []
+    handler = _RecordCollector(records)
+    logger = logging.getLogger("mokapot")
+    old_level, old_propagate = logger.level, logger.propagate
+    logger.setLevel(log_level)
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        con = _assign_dataset_confidence(*args, **kwargs)
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(old_level)
+        logger.propagate = old_propagate
+    # The caller has the dataset already, so it is not sent back
+    con.dataset = None
+    return con, records
+
+
+class _RecordCollector(logging.Handler):
+    """Collect log records, such that they can be sent to another process."""
+
+    def __init__(self, records: list[logging.LogRecord]):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record: logging.LogRecord):
+        # The arguments and tracebacks may not be picklable
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        self.records.append(record)
+
+
+def _assign_dataset_confidence(
+    dataset: PsmDataset,
+    score: np.ndarray[float],
+    prefix: str | None,
+    *,
+    level_manager: LevelManager,
+    output_writers_factory: OutputWriterFactory,
+    level_input_output_column_mapping: dict[str, str],
+    deduplication: bool,
+    confidence_options: dict,
+    use_temp_dir: bool = False,
+    sort_slots=None,
+) -> Confidence:
+    """Assign confidence to the PSMs of a single dataset.
+
+    Parameters
+    ----------
+    dataset : PsmDataset
+        The PSMs.
+    score : numpy.ndarray[float]
+        The scores of the PSMs.
+    prefix : str | None
+        The prefix of the output files of the dataset.
+    level_manager : LevelManager
+        The levels and the paths of their intermediate files.
+    output_writers_factory : OutputWriterFactory
+        Creates the output writers of the dataset.
+    level_input_output_column_mapping : dict[str, str]
+        The columns written to the level files.
+    deduplication : bool
+        Whether to keep only the best PSM per spectrum.
+    confidence_options : dict
+        Further keyword arguments for `Confidence`.
+    use_temp_dir : bool, optional
+        Whether to write the sort runs and level files to a temporary
+        directory of their own, which is deleted afterwards, so that other
+        datasets can be processed at the same time.
+    sort_slots : Semaphore, optional
+        A semaphore that is held while the dataset is sorted.
+    """
+    dest_dir = level_manager.dest_dir
+    temp_dir = None
+    if use_temp_dir:
+        temp_dir = Path(tempfile.mkdtemp(dir=dest_dir, prefix="mokapot_"))
+        level_manager = copy.copy(level_manager)
+        level_manager.level_data_paths = {
+            level: temp_dir / path.name
+            for level, path in level_manager.level_data_paths.items()
+        }
+        dest_dir = temp_dir
+
+    output_writers, file_prefix = output_writers_factory.build_writers(
+        level_manager,
+        prefix=prefix,
+    )
+
+    try:
         # This section basically create a temporaty file for each level.
         # This file preserves only the best PSM for each of the levels.
         # For instance in the peptide level, it preserves as the peptide's
@@ -526,20 +793,25 @@ def assign_confidence(
         # Also note that there is not protein level at this point. that one
         # is created later in the confidence assignment.
         score_reader = TabularDataReader.from_array(score, "mokapot_score")
-        with create_sorted_file_reader(
-            dataset=dataset,
-            score_reader=score_reader,
-            dest_dir=dest_dir,
-            file_prefix=file_prefix,
-            deduplication_columns=(
-                level_manager.level_hash_columns["psms"]
-                if deduplication
-                else None
-            ),
-            max_workers=max_workers,
-            input_output_column_mapping=level_input_output_column_mapping,
-            score_column=STANDARD_COLUMN_NAME_MAP["score"],
-        ) as sorted_file_reader:
+        slot = sort_slots if sort_slots is not None else nullcontext()
+        with ExitStack() as stack:
+            stack.enter_context(slot)
+            sorted_file_reader = stack.enter_context(
+                create_sorted_file_reader(
+                    dataset=dataset,
+                    score_reader=score_reader,
+                    dest_dir=dest_dir,
+                    file_prefix=file_prefix,
+                    deduplication_columns=(
+                        level_manager.level_hash_columns["psms"]
+                        if deduplication
+                        else None
+                    ),
+                    max_workers=confidence_options["max_workers"],
+                    input_output_column_mapping=level_input_output_column_mapping,
+                    score_column=STANDARD_COLUMN_NAME_MAP["score"],
+                )
+            )
             LOGGER.info("Assigning confidence...")
             LOGGER.info("Performing target-decoy competition...")
             LOGGER.info(
@@ -548,8 +820,10 @@ def assign_confidence(
             )
 
             # The columns we get from the sorted file iterator
-            sorted_file_iterator = sorted_file_reader.get_row_iterator(
-                row_type=BufferType.Dicts
+            sorted_file_iterator = (
+                sorted_file_reader.get_chunked_data_iterator(
+                    chunk_size=CONFIDENCE_CHUNK_SIZE
+                )
             )
             type_map = sorted_file_reader.get_schema(as_dict=True)
             level_writers = LevelWriterCollection.from_manager(
@@ -557,37 +831,25 @@ def assign_confidence(
                 type_map=type_map,
                 level_input_output_column_mapping=level_input_output_column_mapping,
                 deduplication=deduplication,
+                target_column=dataset.target_column,
             )
 
             level_writers.sink_iterator(sorted_file_iterator)
             level_writers.finalize()
 
-        con = Confidence(
+        return Confidence(
             dataset=dataset,
             levels=level_manager.levels_or_proteins,
             level_paths=level_manager.level_data_paths,
             peptide_column=dataset.peptide_column,
             out_writers=output_writers,
-            eval_fdr=eval_fdr,
-            write_decoys=write_decoys,
-            do_rollup=do_rollup,
-            proteins=proteins,
-            rng=rng,
-            peps_error=peps_error,
-            peps_algorithm=peps_algorithm,
-            qvalue_algorithm=qvalue_algorithm,
-            stream_confidence=stream_confidence,
             score_stats=level_writers.score_stats,
+            score_sketches=level_writers.score_sketches,
+            **confidence_options,
         )
-        out.append(con)
-        if not prefix:
-            # Having None as a prefix means that all outputs will be
-            # written to a single file, thus after the first iteration
-            # we stop initializing the writers (bc that generates over-writing
-            # the files instead of appending to them).
-            output_writers_factory.append_to_output_file = True
-
-    return out
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 class LevelWriterCollection:
@@ -599,6 +861,7 @@ class LevelWriterCollection:
         level_input_output_column_mapping: dict[str, str],
         level_hash_columns: dict[str, list[str]],
         deduplication: bool,
+        target_column: str | None = None,
     ):
         # Do I need to pass the levels? cant I use the keys of the data paths?
         self.levels = levels
@@ -623,17 +886,20 @@ class LevelWriterCollection:
                 columns=list(level_input_output_column_mapping.values()),
                 column_types=level_column_types,
                 buffer_size=CONFIDENCE_CHUNK_SIZE,
-                buffer_type=BufferType.Dicts,
+                buffer_type=BufferType.DataFrame,
             )
             for level in levels
         }
-        self.seen_level_entities = {level: set() for level in levels}
+        self.seen_level_entities = {level: SeenHashes() for level in levels}
         for level, writer in self.level_writers.items():
             LOGGER.info(f"Initializing writer for level {level}")
             LOGGER.debug(f"\t {writer}")
             writer.initialize()
 
         self.score_stats = OnlineStatistics()
+        # The target column is needed to sketch the scores of each level
+        self.target_column = target_column
+        self.score_sketches = {level: TDQuantileSketch() for level in levels}
         self.per_level_counts = defaultdict(int)
 
     def __repr__(self):
@@ -646,6 +912,7 @@ class LevelWriterCollection:
         type_map: dict[str, np.dtype],
         level_input_output_column_mapping: dict[str, str],
         deduplication: bool,
+        target_column: str | None = None,
     ) -> LevelWriterCollection:
         level_data_paths = level_manager.level_data_paths
         levels = level_manager.levels
@@ -657,33 +924,55 @@ class LevelWriterCollection:
             level_input_output_column_mapping=level_input_output_column_mapping,
             level_hash_columns=hash_columns,
             deduplication=deduplication,
+            target_column=target_column,
         )
 
-    def hash_data_row(self, data_row, level):
-        # TODO: benchmark if actually hashing here would be better.
-        # .     It feels inefficient to keep large numbers of large strings
-        #       in memory.
-        return str([
-            data_row[self.level_input_output_column_mapping.get(col, col)]
+    def hash_chunk(self, chunk: pd.DataFrame, level: str) -> np.ndarray:
+        """Hash the columns identifying an entity of `level` per row."""
+        columns = [
+            self.level_input_output_column_mapping.get(col, col)
             for col in self.level_hash_columns[level]
-        ])
+        ]
+        return hash_rows(chunk.loc[:, columns])
+
+    def sink_chunk(self, chunk: pd.DataFrame):
+        """Write the first occurrence of every level entity in `chunk`.
+
+        The chunks must be passed in order of descending score, so that the
+        first row seen for an entity is also its best scoring one.
+        """
+        self.per_level_counts["total"] += len(chunk)
+        output_columns = list(self.level_input_output_column_mapping.values())
+        for level in self.levels:
+            if level != "psms" or self.deduplication:
+                hashes = self.hash_chunk(chunk, level=level)
+                seen = self.seen_level_entities[level]
+                keep_idx = seen.add_new(hashes)
+                self.per_level_counts[level] += len(keep_idx)
+                out_chunk = chunk.iloc[keep_idx]
+            else:
+                self.per_level_counts[level] += len(chunk)
+                out_chunk = chunk
 
-    def sink_iterator(self, sorted_file_iterator):
-        for data_row in sorted_file_iterator:
-            self.per_level_counts["total"] += 1
-            for level in self.levels:
-                if level != "psms" or self.deduplication:
-                    psm_hash = self.hash_data_row(data_row, level=level)
-                    if psm_hash in self.seen_level_entities[level]:
-                        continue
-                    self.per_level_counts[level] += 1
-                    self.seen_level_entities[level].add(psm_hash)
-                out_row = {
-                    col: data_row[col]
-                    for col in self.level_input_output_column_mapping.values()
-                }
-                self.level_writers[level].append_data(out_row)
-                self.score_stats.update_single(data_row["mokapot_score"])
+            if len(out_chunk) == 0:
+                continue
+            self.level_writers[level].append_data(
+                out_chunk.loc[:, output_columns].reset_index(drop=True)
+            )
+            scores = out_chunk["mokapot_score"].to_numpy()
+            self.score_stats.update(scores)
+            if self.target_column is not None:
+                target_column = self.level_input_output_column_mapping.get(
+                    self.target_column, self.target_column
+                )
+                self.score_sketches[level].update(
+                    scores,
+                    np.asarray(make_bool_trarget(out_chunk[target_column])),
+                )
+
+    def sink_iterator(self, sorted_chunk_iterator: Iterator[pd.DataFrame]):
+        for chunk in sorted_chunk_iterator:
+            self.sink_chunk(chunk)
 
     def finalize(self):
         for level in self.levels:
@@ -1115,7 +1404,13 @@ def create_sorted_file_reader(
     input_output_column_mapping,
     score_column: str = STANDARD_COLUMN_NAME_MAP["score"],
 ):
-    """Read from the input psms and write into smaller sorted files by score"""
+    """Read from the input psms and sort them by score out-of-core
+
+    The metadata columns and the scores are read in chunks, sorted and
+    spilled to disk in runs of at most `EXTERNAL_SORT_MEMORY_BUDGET` bytes
+    and then merged in passes of at most `EXTERNAL_SORT_MAX_FAN_IN` runs
+    (see :py:class:`~mokapot.tabular_data.external_sort.ExternalSorter`).
+    """
 
     # Create a reader that only reads columns given in psms.metadata_columns
     # in chunks of size CONFIDENCE_CHUNK_SIZE and joins the scores to it
@@ -1135,86 +1430,75 @@ def create_sorted_file_reader(
         columns=output_columns,
     )
 
-    #  Write those chunks in parallel, where the columns are given
-    #  by dataset.metadata plus the "scores" column
-
-    # Q: why does it have to save the temp chunks in the same format?
-    # OLD: outfile_ext = dataset.reader.file_name.suffix
-    outfile_ext = dataset.get_default_extension()
-    scores_metadata_paths = Parallel(n_jobs=max_workers, require="sharedmem")(
-        delayed(_save_sorted_metadata_chunks)(
-            chunk_metadata,
-            dest_dir / f"{file_prefix}scores_metadata_{i}{outfile_ext}",
-            output_columns,
-            dataset.target_column,
-            deduplication_columns,
-        )
-        for i, chunk_metadata in enumerate(file_iterator)
-    )
-
-    readers = [
-        TabularDataReader.from_path(path) for path in scores_metadata_paths
-    ]
-
-    sorted_file_reader = MergedTabularDataReader(
-        readers=readers,
-        priority_column=STANDARD_COLUMN_NAME_MAP["score"],
-        reader_chunk_size=CONFIDENCE_CHUNK_SIZE,
-    )
-
-    # Return the sorted iterator and clean up afterwards, regardless of whether
-    # an exception was thrown in the `with` block
-    try:
-        yield sorted_file_reader
-    finally:
-        for sc_path in scores_metadata_paths:
-            try:
-                sc_path.unlink()
-            except Exception as e:
-                LOGGER.warning(
-                    "Caught exception while deleting temp files: %s", e
-                )
+    # Sort those chunks into runs on disk, where the columns are given
+    # by dataset.metadata plus the "scores" column. The sorter cleans up its
+    # temp files afterwards, regardless of whether an exception was thrown
+    # in the `with` block
+    with ExternalSorter(
+        dest_dir=dest_dir,
+        priority_column=score_column,
+        deduplication_columns=deduplication_columns,
+        file_prefix=f"{file_prefix}scores_metadata_",
+        max_workers=max_workers,
+    ) as sorter:
+        for chunk_metadata in file_iterator:
+            sorter.add(
+                _convert_target_column(chunk_metadata, dataset.target_column)
+            )
+        yield sorter.get_sorted_reader()
 
 
 @typechecked
-def _save_sorted_metadata_chunks(
+def _convert_target_column(
     chunk_metadata: pd.DataFrame,
-    chunk_write_path: Path,
-    output_columns,
-    target_column,
-    deduplication_columns,
-):
+    target_column: str,
+) -> pd.DataFrame:
     tmp = make_bool_trarget(chunk_metadata.loc[:, target_column])
     # Setting the temporaty column and deleting the original
     # column solves a deprecation warning that mentions "assiging
     # column with incompatible dtype"
     del chunk_metadata[target_column]
     chunk_metadata.loc[:, target_column] = tmp
-    chunk_metadata.sort_values(
-        by=STANDARD_COLUMN_NAME_MAP["score"],
-        ascending=False,
-        inplace=True,
-    )
+    return chunk_metadata
 
-    if deduplication_columns is not None:
-        # This is not strictly necessary, as we deduplicate also afterwards,
-        # but speeds up the process
-        try:
-            chunk_metadata.drop_duplicates(deduplication_columns, inplace=True)
-        except KeyError as e:
-            msg = "Duplication error trying to use the following columns: "
-            msg += str(deduplication_columns)
-            msg += f". Found: {chunk_metadata.columns} "
-            msg += ". Please check the input data."
-            raise KeyError(msg) from e
-
-    chunk_writer = TabularDataWriter.from_suffix(
-        chunk_write_path,
-        columns=output_columns,
-        column_types=[],
-    )
-    chunk_writer.write(chunk_metadata)
-    return chunk_write_path
+
+@typechecked
+def estimate_level_memory(level_path: Path, stream_confidence: bool) -> int:
+    """Roughly estimate the memory needed to compute the confidence of a level.
+
+    Without streaming, the whole level file is read into a dataframe, which
+    takes a few times the size of the file. With streaming, only a few chunks
+    are held in memory at a time, whose size per row is measured on the first
+    rows of the file.
+    """
+    try:
+        file_size = level_path.stat().st_size
+    except OSError:
+        return 0
+    estimate = 4 * file_size
+    if stream_confidence:
+        reader = TabularDataReader.from_path(level_path)
+        first_rows = next(
+            reader.get_chunked_data_iterator(chunk_size=1000), None
+        )
+        if first_rows is not None and len(first_rows) > 0:
+            row_size = first_rows.memory_usage(deep=True).sum()
+            row_size /= len(first_rows)
+            chunk_memory = int(2 * CONFIDENCE_CHUNK_SIZE * row_size)
+            estimate = min(estimate, chunk_memory)
+    return estimate
+
+
+@typechecked
+def level_max_workers(max_workers: int, peps_algorithm: str) -> int:
+    """The number of levels whose confidence is computed concurrently.
+
+    The Python qvality holds the GIL for the whole fit, so levels that use it
+    are processed one at a time.
+    """
+    if peps_algorithm in ("qvality", "qvality_sampled"):
+        return 1
+    return max_workers
 
 
 @typechecked
@@ -1228,6 +1512,7 @@ def compute_and_write_confidence(
     peps_error: bool,
     level: str,
     eval_fdr: float,
+    score_sketch: TDQuantileSketch | None = None,
 ):
     # Note: the score stats are only used for the confidence estimation
     #       if the streaming mode is used.
@@ -1268,18 +1553,9 @@ def compute_and_write_confidence(
             level,
             peps_algorithm,
         )
-        try:
-            peps = peps_from_scores(
-                scores, targets, is_tdc=True, pep_algorithm=peps_algorithm
-            )
-        except PepsConvergenceError:
-            LOGGER.info(
-                f"\t- Encountered convergence problems in `{peps_algorithm}`. "
-                "Falling back to qvality ...",
-            )
-            peps = peps_from_scores(
-                scores, targets, is_tdc=True, pep_algorithm="qvality"
-            )
+        peps = peps_from_scores(
+            scores, targets, is_tdc=True, pep_algorithm=peps_algorithm
+        )
 
         if peps_error and all(peps == 1):
             raise ValueError("PEP values are all equal to 1.")
@@ -1292,13 +1568,28 @@ def compute_and_write_confidence(
             msg = "Requested streaming confidence without passing a"
             msg += " `score_stats` argument, please provide one."
             raise RuntimeError(msg)
-        bin_edges = HistData.get_bin_edges(score_stats, clip=(50, 500))
+        if score_sketch is not None and peps_algorithm != "kde_nnls":
+            # Bins of equal width over the robust core of the scores (with
+            # the core extended to cover the estimated FDR thresholds) and
+            # of equal numbers of scores in the tails; the bins at the
+            # cutoff are not refined further. The KDE needs bins of equal
+            # width everywhere.
+            bin_edges = score_sketch.get_bin_edges(eval_fdr=eval_fdr)
+        else:
+            bin_edges = HistData.get_bin_edges(score_stats, clip=(50, 500))
         score_target_iterator = create_score_target_iterator(
             temp_reader.get_chunked_data_iterator(
                 chunk_size=CONFIDENCE_CHUNK_SIZE,
                 columns=[STANDARD_COLUMN_NAME_MAP["score"], "is_decoy"],
             )
         )
+        if qvalue_algorithm == "tdc":
+            # The level files are sorted by descending score, so the exact
+            # TDC q-values can be computed while the histogram is filled
+            streaming_tdc = StreamingTdc(desc=True)
+            score_target_iterator = streaming_tdc.update_from_iterator(
+                score_target_iterator
+            )
         hist_data = TDHistData.from_score_target_iterator(
             bin_edges, score_target_iterator
         )
@@ -1309,8 +1600,19 @@ def compute_and_write_confidence(
             )
 
         LOGGER.info("Estimating q-value and PEP assignment functions...")
-        qvalues_func = qvalues_func_from_hist(hist_data, is_tdc=True)
-        peps_func = peps_func_from_hist_nnls(hist_data, is_tdc=True)
+        if qvalue_algorithm == "tdc":
+            streaming_tdc.finalize()
+            num_found = streaming_tdc.num_passing_targets(eval_fdr)
+            LOGGER.info(f"\t- Found {num_found} {level} with q<={eval_fdr}")
+            qvalues_func = streaming_tdc.qvalues
+        else:
+            qvalues_func = qvalues_func_from_hist(hist_data, is_tdc=True)
+        if peps_algorithm == "qvality_sampled":
+            peps_func = peps_func_from_hist_qvality(hist_data, is_tdc=True)
+        elif peps_algorithm == "kde_nnls":
+            peps_func = peps_func_from_hist_kde_nnls(hist_data, is_tdc=True)
+        else:
+            peps_func = peps_func_from_hist_nnls(hist_data, is_tdc=True)
 
         LOGGER.info("Streaming q-value and PEP assignments...")
         for df_chunk in temp_reader.get_chunked_data_iterator(
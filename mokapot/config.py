@@ -94,6 +94,45 @@ def _parser():
         ),
     )
 
+    parser.add_argument(
+        "--dataset_workers",
+        default=1,
+        type=int,
+        help=(
+            "The number of PSM files for which confidence is assigned "
+            "concurrently, in separate processes. Only used without "
+            "--aggregate. At most MOKAPOT_MAX_CONCURRENT_SORTS files "
+            "(default: 2) are sorted at the same time. The memory budgets, "
+            "such as MOKAPOT_CONFIDENCE_MEMORY_BUDGET, apply to each process "
+            "separately, so the total memory use grows with the number of "
+            "workers."
+        ),
+    )
+
+    parser.add_argument(
+        "--ingest_cache_dir",
+        type=Path,
+        default=None,
+        help=(
+            "A directory in which parsed PIN files are cached in a columnar "
+            "format. Later runs on the same files read them from the cache "
+            "instead of parsing them again. The size of the cache is "
+            "limited by the MOKAPOT_INGEST_CACHE_MAX_SIZE environment "
+            "variable (in bytes, 50 GB by default)."
+        ),
+    )
+
+    parser.add_argument(
+        "--fold_executor",
+        default="threads",
+        choices=["threads", "processes"],
+        help=(
+            "Whether the cross-validation folds are trained in threads or "
+            "in separate processes. Processes are not limited by the GIL "
+            "and share the training PSMs through a memory mapped file."
+        ),
+    )
+
     parser.add_argument(
         "-r",
         "--file_root",
@@ -210,6 +249,28 @@ def _parser():
         help="The number of iterations to use for training.",
     )
 
+    parser.add_argument(
+        "--early_stopping_tol",
+        default=None,
+        type=float,
+        help=(
+            "Stop the training of a model before max_iter iterations once "
+            "the number of positive examples changes by at most this "
+            "fraction between two iterations."
+        ),
+    )
+
+    parser.add_argument(
+        "--cv_max_samples",
+        default=None,
+        type=int,
+        help=(
+            "The maximum number of PSMs to use for the hyperparameter grid "
+            "search. Larger training sets are subsampled, keeping the "
+            "proportion of targets and decoys."
+        ),
+    )
+
     parser.add_argument(
         "--seed",
         type=int,
@@ -330,10 +391,24 @@ def _parser():
     parser.add_argument(
         "--peps_algorithm",
         default="qvality",
-        choices=["qvality", "qvality_bin", "kde_nnls", "hist_nnls"],
+        choices=[
+            "qvality",
+            "qvality_bin",
+            "qvality_sampled",
+            "kde_nnls",
+            "hist_nnls",
+        ],
         help=(
             "Specify the algorithm for pep computation. 'qvality_bin' works "
-            "only if the qvality binary is on the search path"
+            "only if the qvality binary is on the search path. "
+            "'qvality_sampled' runs qvality on a stratified sample of the "
+            "scores (50000 by default, set with the "
+            "MOKAPOT_QVALITY_SAMPLE_SIZE environment variable), which "
+            "bounds memory for large datasets but is only modestly faster; "
+            "the default keeps PEPs within about 0.01 of 'qvality', and "
+            "smaller samples trade accuracy for little speed. With "
+            "streaming, only 'qvality_sampled', 'kde_nnls' and 'hist_nnls' "
+            "can be used."
         ),
     )
 
@@ -9,10 +9,33 @@ CHUNK_SIZE_READ_ALL_DATA = int(
 CHUNK_SIZE_ROWS_PREDICTION = int(
     os.getenv("MOKAPOT_CHUNK_SIZE_ROWS_PREDICTION", 700000)
 )
-CHUNK_SIZE_COLUMNS_FOR_DROP_COLUMNS = int(
-    os.getenv("MOKAPOT_CHUNK_SIZE_COLUMNS_FOR_DROP_COLUMNS", 19)
-)
 CHUNK_SIZE_ROWS_FOR_DROP_COLUMNS = int(
     os.getenv("MOKAPOT_CHUNK_SIZE_ROWS_FOR_DROP_COLUMNS", 2000000)
 )
 MERGE_SORT_CHUNK_SIZE = int(os.getenv("MOKAPOT_MERGE_SORT_CHUNK_SIZE", 20000))
+EXTERNAL_SORT_MEMORY_BUDGET = int(
+    os.getenv("MOKAPOT_EXTERNAL_SORT_MEMORY_BUDGET", 1000000000)
+)
+EXTERNAL_SORT_MAX_FAN_IN = int(
+    os.getenv("MOKAPOT_EXTERNAL_SORT_MAX_FAN_IN", 16)
+)
+TRAINING_MATRIX_DIR = os.getenv("MOKAPOT_TRAINING_MATRIX_DIR")
+TRAINING_MEMORY_BUDGET = int(
+    os.getenv("MOKAPOT_TRAINING_MEMORY_BUDGET", 4000000000)
+)
+INGEST_CACHE_MAX_SIZE = int(
+    os.getenv("MOKAPOT_INGEST_CACHE_MAX_SIZE", 50000000000)
+)
+PIN_FORMAT_SNIFF_LINES = int(
+    os.getenv("MOKAPOT_PIN_FORMAT_SNIFF_LINES", 100000)
+)
+# Run time of the sampled qvality PEPs is dominated by qvality's fixed-size
+# spline fit and by interpolating all scores, so smaller samples gain little.
+# On 4M simulated PSMs, 50000 samples kept the PEPs within 0.01 (mean 0.001)
+# of the exact fit, while 10000 samples allowed errors of up to 0.07.
+QVALITY_SAMPLE_SIZE = int(os.getenv("MOKAPOT_QVALITY_SAMPLE_SIZE", 50000))
+QUANTILE_SKETCH_SIZE = int(os.getenv("MOKAPOT_QUANTILE_SKETCH_SIZE", 2048))
+CONFIDENCE_MEMORY_BUDGET = int(
+    os.getenv("MOKAPOT_CONFIDENCE_MEMORY_BUDGET", 4000000000)
+)
+MAX_CONCURRENT_SORTS = int(os.getenv("MOKAPOT_MAX_CONCURRENT_SORTS", 2))
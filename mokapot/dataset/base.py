@@ -4,10 +4,11 @@ from typing import Generator, Hashable
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from typeguard import typechecked
 
 import mokapot.utils as utils
-from mokapot.qvalues import tdc
+from mokapot.qvalues import tdc_count_passing, tdc_threshold
 
 from ..column_defs import ColumnGroups
 from ..tabular_data import TabularDataReader
@@ -195,7 +196,9 @@ class PsmDataset(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def find_best_feature(self, eval_fdr: float) -> LabeledBestFeature:
+    def find_best_feature(
+        self, eval_fdr: float, max_workers: int = 1
+    ) -> LabeledBestFeature:
         raise NotImplementedError
 
     @property
@@ -210,6 +213,76 @@ class PsmDataset(ABC):
         raise NotImplementedError
 
 
+@typechecked
+def count_passing_targets(
+    features: np.ndarray,
+    targets: np.ndarray,
+    eval_fdr: float,
+    max_workers: int = 1,
+) -> np.ndarray:
+    """Count the accepted targets when ranking by each feature.
+
+    The counts for all features and both directions are computed from a
+    single feature matrix, so it only needs to be read once. The features
+    are processed in blocks, which can be processed in parallel.
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        The feature matrix (PSMs x features). Column-major (Fortran order)
+        matrices are the most efficient.
+    targets : numpy.ndarray of bool
+        Whether each PSM is a target.
+    eval_fdr : float
+        The false discovery rate threshold to use.
+    max_workers : int, optional
+        The number of threads to use.
+
+    Returns
+    -------
+    numpy.ndarray
+        The number of targets at or below `eval_fdr` (2 x features). The
+        first row holds the counts when higher feature values are better,
+        the second row the counts when lower values are better.
+    """
+    num_features = features.shape[1]
+    counts = np.zeros((2, num_features), dtype=int)
+    if num_features == 0:
+        return counts
+
+    def count_block(columns):
+        for row, desc in enumerate((True, False)):
+            counts[row, columns] = tdc_count_passing(
+                features[:, columns], targets, eval_fdr=eval_fdr, desc=desc
+            )
+
+    blocks = np.array_split(
+        np.arange(num_features), min(max_workers, num_features)
+    )
+    Parallel(n_jobs=max_workers, require="sharedmem")(
+        delayed(count_block)(slice(block[0], block[-1] + 1))
+        for block in blocks
+    )
+    return counts
+
+
+def best_feature_properties(
+    counts: np.ndarray, feature_columns: tuple[str, ...], eval_fdr: float
+) -> BestFeatureProperties:
+    """Select the best feature from the counts of `count_passing_targets`.
+
+    Ties are resolved in favor of descending directions first and then in
+    the order of the feature columns.
+    """
+    row, col = np.unravel_index(np.argmax(counts), counts.shape)
+    return BestFeatureProperties(
+        name=feature_columns[col],
+        positives=int(counts[row, col]),
+        fdr=eval_fdr,
+        descending=bool(row == 0),
+    )
+
+
 @typechecked
 def update_labels(
     scores: np.ndarray[float] | pd.Series,
@@ -245,11 +318,16 @@ def update_labels(
     if isinstance(targets, pd.Series):
         targets = targets.values.astype(bool)
 
-    qvals = tdc(scores, target=targets, desc=desc)
-    unlabeled = np.logical_and(qvals > eval_fdr, targets)
-    new_labels = np.ones(len(qvals))
-    new_labels[~targets] = -1
-    new_labels[unlabeled] = 0
+    # Only the score threshold is needed, not the q-values of all PSMs
+    threshold = tdc_threshold(
+        scores, target=targets, eval_fdr=eval_fdr, desc=desc
+    )
+    targets = np.asarray(targets, dtype=bool)
+    new_labels = np.where(targets, 0.0, -1.0)
+    if threshold is not None:
+        keys = scores.astype(np.float32)
+        accepted = keys >= threshold if desc else keys <= threshold
+        new_labels[accepted & targets] = 1
     return new_labels
 
 
@@ -10,10 +10,11 @@ from .. import utils
 from ..column_defs import ColumnGroups, OptionalColumns
 from ..tabular_data import DataFrameReader, TabularDataReader
 from .base import (
-    BestFeatureProperties,
     LabeledBestFeature,
     PsmDataset,
+    best_feature_properties,
     calibrate_scores,
+    count_passing_targets,
     update_labels,
 )
 
@@ -334,40 +335,9 @@ class LinearPsmDataset(PsmDataset):
         """The columns of the dataset."""
         return self.data.columns.tolist()
 
-    def _targets_count_by_feature(self, desc, eval_fdr):
-        """
-        iterate over features and count the number of positive examples
-
-        :param desc: bool
-            Are high scores better for the best feature?
-        :param eval_fdr: float
-            The false discovery rate threshold to use.
-
-        Returns
-        -------
-        list of BestFeatureProperties
-            The number of positive examples for each feature and the
-            associated properties.
-        """
-
-        outs = []
-        for col in self.feature_columns:
-            labs = update_labels(
-                self.data.loc[:, col],
-                self.data.loc[:, self.target_column].values,
-                eval_fdr=eval_fdr,
-                desc=desc,
-            )
-            tmp = BestFeatureProperties(
-                name=col,
-                positives=(labs == 1).sum(),
-                fdr=eval_fdr,
-                descending=desc,
-            )
-            outs.append(tmp)
-        return outs
-
-    def find_best_feature(self, eval_fdr: float) -> LabeledBestFeature:
+    def find_best_feature(
+        self, eval_fdr: float, max_workers: int = 1
+    ) -> LabeledBestFeature:
         """
         Find the best feature to separate targets from decoys at the
         specified false-discovery rate threshold.
@@ -377,6 +347,8 @@ class LinearPsmDataset(PsmDataset):
         eval_fdr : float
             The false-discovery rate threshold used to define the
             best feature.
+        max_workers : int, optional
+            The number of threads used to evaluate the features.
 
         Returns
         -------
@@ -391,13 +363,15 @@ class LinearPsmDataset(PsmDataset):
         desc : bool
             Are high scores better for the best feature?
         """
-        feat_stats = []
-        for desc in (True, False):
-            num_passing = self._targets_count_by_feature(desc, eval_fdr)
-            feat_stats.extend(num_passing)
-
-        feat_stats.sort(key=lambda x: x.positives, reverse=True)
-        best = feat_stats[0]
+        features = np.asfortranarray(
+            self.data.loc[:, list(self.feature_columns)].to_numpy(dtype=float)
+        )
+        targets = utils.make_bool_trarget(self.data[self.target_column])
+        targets = np.asarray(targets, dtype=bool)
+        counts = count_passing_targets(
+            features, targets, eval_fdr=eval_fdr, max_workers=max_workers
+        )
+        best = best_feature_properties(counts, self.feature_columns, eval_fdr)
 
         if best.positives == 0:
             raise RuntimeError(
@@ -405,9 +379,10 @@ class LinearPsmDataset(PsmDataset):
                 " for any feature."
             )
 
+        col = self.feature_columns.index(best.name)
         new_labels = update_labels(
-            self.data.loc[:, best.name],
-            self.data.loc[:, self.target_column].values,
+            features[:, col],
+            targets,
             eval_fdr=eval_fdr,
             desc=best.descending,
         )
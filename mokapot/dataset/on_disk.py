@@ -3,7 +3,6 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 from typing import Generator
-from zlib import crc32
 
 import numpy as np
 import pandas as pd
@@ -11,11 +10,13 @@ from typeguard import typechecked
 
 from .. import utils
 from ..column_defs import ColumnGroups, OptionalColumns
+from ..constants import CHUNK_SIZE_READ_ALL_DATA
 from ..tabular_data import TabularDataReader
 from .base import (
-    BestFeatureProperties,
     LabeledBestFeature,
     PsmDataset,
+    best_feature_properties,
+    count_passing_targets,
     update_labels,
 )
 
@@ -249,70 +250,55 @@ class OnDiskPsmDataset(PsmDataset):
 
         return (scores - target_score) / (target_score - decoy_score)
 
-    def _targets_count_by_feature(self, column, eval_fdr, desc):
-        df = self.read_data(
-            columns=[column] + [self.target_column],
-        )
-        df[self.target_column] = utils.make_bool_trarget(
-            df[self.target_column]
+    def _read_feature_matrix(self) -> tuple[np.ndarray, np.ndarray]:
+        """Read all features and the targets in a single pass.
+
+        The features are stored column-major, such that each feature is
+        contiguous in memory.
+        """
+        feature_columns = list(self.feature_columns)
+        features = np.empty(
+            (len(self.spectra_dataframe), len(feature_columns)),
+            dtype=np.float32,
+            order="F",
         )
-        return (
-            update_labels(
-                df.loc[:, column],
-                targets=df.loc[:, self.target_column],
-                eval_fdr=eval_fdr,
-                desc=desc,
-            )
-            == 1
-        ).sum()
-
-    def find_best_feature(self, eval_fdr: float) -> LabeledBestFeature:
-        best_feat = None
-        best_positives = 0
-        new_labels = None
-        for desc in (True, False):
-            num_passing = pd.Series(
-                [
-                    self._targets_count_by_feature(
-                        eval_fdr=eval_fdr,
-                        column=c,
-                        desc=desc,
-                    )
-                    for c in self.feature_columns
-                ],
-                index=self.feature_columns,
+        targets = np.empty(len(features), dtype=bool)
+        start = 0
+        for chunk in self.read_data_chunked(
+            chunk_size=CHUNK_SIZE_READ_ALL_DATA,
+            columns=feature_columns + [self.target_column],
+        ):
+            end = start + len(chunk)
+            features[start:end] = chunk[feature_columns].to_numpy(dtype=float)
+            targets[start:end] = utils.make_bool_trarget(
+                chunk[self.target_column]
             )
+            start = end
+        return features[:start], targets[:start]
+
+    def find_best_feature(
+        self, eval_fdr: float, max_workers: int = 1
+    ) -> LabeledBestFeature:
+        features, targets = self._read_feature_matrix()
+        counts = count_passing_targets(
+            features, targets, eval_fdr=eval_fdr, max_workers=max_workers
+        )
+        best = best_feature_properties(counts, self.feature_columns, eval_fdr)
 
-            feat_idx = num_passing.idxmax()
-            num_passing = num_passing[feat_idx]
-
-            if num_passing > best_positives:
-                best_positives = num_passing
-                best_feat = feat_idx
-                df = self.read_data(
-                    columns=[best_feat, self.target_column],
-                )
-
-                new_labels = update_labels(
-                    scores=df.loc[:, best_feat],
-                    targets=df[self.target_column],
-                    eval_fdr=eval_fdr,
-                    desc=desc,
-                )
-                best_desc = desc
-
-        if best_feat is None:
+        if best.positives == 0:
             raise RuntimeError(
                 f"No PSMs found below the 'eval_fdr' {eval_fdr}."
             )
 
+        col = self.feature_columns.index(best.name)
+        new_labels = update_labels(
+            scores=features[:, col],
+            targets=targets,
+            eval_fdr=eval_fdr,
+            desc=best.descending,
+        )
         out = LabeledBestFeature(
-            feature=BestFeatureProperties(
-                name=best_feat,
-                positives=best_positives,
-                descending=best_desc,
-                fdr=eval_fdr,
-            ),
+            feature=best,
             new_labels=new_labels,
         )
         return out
@@ -328,32 +314,6 @@ class OnDiskPsmDataset(PsmDataset):
             desc=desc,
         )
 
-    @staticmethod
-    def _hash_row(x: np.ndarray) -> int:
-        """
-        Hash array for splitting of test/training sets.
-
-        Parameters
-        ----------
-        x : np.ndarray
-            Input array to be hashed.
-
-        Returns
-        -------
-        int
-            Computed hash of the input array.
-        """
-
-        def to_base_val(v):
-            """Return base python value also for numpy types"""
-            try:
-                return v.item()
-            except AttributeError:
-                return v
-
-        tup = tuple(to_base_val(x) for x in x)
-        return crc32(str(tup).encode())
-
     def _split(self, folds, rng):
         """
         Get the indices for random, even splits of the dataset.
@@ -382,16 +342,19 @@ class OnDiskPsmDataset(PsmDataset):
                 " dataframe"
                 f" Available columns: {self.spectra_dataframe.columns}"
             )
-        spectra = self.spectra_dataframe[list(self.spectrum_columns)].values
-        # Q: Why is this deleted here? I am assuming memory but its not really
-        #    a massive source of memory usage.
-        # del self.spectra_dataframe
-        spectra = np.apply_along_axis(OnDiskPsmDataset._hash_row, 1, spectra)
-
-        # sort values to get start position of unique hashes
-        spectra_idx = np.argsort(spectra)
+        spectra = utils.hash_rows(
+            self.spectra_dataframe.loc[:, list(self.spectrum_columns)]
+        )
+
+        # sort values to get start position of unique hashes (the sort is
+        # stable, so the splits only depend on the hashes and the rng)
+        spectra_idx = np.argsort(spectra, kind="stable")
         spectra = spectra[spectra_idx]
-        idx_start_unique = np.unique(spectra, return_index=True)[1]
+        idx_start_unique = np.concatenate([
+            [0],
+            np.flatnonzero(spectra[1:] != spectra[:-1]) + 1,
+            [len(spectra)],
+        ])
         del spectra
 
         fold_size = len(spectra_idx) // folds
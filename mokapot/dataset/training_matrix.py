@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from typeguard import typechecked
+
+from .. import utils
+from ..column_defs import ColumnGroups
+from .base import PsmDataset
+from .linear_psm import LinearPsmDataset
+
+LOGGER = logging.getLogger(__name__)
+
+
+@typechecked
+class TrainingMatrix:
+    """The training PSMs of all cross-validation folds in a single matrix.
+
+    Every PSM that is part of the training set of at least one fold is stored
+    exactly once, so the memory needed does not grow with the number of
+    folds. The training set of a fold is a selection of rows of the matrix,
+    which is only materialized while the fold is trained
+    (see `fold_dataset`). When folds are trained concurrently, each of them
+    holds its own materialized copy; `fold_memory` estimates its size.
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        The feature matrix (PSMs x features).
+    targets : numpy.ndarray
+        Whether each row of `features` is a target PSM.
+    fold_rows : list of numpy.ndarray
+        For each fold, the rows of `features` that make up its training set.
+    column_groups : ColumnGroups
+        The column groups of the datasets the PSMs were read from.
+    memmap_path : Path, optional
+        The file backing `features`, if it is memory mapped. The file is
+        deleted by `close`. A memory mapped matrix is pickled without its
+        features, which are mapped again from the file when unpickled, so it
+        can be passed to worker processes cheaply.
+    """
+
+    def __init__(
+        self,
+        features: np.ndarray,
+        targets: np.ndarray,
+        fold_rows: list[np.ndarray],
+        column_groups: ColumnGroups,
+        memmap_path: Path | None = None,
+    ):
+        self.features = features
+        self.targets = targets
+        self.fold_rows = fold_rows
+        self.column_groups = column_groups
+        self.memmap_path = memmap_path
+
+    def __repr__(self):
+        return (
+            f"TrainingMatrix({self.features.shape=},{self.features.dtype=},"
+            f"{len(self.fold_rows)=},{self.memmap_path=})"
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.memmap_path is not None:
+            state["features"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.memmap_path is not None:
+            self.features = np.load(self.memmap_path, mmap_mode="r")
+
+    def __len__(self):
+        return len(self.targets)
+
+    @property
+    def feature_columns(self) -> tuple[str, ...]:
+        return self.column_groups.feature_columns
+
+    @staticmethod
+    def from_datasets(
+        datasets: list[PsmDataset],
+        train_idx: list[list[np.ndarray]],
+        chunk_size: int,
+        dtype: np.dtype | type = np.float32,
+        memmap_dir: Path | None = None,
+    ) -> TrainingMatrix:
+        """Read the training PSMs of all folds in a single pass.
+
+        Parameters
+        ----------
+        datasets : list of PsmDataset
+            The datasets to read from. They must have the same features.
+        train_idx : list of a list of numpy.ndarray
+            The indices of the training PSMs, for each fold (first level)
+            and each dataset (second level), as returned by
+            `mokapot.brew.make_train_sets`.
+        chunk_size : int
+            The number of rows to read at once.
+        dtype : numpy.dtype, optional
+            The dtype of the feature matrix.
+        memmap_dir : Path, optional
+            If given, the feature matrix is memory mapped to a temporary
+            file in this directory instead of being held in memory.
+
+        Returns
+        -------
+        TrainingMatrix
+        """
+        feature_columns = list(datasets[0].feature_columns)
+        target_column = datasets[0].target_column
+
+        # All rows of a dataset that are used for training in any fold
+        used_rows = [
+            np.unique(np.concatenate([fold[i] for fold in train_idx]))
+            for i in range(len(datasets))
+        ]
+        offsets = np.cumsum([0] + [len(rows) for rows in used_rows])
+        shape = (int(offsets[-1]), len(feature_columns))
+
+        memmap_path = None
+        if memmap_dir is None:
+            features = np.empty(shape, dtype=dtype)
+        else:
+            with tempfile.NamedTemporaryFile(
+                dir=memmap_dir, prefix="training_matrix_", suffix=".npy"
+            ) as tmp:
+                memmap_path = Path(tmp.name)
+            features = np.lib.format.open_memmap(
+                memmap_path, mode="w+", dtype=dtype, shape=shape
+            )
+        targets = np.empty(shape[0], dtype=bool)
+
+        for dataset, rows, offset in zip(datasets, used_rows, offsets):
+            file_iterator = dataset.read_data_chunked(
+                chunk_size=chunk_size,
+                columns=feature_columns + [target_column],
+            )
+            start = 0
+            for chunk in file_iterator:
+                # Chunks are consecutive, so the training rows they contain
+                # are found by binary search in the sorted training rows
+                end = start + len(chunk)
+                lo, hi = np.searchsorted(rows, [start, end])
+                chunk_pos = rows[lo:hi] - start
+                out = slice(offset + lo, offset + hi)
+                chunk_targets = utils.make_bool_trarget(chunk[target_column])
+                targets[out] = np.asarray(chunk_targets)[chunk_pos]
+                chunk = chunk.iloc[chunk_pos]
+                features[out] = chunk[feature_columns].to_numpy(dtype=dtype)
+                start = end
+
+        if memmap_path is not None:
+            features.flush()
+
+        # The training rows of the folds keep the order of `train_idx`
+        fold_rows = [
+            np.concatenate([
+                offset + np.searchsorted(rows, idx)
+                for idx, rows, offset in zip(fold, used_rows, offsets)
+            ])
+            for fold in train_idx
+        ]
+        LOGGER.debug(
+            "Read %i training PSMs for %i folds.", shape[0], len(fold_rows)
+        )
+        return TrainingMatrix(
+            features=features,
+            targets=targets,
+            fold_rows=fold_rows,
+            column_groups=datasets[0].column_groups,
+            memmap_path=memmap_path,
+        )
+
+    def fold_memory(self, fold: int) -> int:
+        """Estimate the bytes needed to train a fold.
+
+        Besides the materialized training set of the fold, the model holds
+        a normalized and a shuffled float64 copy of its features.
+        """
+        num_cells = len(self.fold_rows[fold]) * len(self.feature_columns)
+        return int(num_cells * (self.features.dtype.itemsize + 2 * 8))
+
+    def fold_dataset(self, fold: int) -> LinearPsmDataset:
+        """Create the training dataset of a fold."""
+        rows = self.fold_rows[fold]
+        psms = pd.DataFrame(
+            self.features[rows], columns=list(self.feature_columns)
+        )
+        psms[self.column_groups.target_column] = self.targets[rows]
+        return LinearPsmDataset(
+            psms=psms,
+            column_groups=self.column_groups,
+            copy_data=False,
+        )
+
+    def close(self):
+        """Release the feature matrix and delete its backing file."""
+        self.features = None
+        if self.memmap_path is not None:
+            self.memmap_path.unlink(missing_ok=True)
@@ -0,0 +1,178 @@
+"""
+Concurrent computation of the confidence estimates of independent levels.
+
+Every level (psms, peptides, proteins, ...) is read from its own file and
+written to its own outputs, so the levels can be processed at the same time.
+The levels run in a pool of threads, because the writers of a level keep
+open file handles and database connections that cannot be passed to other
+processes; the expensive parts (reading, sorting, the q-value and PEP
+estimation and writing) spend most of their time in numpy, pandas and
+pyarrow, which release the GIL. The Python qvality does not, so the callers
+run levels that use it one at a time.
+
+To keep the log readable, the log records of each level are held back and
+emitted in the order of the levels, as soon as all previous levels are done.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from joblib import Parallel, delayed
+from typeguard import typechecked
+
+from mokapot.constants import CONFIDENCE_MEMORY_BUDGET
+
+LOGGER = logging.getLogger(__name__)
+
+
+@typechecked
+class MemoryBudget:
+    """A number of bytes shared by tasks that run concurrently.
+
+    A task reserves its estimated memory use before it starts and waits
+    until enough of the budget is free. A task that needs more than the whole
+    budget runs once no other task holds a reservation.
+
+    Parameters
+    ----------
+    budget : int
+        The number of bytes that may be reserved at the same time.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return f"MemoryBudget({self.budget=},{self.in_use=})"
+
+    @contextmanager
+    def reserve(self, num_bytes: int):
+        """Reserve `num_bytes` for the duration of the `with` block."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: (
+                    self.in_use == 0 or self.in_use + num_bytes <= self.budget
+                )
+            )
+            self.in_use += num_bytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_use -= num_bytes
+                self._condition.notify_all()
+
+
+class _OrderedLogs(logging.Filter):
+    """Hold back the log records of tasks and emit them in task order.
+
+    The filter is attached to all mokapot loggers. Records of a thread that
+    runs a task are buffered instead of being handled. When a task is done,
+    its records, and those of all following tasks that are already done,
+    are handled in the order of the tasks.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._buffers: dict[int, list[logging.LogRecord]] = {}
+        self._done: dict[int, list[logging.LogRecord]] = {}
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        buffer = self._buffers.get(threading.get_ident())
+        if buffer is None:
+            return True
+        buffer.append(record)
+        return False
+
+    @contextmanager
+    def capture(self, index: int):
+        """Buffer the records of the current thread for task `index`."""
+        ident = threading.get_ident()
+        records = []
+        self._buffers[ident] = records
+        try:
+            yield
+        finally:
+            del self._buffers[ident]
+            with self._lock:
+                self._done[index] = records
+                while self._next_index in self._done:
+                    for record in self._done.pop(self._next_index):
+                        logging.getLogger(record.name).handle(record)
+                    self._next_index += 1
+
+    @contextmanager
+    def attached(self):
+        """Attach the filter to all mokapot loggers."""
+        manager = logging.Logger.manager
+        names = ["mokapot"] + [
+            name for name in manager.loggerDict if name.startswith("mokapot.")
+        ]
+        loggers = [logging.getLogger(name) for name in names]
+        for logger in loggers:
+            logger.addFilter(self)
+        try:
+            yield
+        finally:
+            for logger in loggers:
+                logger.removeFilter(self)
+
+
+@typechecked
+def run_level_tasks(
+    tasks: dict[str, Callable[[], Any]],
+    max_workers: int = 1,
+    memory_estimates: dict[str, int] | None = None,
+    memory_budget: int = CONFIDENCE_MEMORY_BUDGET,
+) -> dict[str, Any]:
+    """Run the tasks of independent levels concurrently.
+
+    Parameters
+    ----------
+    tasks : dict[str, Callable[[], Any]]
+        The task of each level. The tasks must not depend on each other.
+    max_workers : int, optional
+        The maximum number of tasks that run at the same time. With one
+        worker, the tasks run one after another in the calling thread.
+    memory_estimates : dict[str, int], optional
+        The estimated number of bytes needed by the task of each level.
+    memory_budget : int, optional
+        The number of bytes the tasks that run at the same time may need
+        together. Can be set with the `MOKAPOT_CONFIDENCE_MEMORY_BUDGET`
+        environment variable.
+
+    Returns
+    -------
+    dict[str, Any]
+        The results of the tasks, by level.
+    """
+    if max_workers <= 1 or len(tasks) <= 1:
+        return {level: task() for level, task in tasks.items()}
+
+    memory_estimates = memory_estimates or {}
+    budget = MemoryBudget(memory_budget)
+    ordered_logs = _OrderedLogs()
+
+    def run(index, level, task):
+        with ordered_logs.capture(index):
+            with budget.reserve(memory_estimates.get(level, 0)):
+                return task()
+
+    num_workers = min(max_workers, len(tasks))
+    LOGGER.debug(
+        "Processing %i levels in %i threads.", len(tasks), num_workers
+    )
+    with ordered_logs.attached():
+        results = Parallel(n_jobs=num_workers, prefer="threads")(
+            delayed(run)(index, level, task)
+            for index, (level, task) in enumerate(tasks.items())
+        )
+    return dict(zip(tasks, results))
@@ -22,6 +22,7 @@ import numpy as np
 import pandas as pd
 from sklearn.base import clone
 from sklearn.exceptions import NotFittedError
+from sklearn.linear_model._base import LinearClassifierMixin
 from sklearn.model_selection import GridSearchCV, KFold
 from sklearn.model_selection._search import BaseSearchCV
 from sklearn.preprocessing import StandardScaler
@@ -104,6 +105,22 @@ class Model:
         algorithms, this will have no effect.
     rng : int or numpy.random.Generator, optional
         The seed or generator used for model training.
+    warm_start : bool, optional
+        Should each training iteration start from the solution of the
+        previous one? Only the positive examples change between iterations,
+        so this usually converges much faster. It only has an effect for
+        estimators with a :code:`warm_start` parameter, such as
+        :py:class:`~sklearn.linear_model.SGDClassifier` or
+        :py:class:`~sklearn.linear_model.LogisticRegression`.
+    early_stopping_tol : float or None, optional
+        Stop training before `max_iter` iterations once the number of
+        positive examples changes by at most this fraction between two
+        iterations. The default, :code:`None`, always performs `max_iter`
+        iterations.
+    cv_max_samples : int or None, optional
+        The maximum number of PSMs used for the hyperparameter search. If
+        more PSMs are available, a random subsample stratified by label is
+        used. The default, :code:`None`, uses all PSMs.
 
     Attributes
     ----------
@@ -133,6 +150,15 @@ class Model:
         The CV fold on which this model was fit, if any.
     rng : numpy.random.Generator
         The random number generator.
+    linear_coef : tuple of (numpy.ndarray, float) or None
+        For linear models, the weights on the unscaled features and the
+        intercept, computed when the model is trained. None otherwise.
+    warm_start : bool
+        Does each training iteration start from the previous solution?
+    early_stopping_tol : float or None
+        The relative change in positive examples below which training stops.
+    cv_max_samples : int or None
+        The maximum number of PSMs used for the hyperparameter search.
     """
 
     def __init__(
@@ -145,6 +171,9 @@ class Model:
         override=False,
         shuffle=True,
         rng=None,
+        warm_start=False,
+        early_stopping_tol=None,
+        cv_max_samples=None,
     ):
         """Initialize a Model object"""
         self.estimator = clone(estimator)
@@ -153,6 +182,7 @@ class Model:
         self.feat_pass = None
         self.best_feat = None
         self.desc = None
+        self.linear_coef = None
 
         if scaler == "as-is":
             self.scaler = DummyScaler()
@@ -167,6 +197,9 @@ class Model:
         self.override = override
         self.shuffle = shuffle
         self.rng = rng
+        self.warm_start = warm_start
+        self.early_stopping_tol = early_stopping_tol
+        self.cv_max_samples = cv_max_samples
 
         # To keep track of the fold that this was trained on.
         # Needed to ensure reproducibility in brew() with
@@ -316,6 +349,13 @@ class Model:
 
         # Prepare the model:
         model = _find_hyperparameters(self, norm_feat, start_labels)
+        if self.warm_start:
+            if "warm_start" in model.get_params():
+                model.set_params(warm_start=True)
+            else:
+                LOGGER.debug(
+                    "%s does not support warm starts.", type(model).__name__
+                )
 
         # Begin training loop
         target = start_labels
@@ -347,6 +387,10 @@ class Model:
                     "Model performs worse after training."
                 )
 
+            if _has_converged(num_passed, self.early_stopping_tol):
+                LOGGER.debug("\t- Converged after %i iterations.", i + 1)
+                break
+
         # If the model performs worse than what was initialized:
         best_feat_better = num_passed[-1] <= self.feat_pass
         start_better = num_passed[-1] <= (start_labels == 1).sum()
@@ -366,6 +410,7 @@ class Model:
             for line in weights:
                 LOGGER.debug("    %s", line)
 
+        self.linear_coef = _get_linear_coef(self.estimator, self.scaler)
         self.is_trained = True
         LOGGER.info("Done training.")
         return self
@@ -409,6 +454,15 @@ class PercolatorModel(Model):
         The number of jobs used to parallelize the hyperparameter grid search.
     rng : int or numpy.random.Generator, optional
         The seed or generator used for model training.
+    early_stopping_tol : float or None, optional
+        Stop training before `max_iter` iterations once the number of
+        positive examples changes by at most this fraction between two
+        iterations. The default, :code:`None`, always performs `max_iter`
+        iterations.
+    cv_max_samples : int or None, optional
+        The maximum number of PSMs used for the hyperparameter grid search.
+        If more PSMs are available, a random subsample stratified by label
+        is used. The default, :code:`None`, uses all PSMs.
 
     Attributes
     ----------
@@ -437,6 +491,10 @@ class PercolatorModel(Model):
         grid search.
     rng : numpy.random.Generator
         The random number generator.
+    early_stopping_tol : float or None
+        The relative change in positive examples below which training stops.
+    cv_max_samples : int or None
+        The maximum number of PSMs used for the hyperparameter grid search.
     """
 
     def __init__(
@@ -448,6 +506,8 @@ class PercolatorModel(Model):
         override=False,
         n_jobs=1,
         rng=None,
+        early_stopping_tol=None,
+        cv_max_samples=None,
     ):
         """Initialize a PercolatorModel"""
         self.n_jobs = n_jobs
@@ -469,9 +529,81 @@ class PercolatorModel(Model):
             direction=direction,
             override=override,
             rng=rng,
+            early_stopping_tol=early_stopping_tol,
+            cv_max_samples=cv_max_samples,
         )
 
 
+@typechecked
+class LinearScorer:
+    """
+    Scores PSMs with one or more trained linear models at once.
+
+    The scaler and the weights of each model are combined into a single
+    weight vector on the raw features (see `Model.linear_coef`), so scoring a
+    block of PSMs with all models is a single matrix product.
+
+    Parameters
+    ----------
+    features : list of str
+        The features, in the order of the rows of `weights`.
+    weights : numpy.ndarray
+        The weights of each model (features x models).
+    intercepts : numpy.ndarray
+        The intercept of each model.
+    dtype : numpy.dtype, optional
+        The dtype used for the matrix product.
+
+    :meta private:
+    """
+
+    def __init__(
+        self,
+        features: list[str],
+        weights: np.ndarray,
+        intercepts: np.ndarray,
+        dtype: np.dtype | type = np.float32,
+    ):
+        self.features = features
+        self.weights = weights.astype(dtype)
+        self.intercepts = intercepts.astype(dtype)
+        self.dtype = dtype
+
+    @staticmethod
+    def from_models(models: list[Model]) -> "LinearScorer | None":
+        """Combine trained models, or return None if any is not linear."""
+        coefs = [getattr(model, "linear_coef", None) for model in models]
+        if any(coef is None for coef in coefs):
+            return None
+        features = list(models[0].features)
+        # All models must weigh the same features in the same order
+        for model in models[1:]:
+            if list(model.features) != features:
+                return None
+        weights = np.stack([weights for weights, _ in coefs], axis=1)
+        intercepts = np.array([intercept for _, intercept in coefs])
+        return LinearScorer(features, weights, intercepts)
+
+    def score(self, psms: pd.DataFrame) -> np.ndarray:
+        """
+        Score PSMs with all models.
+
+        Parameters
+        ----------
+        psms : pandas.DataFrame
+            The PSMs, which must contain all features.
+
+        Returns
+        -------
+        numpy.ndarray
+            The scores (PSMs x models).
+        """
+        feat = psms.loc[:, self.features].to_numpy(dtype=self.dtype)
+        scores = feat @ self.weights
+        scores += self.intercepts
+        return scores.astype(np.float64)
+
+
 class DummyScaler:
     """
     Implements the interface of scikit-learn scalers, but does
@@ -681,6 +813,17 @@ def _find_hyperparameters(model, features, labels):
         LOGGER.debug("Selecting hyperparameters...")
         cv_samples = features[labels.astype(bool), :]
         cv_targ = (labels[labels.astype(bool)] + 1) / 2
+        if (
+            model.cv_max_samples is not None
+            and len(cv_targ) > model.cv_max_samples
+        ):
+            idx = _stratified_subsample(
+                cv_targ, model.cv_max_samples, model.rng
+            )
+            cv_samples, cv_targ = cv_samples[idx, :], cv_targ[idx]
+            LOGGER.debug(
+                "\t- Using a subsample of %i PSMs.", model.cv_max_samples
+            )
 
         # Fit the model
         model.estimator.fit(cv_samples, cv_targ)
@@ -698,6 +841,95 @@ def _find_hyperparameters(model, features, labels):
     return new_est
 
 
+def _get_linear_coef(estimator, scaler):
+    """
+    Combine the scaler and the weights of a linear model.
+
+    Parameters
+    ----------
+    estimator : estimator
+        A trained sklearn estimator.
+    scaler : scaler object
+        The scaler that was used to normalize the features.
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, float) or None
+        The weights on the unscaled features and the intercept, or None if
+        the model cannot be expressed like that.
+    """
+    if not isinstance(estimator, LinearClassifierMixin):
+        return None
+    coef = getattr(estimator, "coef_", None)
+    if coef is None or coef.shape[0] != 1:
+        return None
+    weights = np.asarray(coef[0], dtype=np.float64)
+    intercept = float(np.ravel(estimator.intercept_)[0])
+
+    if isinstance(scaler, DummyScaler):
+        return weights, intercept
+    if not isinstance(scaler, StandardScaler) or not hasattr(
+        scaler, "n_features_in_"
+    ):
+        return None
+
+    # w * (x - mean) / scale + b = (w / scale) * x + (b - w * mean / scale)
+    if scaler.with_std:
+        weights = weights / scaler.scale_
+    if scaler.with_mean:
+        intercept -= float(weights @ scaler.mean_)
+    return weights, intercept
+
+
+def _stratified_subsample(labels, max_samples, rng):
+    """
+    Draw a random subsample that keeps the proportion of each label.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        The label of each sample.
+    max_samples : int
+        The size of the subsample.
+    rng : numpy.random.Generator
+        The random number generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        The sorted indices of the subsample.
+    """
+    classes, counts = np.unique(labels, return_counts=True)
+    # At least one sample of each label, so the classifier can be fit
+    sizes = np.maximum(np.round(counts * max_samples / len(labels)), 1)
+    idx = [
+        rng.choice(np.flatnonzero(labels == label), int(size), replace=False)
+        for label, size in zip(classes, sizes)
+    ]
+    return np.sort(np.concatenate(idx))
+
+
+def _has_converged(num_passed, tol):
+    """
+    Check whether the number of positive examples has converged.
+
+    Parameters
+    ----------
+    num_passed : list of int
+        The number of positive examples after each iteration so far.
+    tol : float or None
+        The maximum relative change between the last two iterations.
+
+    Returns
+    -------
+    bool
+    """
+    if tol is None or len(num_passed) < 2:
+        return False
+    change = abs(int(num_passed[-1]) - int(num_passed[-2]))
+    return change <= tol * num_passed[-2]
+
+
 def _get_weights(model, features) -> list[str] | None:
     """
     If the model is a linear model, parse the weights to a list of strings.
@@ -57,10 +57,16 @@ def main(main_args=None):
     )
 
     # Check config parameter validity
-    if config.stream_confidence and config.peps_algorithm != "hist_nnls":
+    if config.stream_confidence and config.peps_algorithm not in [
+        "hist_nnls",
+        "kde_nnls",
+        "qvality_sampled",
+    ]:
         raise ValueError(
             f"Streaming and PEPs algorithm `{config.peps_algorithm}` not "
-            "compatible. Use `--peps_algorithm=hist_nnls` instead.`"
+            "compatible. Use `--peps_algorithm=hist_nnls`, "
+            "`--peps_algorithm=kde_nnls` or "
+            "`--peps_algorithm=qvality_sampled` instead.`"
         )
 
     # Start analysis
@@ -73,7 +79,11 @@ def main(main_args=None):
     np.random.seed(config.seed)
 
     # Parse
-    datasets = read_pin(config.psm_files, max_workers=config.max_workers)
+    datasets = read_pin(
+        config.psm_files,
+        max_workers=config.max_workers,
+        cache_dir=config.ingest_cache_dir,
+    )
     if config.aggregate or len(config.psm_files) == 1:
         prefixes = ["" for f in config.psm_files]
     else:
@@ -108,6 +118,8 @@ def main(main_args=None):
             direction=config.direction,
             override=config.override,
             rng=config.seed,
+            early_stopping_tol=config.early_stopping_tol,
+            cv_max_samples=config.cv_max_samples,
         )
 
     # Fit the models:
@@ -120,6 +132,7 @@ def main(main_args=None):
         subset_max_train=config.subset_max_train,
         ensemble=config.ensemble,
         rng=config.seed,
+        fold_executor=config.fold_executor,
     )
     logging.info("")
 
@@ -148,6 +161,7 @@ def main(main_args=None):
         qvalue_algorithm=config.qvalue_algorithm,
         sqlite_path=config.sqlite_db_path,
         stream_confidence=config.stream_confidence,
+        dataset_workers=config.dataset_workers,
     )
 
     if config.save_models:
@@ -0,0 +1,314 @@
+"""
+A persistent cache of parsed PIN files.
+
+Parsing large tab-delimited PIN files is slow, and the same files are often
+analyzed many times with different settings. The ingest cache stores a
+columnar (Parquet) copy of each parsed file, together with a manifest that
+holds everything else `read_percolator` infers: the column groups, the
+features that were dropped because of missing values and the spectra
+dataframe. Entries are keyed on the content of the file and the parser
+options, so changing either creates a new entry.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import parquet as pq
+from typeguard import typechecked
+
+from mokapot.column_defs import ColumnGroups, OptionalColumns
+from mokapot.constants import CHUNK_SIZE_READ_ALL_DATA, INGEST_CACHE_MAX_SIZE
+from mokapot.dataset import OnDiskPsmDataset
+from mokapot.tabular_data import ParquetFileReader
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the layout of the cache entries changes
+CACHE_FORMAT_VERSION = 1
+
+
+@typechecked
+class CachedPinReader(ParquetFileReader):
+    """
+    Reads the columnar copy of a PIN file from the ingest cache.
+
+    The results written for a dataset keep the format of the file it was
+    originally read from, so the default extension is the one of that file.
+
+    Attributes:
+    -----------
+    file_name : Path
+        The path to the Parquet file in the cache.
+    default_extension : str
+        The default extension of the original file.
+    """
+
+    def __init__(self, file_name: Path, default_extension: str = ".tsv"):
+        super().__init__(file_name)
+        self.default_extension = default_extension
+
+    def __repr__(self):
+        return f"CachedPinReader({self.file_name=},{self.default_extension=})"
+
+    def get_default_extension(self) -> str:
+        return self.default_extension
+
+
+@typechecked
+class IngestCache:
+    """
+    A directory of parsed PIN files.
+
+    Each entry consists of three files named after its key: the PSMs
+    (``<key>.parquet``), the spectra dataframe (``<key>.spectra.parquet``)
+    and a JSON manifest (``<key>.json``). The manifest is written last, so
+    only complete entries are ever loaded. When the cache grows beyond
+    `max_size` bytes, the least recently used entries are deleted.
+
+    Parameters
+    ----------
+    cache_dir : Path
+        The directory of the cache. It is created if it does not exist.
+    max_size : int, optional
+        The maximum size of the cache in bytes.
+    """
+
+    def __init__(self, cache_dir: Path, max_size: int = INGEST_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self):
+        return f"IngestCache({self.cache_dir=},{self.max_size=})"
+
+    def _paths(self, key: str) -> tuple[Path, Path, Path]:
+        return (
+            self.cache_dir / f"{key}.json",
+            self.cache_dir / f"{key}.parquet",
+            self.cache_dir / f"{key}.spectra.parquet",
+        )
+
+    @staticmethod
+    def get_key(pin_file: Path, options: dict) -> str:
+        """
+        Compute the key of a PIN file.
+
+        Parameters
+        ----------
+        pin_file : Path
+            The PIN file.
+        options : dict
+            The options the file is parsed with.
+
+        Returns
+        -------
+        str
+            A hash of the content of the file and the options.
+        """
+        from mokapot import __version__
+
+        digest = hashlib.sha256()
+        with open(pin_file, "rb") as f:
+            while block := f.read(1 << 20):
+                digest.update(block)
+        settings = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "mokapot_version": __version__,
+            "options": options,
+        }
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()[:32]
+
+    def load(self, key: str) -> OnDiskPsmDataset | None:
+        """
+        Load a dataset from the cache.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry (see `get_key`).
+
+        Returns
+        -------
+        OnDiskPsmDataset or None
+            The dataset, reading its PSMs from the cache, or None if the
+            cache has no (complete) entry for the key.
+        """
+        manifest_path, data_path, spectra_path = self._paths(key)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION or not (
+            data_path.exists() and spectra_path.exists()
+        ):
+            self.remove(key)
+            return None
+
+        # Mark the entry as recently used
+        os.utime(manifest_path)
+        LOGGER.info(
+            "Loading %s from the ingest cache (%s)...",
+            manifest["source"],
+            data_path,
+        )
+        if manifest["dropped_features"]:
+            LOGGER.info(
+                "Features with missing values that are not used: %s",
+                ", ".join(manifest["dropped_features"]),
+            )
+        reader = CachedPinReader(
+            data_path, default_extension=manifest["default_extension"]
+        )
+        return OnDiskPsmDataset(
+            reader,
+            column_groups=_column_groups_from_dict(manifest["column_groups"]),
+            spectra_dataframe=pd.read_parquet(spectra_path),
+        )
+
+    def store(
+        self,
+        key: str,
+        dataset: OnDiskPsmDataset,
+        source: Path,
+        dropped_features: list[str],
+    ) -> bool:
+        """
+        Add a parsed PIN file to the cache.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry (see `get_key`).
+        dataset : OnDiskPsmDataset
+            The dataset returned by `read_percolator`.
+        source : Path
+            The PIN file the dataset was read from.
+        dropped_features : list[str]
+            The features that were dropped because of missing values.
+
+        Returns
+        -------
+        bool
+            Whether the dataset could be added to the cache.
+        """
+        manifest_path, data_path, spectra_path = self._paths(key)
+        tmp_data_path = data_path.with_suffix(".parquet.tmp")
+        try:
+            num_rows = _write_parquet(dataset, tmp_data_path)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            LOGGER.warning(
+                "Could not add %s to the ingest cache: %s", source, e
+            )
+            tmp_data_path.unlink(missing_ok=True)
+            return False
+        dataset.spectra_dataframe.to_parquet(spectra_path, index=False)
+        os.replace(tmp_data_path, data_path)
+
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "source": str(source),
+            "default_extension": dataset.get_default_extension(),
+            "num_rows": num_rows,
+            "column_groups": _column_groups_to_dict(dataset.column_groups),
+            "dropped_features": dropped_features,
+            "spectra_columns": dataset.spectra_dataframe.columns.tolist(),
+        }
+        tmp_manifest_path = manifest_path.with_suffix(".json.tmp")
+        with open(tmp_manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_manifest_path, manifest_path)
+        LOGGER.info("Added %s to the ingest cache.", source)
+
+        self.evict(keep=key)
+        return True
+
+    def remove(self, key: str):
+        """Delete an entry from the cache."""
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def evict(self, keep: str | None = None):
+        """
+        Delete the least recently used entries until the cache is small
+        enough.
+
+        Parameters
+        ----------
+        keep : str, optional
+            The key of an entry that must not be deleted.
+        """
+        entries = []
+        for manifest_path in self.cache_dir.glob("*.json"):
+            key = manifest_path.name.removesuffix(".json")
+            paths = self._paths(key)
+            size = sum(path.stat().st_size for path in paths if path.exists())
+            entries.append((manifest_path.stat().st_mtime, key, size))
+
+        total_size = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            LOGGER.debug("Evicting %s from the ingest cache.", key)
+            self.remove(key)
+            total_size -= size
+
+
+def _write_parquet(dataset: OnDiskPsmDataset, path: Path) -> int:
+    # The schema of the first chunk is used for the whole file
+    writer = None
+    num_rows = 0
+    try:
+        for chunk in dataset.reader.get_chunked_data_iterator(
+            chunk_size=CHUNK_SIZE_READ_ALL_DATA
+        ):
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, schema=schema)
+            table = pa.Table.from_pandas(
+                chunk, schema=schema, preserve_index=False
+            )
+            writer.write_table(table)
+            num_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return num_rows
+
+
+def _column_groups_to_dict(column_groups: ColumnGroups) -> dict:
+    return {
+        "columns": list(column_groups.columns),
+        "target_column": column_groups.target_column,
+        "peptide_column": column_groups.peptide_column,
+        "spectrum_columns": list(column_groups.spectrum_columns),
+        "feature_columns": list(column_groups.feature_columns),
+        "extra_confidence_level_columns": list(
+            column_groups.extra_confidence_level_columns
+        ),
+        "optional_columns": column_groups.optional_columns.as_dict(),
+    }
+
+
+def _column_groups_from_dict(data: dict) -> ColumnGroups:
+    return ColumnGroups(
+        columns=tuple(data["columns"]),
+        target_column=data["target_column"],
+        peptide_column=data["peptide_column"],
+        spectrum_columns=tuple(data["spectrum_columns"]),
+        feature_columns=tuple(data["feature_columns"]),
+        extra_confidence_level_columns=tuple(
+            data["extra_confidence_level_columns"]
+        ),
+        optional_columns=OptionalColumns(**data["optional_columns"]),
+    )
@@ -3,27 +3,28 @@ This module contains the parsers for reading in PSMs
 """
 
 import logging
-import warnings
 from pathlib import Path
 from pprint import pformat
-from typing import Iterable, List
 
+import numpy as np
 import pandas as pd
-from joblib import Parallel, delayed
-from typeguard import typechecked
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from mokapot.column_defs import (
     ColumnGroups,
 )
 from mokapot.constants import (
-    CHUNK_SIZE_COLUMNS_FOR_DROP_COLUMNS,
     CHUNK_SIZE_ROWS_FOR_DROP_COLUMNS,
 )
-from mokapot.dataset import OnDiskPsmDataset, PsmDataset
-from mokapot.tabular_data import TabularDataReader
+from mokapot.dataset import OnDiskPsmDataset
+from mokapot.parsers.ingest_cache import IngestCache
+from mokapot.tabular_data import (
+    CSVFileReader,
+    TabularDataReader,
+    TraditionalPinReader,
+)
 from mokapot.utils import (
-    create_chunks,
-    flatten,
     make_bool_trarget,
     tuplize,
 )
@@ -40,6 +41,7 @@ def read_pin(
     expmass_column=None,
     rt_column=None,
     charge_column=None,
+    cache_dir: Path | None = None,
 ) -> list[OnDiskPsmDataset]:
     """Read Percolator input (PIN) tab-delimited files.
 
@@ -93,6 +95,11 @@ def read_pin(
         :code:`None`, mokapot will look for a column called "charge" (case
         insensitive). This is required for some output formats, such as
         FlashLFQ.
+    cache_dir : Path, optional
+        The directory of an ingest cache. Each PIN file is parsed only once
+        and stored in the cache in a columnar format; later calls with the
+        same file and options read it from there instead (see
+        :py:class:`~mokapot.parsers.ingest_cache.IngestCache`).
 
     Returns
     -------
@@ -100,41 +107,47 @@ def read_pin(
         containing the PSMs from all of the PIN files.
     """
     logging.info("Parsing PSMs...")
+    options = {
+        "filename_column": filename_column,
+        "calcmass_column": calcmass_column,
+        "expmass_column": expmass_column,
+        "rt_column": rt_column,
+        "charge_column": charge_column,
+    }
+    if cache_dir is None:
+        return [
+            read_percolator(pin_file, max_workers=max_workers, **options)
+            for pin_file in tuplize(pin_files)
+        ]
+
+    cache = IngestCache(cache_dir)
     return [
-        read_percolator(
-            pin_file,
-            max_workers=max_workers,
-            filename_column=filename_column,
-            calcmass_column=calcmass_column,
-            expmass_column=expmass_column,
-            rt_column=rt_column,
-            charge_column=charge_column,
+        _read_percolator_cached(
+            Path(pin_file), cache, max_workers=max_workers, **options
         )
         for pin_file in tuplize(pin_files)
     ]
 
 
-def create_chunks_with_identifier(data, identifier_column, chunk_size):
-    """
-    This function will split data into chunks but will make sure that
-    identifier_columns is never split
-
-    Parameters
-    ----------
-    data: the data you want to split in chunks (1d list)
-    identifier_column: columns that should never be splitted.
-        Must be of length 2.
-    chunk_size: the chunk size
-
-    Returns
-    -------
-
-    """
-    if (len(data) + len(identifier_column)) % chunk_size != 1:
-        data_copy = data + identifier_column
-        return create_chunks(data_copy, chunk_size)
-    else:
-        return create_chunks(data, chunk_size) + [identifier_column]
+def _read_percolator_cached(
+    pin_file: Path, cache: IngestCache, max_workers, **options
+) -> OnDiskPsmDataset:
+    key = cache.get_key(pin_file, options)
+    dataset = cache.load(key)
+    if dataset is not None:
+        return dataset
+
+    dataset = read_percolator(pin_file, max_workers=max_workers, **options)
+    all_features = ColumnGroups.infer_from_colnames(
+        dataset.reader.get_column_names(), **options
+    ).feature_columns
+    dropped_features = [
+        feature
+        for feature in all_features
+        if feature not in dataset.feature_columns
+    ]
+    cache.store(key, dataset, pin_file, dropped_features)
+    return dataset
 
 
 def read_percolator(
@@ -165,6 +178,8 @@ def read_percolator(
 
     LOGGER.info("Reading %s...", perc_file)
     reader = TabularDataReader.from_path(perc_file)
+    if isinstance(reader, TraditionalPinReader):
+        reader.max_workers = max_workers
     columns = reader.get_column_names()
     prelim_columns = ColumnGroups.infer_from_colnames(
         columns,
@@ -178,34 +193,19 @@ def read_percolator(
     spectra = prelim_columns.spectrum_columns
     labels = prelim_columns.target_column
 
-    # Check that features don't have missing values:
-    feat_slices = create_chunks_with_identifier(
-        data=list(features),
-        identifier_column=list(spectra + (labels,)),
-        chunk_size=CHUNK_SIZE_COLUMNS_FOR_DROP_COLUMNS,
+    # Check that features don't have missing values and read the spectra
+    # columns, in a single pass over the file
+    df_spectra, features_to_drop = scan_features_and_spectra(
+        reader=reader,
+        features=list(features),
+        spectra=list(spectra + (labels,)),
     )
-    df_spectra_list = []
-    # Q: this really feels like a bad idea ... concurrent mutation of a list
-    # .  where the elements are concrruently mutated datafames in-place.
-    features_to_drop = Parallel(n_jobs=max_workers, require="sharedmem")(
-        delayed(drop_missing_values_and_fill_spectra_dataframe)(
-            reader=reader,
-            column=c,
-            spectra=list(spectra + (labels,)),
-            df_spectra_list=df_spectra_list,
-        )
-        for c in feat_slices
-    )
-
-    df_spectra = pd.concat(df_spectra_list)
     tmp_labels = make_bool_trarget(df_spectra.loc[:, labels])
     # Deleting the column solves a deprecation warning that mentions
     # "assiging column with incompatible dtype"
     del df_spectra[labels]
     df_spectra.loc[:, labels] = tmp_labels
 
-    features_to_drop = [drop for drop in features_to_drop if drop]
-    features_to_drop = flatten(features_to_drop)
     if len(features_to_drop) > 1:
         LOGGER.warning("Missing values detected in the following features:")
         for col in features_to_drop:
@@ -220,10 +220,9 @@ def read_percolator(
     for i, feat in enumerate(_feature_columns):
         LOGGER.info("  (%i)\t%s", i + 0, feat)
 
-    prelim_columns.update(
+    column_groups = prelim_columns.update(
         feature_columns=_feature_columns,
     )
-    column_groups = prelim_columns
     LOGGER.info(f"Infered column grouping: {pformat(column_groups)}")
 
     return OnDiskPsmDataset(
@@ -234,150 +233,96 @@ def read_percolator(
 
 
 # Utility Functions -----------------------------------------------------------
-def drop_missing_values_and_fill_spectra_dataframe(
+def scan_features_and_spectra(
     reader: TabularDataReader,
-    column: List,
-    spectra: List,
-    df_spectra_list: List[pd.DataFrame],
-):
-    na_mask = pd.DataFrame([], columns=list(set(column) - set(spectra)))
-    file_iterator = reader.get_chunked_data_iterator(
-        chunk_size=CHUNK_SIZE_ROWS_FOR_DROP_COLUMNS, columns=column
-    )
-    for i, feature in enumerate(file_iterator):
-        if set(spectra) <= set(
-            column
-        ):  # Isnt this a constant within the function?
-            df_spectra_list.append(feature[spectra])
-            with warnings.catch_warnings():
-                warnings.filterwarnings(
-                    "ignore", category=pd.errors.SettingWithCopyWarning
-                )
-                feature.drop(spectra, axis=1, inplace=True)
-        na_mask = pd.concat(
-            [na_mask, pd.DataFrame([feature.isna().any(axis=0)])],
-            ignore_index=True,
-        )
-    del file_iterator
-    na_mask = na_mask.any(axis=0)
-    if na_mask.any():
-        return list(na_mask[na_mask].index)
-
-
-@typechecked
-def get_rows_from_dataframe(
-    idx: Iterable,
-    chunk: pd.DataFrame,
-    train_psms,
-    target_column: str,
-    file_idx: int,
-):
+    features: list[str],
+    spectra: list[str],
+) -> tuple[pd.DataFrame, list[str]]:
     """
-    extract rows from a chunk of a dataframe
+    Find the features with missing values and read the spectra columns.
 
-    Parameters
-    ----------
-    idx : list of list of indexes
-        The indexes to select from dataframe.
-    train_psms : list of list of dataframes
-        Contains subsets of dataframes that are already extracted.
-    chunk : dataframe
-        Subset of a dataframe.
-    target_column : str
-        The target column name, expected to be in the dataframe.
-    file_idx : the index of the file being searched
-
-    Returns
-    -------
-    None
-        The function modifies the `train_psms` list in place.
-    """
-    tmp = make_bool_trarget(chunk.loc[:, target_column])
-    # Deleting the column solves a deprecation warning that
-    # mentions "assiging column with incompatible dtype"
-    del chunk[target_column]
-    chunk.loc[:, target_column] = tmp
-    for k, train in enumerate(idx):
-        idx_ = list(set(train) & set(chunk.index))
-        train_psms[file_idx][k].append(chunk.loc[idx_])
-
-
-def concat_and_reindex_chunks(df, orig_idx):
-    return [
-        pd.concat(df_fold).reindex(orig_idx_fold)
-        for df_fold, orig_idx_fold in zip(df, orig_idx)
-    ]
+    Both are done in the same pass over the data. Delimited text files are
+    parsed with pyarrow's multithreaded CSV reader and an explicit schema:
+    features are read as float32, the label as int8 and string columns of
+    the spectra as dictionary encoded categoricals. Other readers, and
+    files that do not match the schema inferred from their first rows, are
+    read chunk-wise with pandas instead.
 
-
-@typechecked
-def parse_in_chunks(
-    datasets: list[PsmDataset],
-    train_idx: list[list[list[int]]],
-    chunk_size: int,
-    max_workers: int,
-) -> list[pd.DataFrame]:
-    """
-    Parse a file in chunks
+    Only this scan uses the typed schema. The reads that feed training,
+    scoring and confidence assignment still go through the reader's
+    `read` and `get_chunked_data_iterator` with pandas' default dtypes
+    (float64 and object), so they produce the same numbers as before.
 
     Parameters
     ----------
-    datasets : OnDiskPsmDataset
-        A collection of PSMs.
-    train_idx : list of a list of a list of indexes
-        - first level are training splits,
-        - second one is the number of input files
-        - third level the actual idexes The indexes to select from data.
-        Thus if you have 3 splits, 2 files and 10 PSMs per file, the
-        "shape" of the list is [3,2,10]
-    chunk_size : int
-        The chunk size in bytes.
-    max_workers: int
-            Number of workers for Parallel
+    reader : TabularDataReader
+        The reader of the PSMs.
+    features : list[str]
+        The feature columns.
+    spectra : list[str]
+        The columns identifying a spectrum, followed by the label column.
 
     Returns
     -------
-    List
-        list of dataframes
+    df_spectra : pandas.DataFrame
+        The spectra columns.
+    features_to_drop : list[str]
+        The features with missing values.
     """
+    if isinstance(reader, CSVFileReader):
+        try:
+            return _scan_csv_features_and_spectra(reader, features, spectra)
+        except pa.ArrowInvalid as e:
+            LOGGER.debug("Reading %s with pandas: %s", reader.file_name, e)
 
-    train_psms = [
-        [[] for _ in range(len(train_idx))] for _ in range(len(datasets))
-    ]
-    for dataset, idx, file_idx in zip(
-        datasets, zip(*train_idx), range(len(datasets))
+    has_na = pd.Series(False, index=features)
+    df_spectra_list = []
+    file_iterator = reader.get_chunked_data_iterator(
+        chunk_size=CHUNK_SIZE_ROWS_FOR_DROP_COLUMNS,
+        columns=spectra + features,
+    )
+    for chunk in file_iterator:
+        df_spectra_list.append(chunk[spectra])
+        has_na |= chunk[features].isna().any(axis=0)
+    del file_iterator
+    df_spectra = pd.concat(df_spectra_list)
+    return df_spectra, has_na[has_na].index.tolist()
+
+
+def _scan_csv_features_and_spectra(
+    reader: CSVFileReader,
+    features: list[str],
+    spectra: list[str],
+) -> tuple[pd.DataFrame, list[str]]:
+    # The schema is inferred once, from the first rows of the file
+    column_types = dict(
+        zip(reader.get_column_names(), reader.get_column_types())
+    )
+    schema = {col: _arrow_type(column_types[col]) for col in spectra[:-1]}
+    schema[spectra[-1]] = pa.int8()
+    schema.update({col: pa.float32() for col in features})
+
+    has_na = np.zeros(len(features), dtype=bool)
+    spectra_batches = []
+    for batch in reader.get_arrow_batch_iterator(
+        columns=spectra + features, column_types=schema
     ):
-        # Note: Here idx is a tuple of len == number of folds
-        #       each element is a list of ints, so each list is
-        #       the indices for each split of the dataset.
-
-        # Note2: Technically the file_idx is not a file but a dataset
-        #        index.
-        if hasattr(dataset, "reader"):
-            # Handle OnDiskPsmDataset
-            reader = dataset.reader
-            file_iterator = reader.get_chunked_data_iterator(
-                chunk_size=chunk_size, columns=dataset.columns
-            )
-            # Q: Is it really a good idea to modify a list in place
-            #    in a parallel loop?
-            Parallel(n_jobs=max_workers, require="sharedmem")(
-                delayed(get_rows_from_dataframe)(
-                    idx, chunk, train_psms, dataset.target_column, file_idx
-                )
-                for chunk in file_iterator
-            )
-        else:
-            # Handle LinearPsmDataset
-            chunk = dataset.data
-            get_rows_from_dataframe(
-                idx,
-                chunk,
-                train_psms=train_psms,
-                target_column=dataset.target_column,
-                file_idx=file_idx,
+        spectra_batches.append(batch.select(spectra))
+        for i, col in enumerate(features):
+            if has_na[i]:
+                continue
+            values = batch.column(col)
+            has_na[i] = values.null_count > 0 or bool(
+                pc.any(pc.is_nan(values)).as_py()
             )
-    train_psms_reordered = Parallel(n_jobs=max_workers, require="sharedmem")(
-        delayed(concat_and_reindex_chunks)(df=df, orig_idx=orig_idx)
-        for df, orig_idx in zip(train_psms, zip(*train_idx))
-    )
-    return [pd.concat(df) for df in zip(*train_psms_reordered)]
+    spectra_schema = pa.schema([(col, schema[col]) for col in spectra])
+    table = pa.Table.from_batches(spectra_batches, schema=spectra_schema)
+    df_spectra = table.to_pandas()
+    return df_spectra, [col for i, col in enumerate(features) if has_na[i]]
+
+
+def _arrow_type(dtype: np.dtype) -> pa.DataType:
+    if dtype.kind == "O":
+        # Spectrum identifiers such as file names repeat a lot
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(dtype)
@@ -1,20 +1,24 @@
 from __future__ import annotations
 
 import logging
+import threading
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Callable, Iterator, TypeVar
 
 import numpy as np
-import scipy.stats as stats
-from scipy.optimize import nnls
-from scipy.optimize._nnls import _nnls
+from scipy.optimize import isotonic_regression
+from scipy.signal import fftconvolve
 from triqler import qvality
 from typeguard import typechecked
 
+from mokapot.constants import QVALITY_SAMPLE_SIZE
 from mokapot.statistics import HistData
 
 LOGGER = logging.getLogger(__name__)
 
+# qvality's verbosity is a module global, which is switched off for each call
+_QVALITY_LOCK = threading.Lock()
 
 PEP_ALGORITHM = {
     "qvality": lambda scores, targets, is_tdc: peps_from_scores_qvality(
@@ -23,6 +27,9 @@ PEP_ALGORITHM = {
     "qvality_bin": lambda scores, targets, is_tdc: peps_from_scores_qvality(
         scores, targets, is_tdc, use_binary=True
     ),
+    "qvality_sampled": lambda scores, targets, is_tdc: (
+        peps_from_scores_qvality_sampled(scores, targets, is_tdc)
+    ),
     "kde_nnls": lambda scores, targets, is_tdc: peps_from_scores_kde_nnls(
         scores, targets, is_tdc
     ),
@@ -33,7 +40,12 @@ PEP_ALGORITHM = {
 
 
 class PepsConvergenceError(Exception):
-    """Raised when nnls iterations do not converge."""
+    """Raised when nnls iterations do not converge.
+
+    The monotone fits are solved exactly by `monotonize_pava` and can no
+    longer fail to converge, so this is not raised anymore. It is only kept
+    for API compatibility.
+    """
 
     pass
 
@@ -125,14 +137,18 @@ def peps_from_scores_qvality(
     scores_sorted, targets_sorted = scores[index], targets[index]
 
     try:
-        old_verbosity, qvality.VERB = qvality.VERB, 0
-        _, peps_sorted = qvalues_from_scores(
-            scores_sorted[targets_sorted],
-            scores_sorted[~targets_sorted],
-            includeDecoys=True,
-            includePEPs=True,
-            tdcInput=is_tdc,
-        )
+        with _QVALITY_LOCK:
+            old_verbosity, qvality.VERB = qvality.VERB, 0
+            try:
+                _, peps_sorted = qvalues_from_scores(
+                    scores_sorted[targets_sorted],
+                    scores_sorted[~targets_sorted],
+                    includeDecoys=True,
+                    includePEPs=True,
+                    tdcInput=is_tdc,
+                )
+            finally:
+                qvality.VERB = old_verbosity
         if use_binary:
             peps_sorted = np.array(peps_sorted, dtype=float)
 
@@ -143,12 +159,95 @@ def peps_from_scores_qvality(
             peps = np.zeros_like(scores)
         else:
             raise
-    finally:
-        qvality.VERB = old_verbosity
 
     return peps
 
 
+@typechecked
+def peps_from_scores_qvality_sampled(
+    scores: np.ndarray[float],
+    targets: np.ndarray[bool],
+    is_tdc: bool,
+    sample_size: int = QVALITY_SAMPLE_SIZE,
+) -> np.ndarray[float]:
+    """Compute PEPs from scores using qvality on a stratified subsample.
+
+    Qvality fits its spline to the decoy fractions in 500 bins of equal
+    size, which is cheap, but sorting, binning and evaluating the spline for
+    every score is not. Here, qvality is run on evenly spaced order
+    statistics of the target and the decoy scores, taken with the same
+    sampling fraction, and the PEPs of all scores are linearly interpolated
+    from those of the sample.
+
+    Accuracy: since the sample is systematic rather than random, the
+    number of sampled decoys (or targets) in any score interval is off by
+    at most one from the exact count scaled by the sampling fraction. The
+    decoy fraction of each qvality bin therefore deviates by at most about
+    `2 * 500 / sample_size` from the exact one (0.005 at the default sample
+    size). The PEPs, a smooth fit to those fractions, typically deviate by
+    less than 0.01 from the exact ones.
+    If there are at most `sample_size` scores, this is the same as
+    `peps_from_scores_qvality`.
+
+    Parameters
+    ----------
+    scores:
+        A numpy array containing the scores for each target and decoy peptide.
+    targets:
+        A boolean array indicating whether each peptide is a target (True) or a
+        decoy (False).
+    is_tdc:
+        Scores and targets come from competition, rather than separate search.
+    sample_size:
+        The (approximate) number of scores qvality is run on. Can be set with
+        the `MOKAPOT_QVALITY_SAMPLE_SIZE` environment variable. Smaller
+        samples lower the accuracy of the PEPs but save little time, since
+        the fit itself works on a fixed-size grid.
+
+    Returns
+    -------
+    array:
+        A numpy array containing the posterior error probabilities (PEPs),
+        in the same order as the scores.
+    """
+    if len(scores) <= sample_size:
+        return peps_from_scores_qvality(scores, targets, is_tdc)
+
+    fraction = sample_size / len(scores)
+    target_sample = _order_statistics(np.sort(scores[targets]), fraction)
+    decoy_sample = _order_statistics(np.sort(scores[~targets]), fraction)
+    peps_func = _peps_func_from_qvality_sample(
+        target_sample, decoy_sample, is_tdc
+    )
+    return peps_func(scores)
+
+
+def _order_statistics(sorted_scores: np.ndarray, fraction: float):
+    # Evenly spaced order statistics, always including the extremes
+    n = len(sorted_scores)
+    num = min(n, max(int(np.ceil(fraction * n)), 2))
+    idx = np.round(np.linspace(0, n - 1, num)).astype(int)
+    return sorted_scores[idx]
+
+
+def _peps_func_from_qvality_sample(
+    target_sample: np.ndarray, decoy_sample: np.ndarray, is_tdc: bool
+) -> Callable[[np.ndarray[float]], np.ndarray[float]]:
+    scores = np.concatenate([target_sample, decoy_sample]).astype(float)
+    targets = np.concatenate([
+        np.ones(len(target_sample), dtype=bool),
+        np.zeros(len(decoy_sample), dtype=bool),
+    ])
+    peps = peps_from_scores_qvality(scores, targets, is_tdc)
+
+    # Qvality gives equal scores equal PEPs, so any of them will do
+    eval_scores, idx = np.unique(scores, return_index=True)
+    pep_est = peps[idx]
+    return lambda scores: np.clip(
+        np.interp(scores, eval_scores, pep_est), 0, 1
+    )
+
+
 _AnyArray = TypeVar("_AnyArray")
 
 
@@ -226,18 +325,70 @@ def monotonize(
     return alpha * x1 + (1 - alpha) * x2
 
 
+@typechecked
+def monotonize_pava(
+    x: np.ndarray[float],
+    w: np.ndarray[float] | None = None,
+    ascending: bool = True,
+) -> np.ndarray[float]:
+    """Weighted monotone least squares fit using pool adjacent violators.
+
+    Returns the monotone array `y` that minimizes `sum(w * (x - y)**2)`. The
+    pool adjacent violators algorithm (PAVA) merges neighbouring blocks that
+    violate monotonicity into their weighted mean, which takes linear time
+    and memory and, in contrast to iterative solvers, always terminates with
+    the exact solution.
+
+    Entries with zero weight do not enter the fit. Their values are linearly
+    interpolated (w.r.t. their position) between those of their nearest
+    neighbours with positive weight, or set to the value of the nearest one
+    at the ends of the array.
+
+    Parameters
+    ----------
+    x:
+        numpy array to be monotonized.
+    w:
+        numpy array containing non-negative weights. If None, equal weights
+        are assumed.
+    ascending:
+        Boolean indicating whether the monotonized array should be in ascending
+        order.
+
+    Returns
+    -------
+    array:
+        The monotonized array.
+    """
+    x = np.asarray(x, dtype=float)
+    if w is None:
+        return isotonic_regression(x, increasing=ascending).x
+
+    w = np.asarray(w, dtype=float)
+    fitted = w > 0
+    if not fitted.any():
+        return np.zeros_like(x)
+    y = isotonic_regression(
+        x[fitted], weights=w[fitted], increasing=ascending
+    ).x
+    if fitted.all():
+        return y
+    pos = np.arange(len(x))
+    return np.interp(pos, pos[fitted], y)
+
+
 @typechecked
 def monotonize_nnls(
     x: np.ndarray[float],
     w: np.ndarray[float] | None = None,
     ascending: bool = True,
 ) -> np.ndarray[float]:
-    """Monotonizes a given array `x` using non-negative least squares (NNLS)
-    optimization.
+    """Monotonizes a given array `x` under a non-negativity constraint.
 
-    The returned array is the monotone array `y` that minimized `x-y` in the
-    L2-norm. The of all monotone arrays `y` is such that `x-y` has minimum
-    mean squared error (MSE).
+    The returned array is the non-negative, monotone array `y` that minimizes
+    `x-y` in the (weighted) L2-norm. The fit is done by `monotonize_pava`;
+    since the mean of non-negative values can never be negative, clipping the
+    unconstrained fit at zero gives the constrained solution.
 
     Parameters
     ----------
@@ -254,32 +405,7 @@ def monotonize_nnls(
     array:
         The monotonized array.
     """
-    if not ascending:
-        # If descending, just return the reversed output of the algo with
-        # reversed inputs.
-        return monotonize_nnls(x[::-1], None if w is None else w[::-1])[::-1]
-
-    # Basically the algorithm works by solving
-    #   x1 = d1
-    #   x2 = d1 + d2
-    #   x3 = d1 + d2 + d3
-    # and so on for all non-negative di - or rather minimizing the sum of the
-    # squared differences - and afterwards # taking xm1 = d1, xm2 = d1 + d2,
-    # and so on as the monotonized values.
-    # The first is the same as minimizing
-    # ||x - A d|| for the matrix A = [1 0 0 0...; 1 1 0 0...; 1 1 1 0...; ...].
-    # The second is just computing the cumsum of the d vector.
-    N = len(x)
-    A = np.tril(np.ones((N, N)))
-    if w is not None:
-        # We do the weighting by multiplying both sides (i.e. A and x) by
-        # a diagonal matrix consisting of the square roots of the weights
-        D = np.diag(np.sqrt(w))
-        A = D.dot(A)
-        x = D.dot(x)
-    d, _ = nnls(A, x)
-    xm = np.cumsum(d)
-    return xm
+    return np.maximum(monotonize_pava(x, w, ascending), 0.0)
 
 
 def estimate_pi0_by_slope(
@@ -326,6 +452,9 @@ def pdfs_from_scores(
     """Compute target and decoy probability density functions (PDFs) from
     scores using kernel density estimation (KDE).
 
+    The densities are Gaussian KDEs with Scott's bandwidth (as with
+    `scipy.stats.gaussian_kde`), computed by `binned_kde` in linear time.
+
     Parameters
     ----------
     scores:
@@ -348,15 +477,117 @@ def pdfs_from_scores(
     eval_scores = np.linspace(min_score, max_score, num=num_eval_scores)
 
     # Compute target and decoy pdfs
-    target_scores = scores[targets]
-    decoy_scores = scores[~targets]
-    target_pdf_estimator = stats.gaussian_kde(target_scores)
-    decoy_pdf_estimator = stats.gaussian_kde(decoy_scores)
-    target_pdf = target_pdf_estimator.pdf(eval_scores)
-    decoy_pdf = decoy_pdf_estimator.pdf(eval_scores)
+    target_pdf = _kde_from_scores(scores[targets], eval_scores)
+    decoy_pdf = _kde_from_scores(scores[~targets], eval_scores)
     return eval_scores, target_pdf, decoy_pdf
 
 
+def _kde_from_scores(
+    scores: np.ndarray[float], eval_scores: np.ndarray[float]
+) -> np.ndarray[float]:
+    bandwidth = scott_bandwidth(len(scores), np.std(scores, ddof=1))
+
+    # The grid must resolve the kernel, so it may need to be finer than the
+    # evaluation points
+    lo, hi = eval_scores[0], eval_scores[-1]
+    num_grid = len(eval_scores)
+    if bandwidth > 0:
+        num_grid = max(num_grid, int(np.ceil(4 * (hi - lo) / bandwidth)) + 1)
+        num_grid = min(num_grid, 1 << 16)
+    grid = np.linspace(lo, hi, num_grid)
+
+    pdf = binned_kde(grid, linear_binning(scores, grid), bandwidth)
+    if num_grid == len(eval_scores):
+        return pdf
+    return np.interp(eval_scores, grid, pdf)
+
+
+def scott_bandwidth(n: int, sd: float) -> float:
+    """Scott's rule for the bandwidth of a one-dimensional Gaussian KDE.
+
+    This is the bandwidth `scipy.stats.gaussian_kde` uses by default.
+    """
+    return sd * n ** (-1.0 / 5.0)
+
+
+@typechecked
+def linear_binning(
+    x: np.ndarray[float], grid: np.ndarray[float]
+) -> np.ndarray[float]:
+    """Distribute the values `x` onto the points of an equally spaced grid.
+
+    Each value is split between its two neighbouring grid points, in
+    proportion to its distance to the other one (linear binning). Values
+    outside of the grid are assigned to the nearest end.
+
+    Parameters
+    ----------
+    x:
+        The values to bin.
+    grid:
+        The equally spaced grid points (at least two).
+
+    Returns
+    -------
+    array:
+        The (fractional) counts at the grid points. They sum to `len(x)`.
+    """
+    num_grid = len(grid)
+    delta = (grid[-1] - grid[0]) / (num_grid - 1)
+    pos = np.clip((x - grid[0]) / delta, 0, num_grid - 1)
+    left = np.minimum(pos.astype(int), num_grid - 2)
+    frac = pos - left
+    counts = np.bincount(left, weights=1.0 - frac, minlength=num_grid)
+    counts += np.bincount(left + 1, weights=frac, minlength=num_grid)
+    return counts
+
+
+@typechecked
+def binned_kde(
+    grid: np.ndarray[float], counts: np.ndarray[float], bandwidth: float
+) -> np.ndarray[float]:
+    """Gaussian kernel density estimate from counts on an equally spaced grid.
+
+    The density at the grid points is the convolution of the counts with the
+    Gaussian kernel, which is done by FFT, so the cost is O(M log M) for `M`
+    grid points, independent of the number of values counted. Together with
+    `linear_binning`, this approximates an exact KDE up to an error of order
+    `(delta / bandwidth) ** 2` for the grid spacing `delta`. The counts may
+    also come from a (streamed) histogram, with `grid` the bin centers.
+
+    Parameters
+    ----------
+    grid:
+        The equally spaced grid points.
+    counts:
+        The counts at the grid points.
+    bandwidth:
+        The standard deviation of the Gaussian kernel. If it is not positive,
+        (e.g. since all values are equal), the grid spacing is used instead.
+
+    Returns
+    -------
+    array:
+        The density at the grid points.
+    """
+    num_grid = len(grid)
+    delta = (grid[-1] - grid[0]) / (num_grid - 1)
+    if not bandwidth > 0:
+        bandwidth = delta
+
+    # The kernel is cut off where it gets negligible, or where it stops
+    # overlapping with the grid
+    half_width = min(int(np.ceil(8 * bandwidth / delta)), num_grid - 1)
+    offsets = np.arange(-half_width, half_width + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel /= bandwidth * np.sqrt(2 * np.pi)
+
+    pdf = fftconvolve(counts, kernel, mode="same") / counts.sum()
+    # Remove the round-off noise of the FFT in empty regions
+    pdf[pdf < 1e-12 * pdf.max()] = 0.0
+    return pdf
+
+
 @typechecked
 def peps_from_scores_kde_nnls(
     scores: np.ndarray[float],
@@ -422,15 +653,7 @@ def peps_from_scores_kde_nnls(
             target_pdf, decoy_pdf, pi0_estimation_threshold
         )
 
-    correct = target_pdf - decoy_pdf * factor
-    correct = np.clip(correct, 0, None)
-
-    # Estimate peps from #correct targets, clip it
-    pepEst = np.clip(1.0 - correct / target_pdf, 0.0, 1.0)
-
-    # Now monotonize using the NNLS algo putting more weight on areas with high
-    # target density
-    pepEst = monotonize_nnls(pepEst, w=target_pdf, ascending=False)
+    pepEst = _peps_from_pdfs(target_pdf, decoy_pdf, factor)
 
     # Linearly interpolate the pep estimates from the eval points to the scores
     # of interest.
@@ -439,6 +662,21 @@ def peps_from_scores_kde_nnls(
     return peps
 
 
+def _peps_from_pdfs(target_pdf, decoy_pdf, factor):
+    correct = target_pdf - decoy_pdf * factor
+    correct = np.clip(correct, 0, None)
+
+    # Estimate peps from #correct targets, clip it. Where there are no
+    # targets, the value does not matter, as it gets zero weight below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pepEst = np.where(target_pdf > 0, 1.0 - correct / target_pdf, 1.0)
+    pepEst = np.clip(pepEst, 0.0, 1.0)
+
+    # Now monotonize using the NNLS algo putting more weight on areas with high
+    # target density
+    return monotonize_nnls(pepEst, w=target_pdf, ascending=False)
+
+
 def fit_nnls(n, k, ascending=True, *, weight_exponent=-1.0, erase_zeros=False):
     """Do monotone nnls fit on binomial model.
 
@@ -462,8 +700,13 @@ def fit_nnls(n, k, ascending=True, *, weight_exponent=-1.0, erase_zeros=False):
     weight_exponent:
         Optional (Default value = -1.0). The weight exponent to use.
     erase_zeros:
-        Optional (Default value = False). Whether 0s in `n` should be erased
-        prior to fitting or not.
+        Optional (Default value = False). Only kept for backwards
+        compatibility, entries with `n[i] == 0` are always left out of the
+        fit and interpolated from their neighbours afterwards (or set to the
+        value of the nearest non-empty entry at the ends). Note that this
+        differs from the former NNLS solver, which coupled the increments
+        around empty entries and e.g. ramped leading empty entries down
+        towards zero.
 
     Returns
     -------
@@ -471,71 +714,20 @@ def fit_nnls(n, k, ascending=True, *, weight_exponent=-1.0, erase_zeros=False):
         The monotonically increasing or decreasing array `p` of length N.
 
     """
-    # For the basic idea of this algorithm (i.e. monotonize under constraints),
-    # see the `monotonize_nnls` algorithm.  This is more or less the same, just
-    # that the functional to be minimized is different here.
-    if not ascending:
-        n = n[::-1]
-        k = k[::-1]
-
-    N = len(n)
-    D = np.diag(n)
-    A = D @ np.tril(np.ones((N, N)))
-    w = np.zeros_like(n, dtype=float)
-    w[n != 0] = n[n != 0] ** (0.5 * weight_exponent)
-    W = np.diag(w)
-    R = np.eye(N)
-
-    zeros = (n == 0).nonzero()[0]
-    if len(zeros) > 0:
-        A[zeros, zeros] = 1
-        A[zeros, np.minimum(zeros + 1, N - 1)] = -1
-        w[zeros] = 1
-        k[zeros] = 0
-        W = np.diag(w)
-
-        if erase_zeros:
-            # The following lines remove variables that will end up being the
-            # same (matrix R) as well as equations that are essentially zero on
-            # both sides U). However, since this is a bit tricky, and difficult
-            # to maintain and does not seem to lower the condition of the
-            # matrix substantially, it is only activated on demand and left
-            # here more for further reference, in case it will be needed in the
-            # future.
-            nnz = n != 0
-            nnz[-1] = True
-            nnz2 = np.insert(nnz, 0, True)[:-1]
-
-            def make_perm_mat(rows, cols):
-                M = np.zeros((np.max(rows) + 1, np.max(cols) + 1))
-                M[rows, cols] = 1
-                return M
-
-            R = make_perm_mat(np.arange(N), nnz2.cumsum() - 1)
-            U = make_perm_mat(np.arange(sum(nnz)), nnz.nonzero()[0])
-            W = U @ W
-
-    # The default tolerance of nnls is too low, leading sometimes to
-    # non-convergent iterations and subsequent failures. A good tolerance
-    # should probably be related to the condition number of `W @ A` and to
-    # the error in `W @ k` (numerical and statistical, where the latter is
-    # probably much, much larger than the former). Since this is a) difficult
-    # to estimate anyway and b) run-time consuming, we settle here for a
-    # fixed tolerance, # which a) seems large enough to never lead to
-    # non-convergence and b) is fitting for the typical condition numbers and
-    # values of k seen in experiments.
-    tol = 1e-7
-    d, _, mode = _nnls(W @ A @ R, W @ k, tol=tol)
-    if mode != 1:
-        LOGGER.debug(
-            "\t - Warning: nnls went into loop. Taking last solution."
-        )
-    p = np.cumsum(R @ d)
-
-    if not ascending:
-        return p[::-1]
-    else:
-        return p
+    # Each term of the functional is
+    #   n[i] ** weight_exponent * (n[i] * p[i] - k[i]) ** 2
+    #   = n[i] ** (weight_exponent + 2) * (p[i] - k[i] / n[i]) ** 2,
+    # so this is a weighted monotone fit of the ratios k / n, which PAVA
+    # solves exactly in linear time (see `monotonize_pava`). Bins without
+    # trials carry no information and get zero weight.
+    n = np.asarray(n, dtype=float)
+    k = np.asarray(k, dtype=float)
+    nz = n != 0
+    ratio = np.zeros_like(n)
+    ratio[nz] = k[nz] / n[nz]
+    w = np.zeros_like(n)
+    w[nz] = np.abs(n[nz]) ** (weight_exponent + 2.0)
+    return monotonize_nnls(ratio, w, ascending)
 
 
 @typechecked
@@ -589,6 +781,57 @@ class TDHistData:
             self.decoys.density,
         )
 
+    def merge(self, other: TDHistData) -> None:
+        """Add the counts of another histogram with the same bin edges.
+
+        This way, histograms can be filled for parts of the data
+        independently (e.g. per file or per worker) and merged afterwards.
+
+        Raises
+        ------
+        ValueError
+            If the bin edges of the histograms differ.
+        """
+        if not np.array_equal(self.targets.bin_edges, other.targets.bin_edges):
+            raise ValueError(
+                "Only histograms with the same bin edges can be merged."
+            )
+        self.targets.counts = self.targets.counts + other.targets.counts
+        self.decoys.counts = self.decoys.counts + other.decoys.counts
+
+    @staticmethod
+    def combine(*hist_data: TDHistData) -> TDHistData:
+        """Merge one or more histograms into a new object."""
+        first, *others = hist_data
+        combined = TDHistData(
+            first.targets.bin_edges,
+            first.targets.counts.copy(),
+            first.decoys.counts.copy(),
+        )
+        for other in others:
+            combined.merge(other)
+        return combined
+
+    def save(self, path: Path) -> None:
+        """Write the histogram data to a (small) numpy `.npz` file."""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                bin_edges=self.targets.bin_edges,
+                target_counts=self.targets.counts,
+                decoy_counts=self.decoys.counts,
+            )
+
+    @staticmethod
+    def load(path: Path) -> TDHistData:
+        """Read histogram data from a file written by `save`."""
+        with np.load(path) as data:
+            return TDHistData(
+                data["bin_edges"],
+                data["target_counts"],
+                data["decoy_counts"],
+            )
+
 
 @typechecked
 def hist_data_from_scores(
@@ -798,12 +1041,7 @@ def peps_func_from_hist_nnls(
 
     # Do monotone fit, minimizing || n - diag(p) * k || with weights n over
     # monotone descending p
-    try:
-        pep_est = fit_nnls(
-            n, k, ascending=False, weight_exponent=weight_exponent
-        )
-    except RuntimeError as e:
-        raise PepsConvergenceError from e
+    pep_est = fit_nnls(n, k, ascending=False, weight_exponent=weight_exponent)
 
     if scale_to_one and pep_est[0] < 1:
         pep_est = pep_est / pep_est[0]
@@ -814,3 +1052,118 @@ def peps_func_from_hist_nnls(
     return lambda scores: np.clip(
         np.interp(scores, eval_scores, pep_est), 0, 1
     )
+
+
+@typechecked
+def peps_func_from_hist_qvality(
+    hist_data: TDHistData,
+    is_tdc: bool,
+    sample_size: int = QVALITY_SAMPLE_SIZE,
+) -> Callable[[np.ndarray[float]], np.ndarray[float]]:
+    """Compute a function that calculates PEPs from scores using qvality on
+    a sample drawn from histogram data.
+
+    This is the streaming counterpart of `peps_from_scores_qvality_sampled`:
+    the evenly spaced order statistics are taken from the quantile functions
+    of the target and decoy histograms (interpolating linearly within the
+    bins), so their accuracy is additionally limited by the bin widths.
+
+    Parameters
+    ----------
+    hist_data:
+        Histogram data as `TDHistData` object.
+    is_tdc:
+        Scores and targets come from competition, rather than separate search.
+    sample_size:
+        The (approximate) number of scores qvality is run on.
+
+    Returns
+    -------
+    function:
+        A function that computes PEPs, given scores as input. Input must be an
+        numpy array.
+    """
+    bin_edges = hist_data.targets.bin_edges
+    target_counts = hist_data.targets.counts
+    decoy_counts = hist_data.decoys.counts
+    total = target_counts.sum() + decoy_counts.sum()
+    fraction = min(1.0, sample_size / max(total, 1))
+
+    def sample(counts):
+        # Piecewise linear quantile function, skipping empty bins so that no
+        # sample lands outside the range of the data
+        nonempty = np.flatnonzero(counts)
+        if len(nonempty) == 0:
+            return np.zeros(0)
+        cum_counts = np.cumsum(counts)[nonempty]
+        xp = np.column_stack([cum_counts - counts[nonempty], cum_counts])
+        fp = np.column_stack([bin_edges[nonempty], bin_edges[nonempty + 1]])
+        n = int(counts.sum())
+        num = min(n, max(int(np.ceil(fraction * n)), 2))
+        return np.interp(np.linspace(0, n, num), xp.ravel(), fp.ravel())
+
+    return _peps_func_from_qvality_sample(
+        sample(target_counts), sample(decoy_counts), is_tdc
+    )
+
+
+@typechecked
+def peps_func_from_hist_kde_nnls(
+    hist_data: TDHistData,
+    is_tdc: bool,
+    num_eval_scores: int = 500,
+    pi0_estimation_threshold: float = 0.9,
+) -> Callable[[np.ndarray[float]], np.ndarray[float]]:
+    """Compute a function that calculates PEPs from scores using density
+    estimates from histogram data and monotonicity.
+
+    This is the streaming counterpart of `peps_from_scores_kde_nnls`: the
+    histogram counts are taken as binned scores at the bin centers, from
+    which the densities are computed by `binned_kde`. The bin edges must be
+    equally spaced.
+
+    Parameters
+    ----------
+    hist_data:
+        Histogram data as `TDHistData` object.
+    is_tdc:
+        Scores and targets come from competition, rather than separate search.
+    num_eval_scores:
+        The number of evaluation scores to be computed. Default is 500.
+    pi0_estimation_threshold:
+        The threshold for pi0 estimation. Default is 0.9.
+
+    Returns
+    -------
+    function:
+        A function that computes PEPs, given scores as input. Input must be an
+        numpy array.
+    """
+    bin_edges = hist_data.targets.bin_edges
+    eval_scores = np.linspace(bin_edges[0], bin_edges[-1], num_eval_scores)
+
+    def pdf(hist: HistData):
+        centers = hist.bin_centers
+        counts = hist.counts.astype(float)
+        n = counts.sum()
+        mean = np.sum(counts * centers) / n
+        sd = np.sqrt(np.sum(counts * (centers - mean) ** 2) / (n - 1))
+        bandwidth = scott_bandwidth(int(n), sd)
+        return np.interp(
+            eval_scores, centers, binned_kde(centers, counts, bandwidth)
+        )
+
+    target_pdf = pdf(hist_data.targets)
+    decoy_pdf = pdf(hist_data.decoys)
+
+    if is_tdc:
+        factor = hist_data.decoys.counts.sum() / hist_data.targets.counts.sum()
+    else:
+        factor = estimate_pi0_by_slope(
+            target_pdf, decoy_pdf, pi0_estimation_threshold
+        )
+
+    pep_est = _peps_from_pdfs(target_pdf, decoy_pdf, factor)
+    return lambda scores: np.clip(
+        np.interp(scores, eval_scores, pep_est), 0, 1
+    )
@@ -3,7 +3,7 @@ This module estimates q-values.
 """
 
 import logging
-from typing import Callable
+from typing import Callable, Iterator
 
 import numpy as np
 from typeguard import typechecked
@@ -29,6 +29,33 @@ QVALUE_ALGORITHM = {
 }
 
 
+def _check_target(target: np.ndarray) -> np.ndarray:
+    """Convert a 0/1 `target` array to bool and check its type."""
+    # Since numpy 2.x relying in attribute errors is not viable here
+    # https://numpy.org/neps/nep-0050-scalar-promotion.html#impact-on-can-cast
+    # So I am manually checking the constraints.
+    if (
+        np.issubdtype(target.dtype, np.integer)
+        and target.max() <= 1
+        and target.min() >= 0
+    ):
+        target = target.astype(bool)
+
+    if np.issubdtype(target.dtype, np.floating):
+        like_one = target == np.ones_like(target)
+        like_zero = target == np.zeros_like(target)
+        if np.all(like_one | like_zero):
+            target = target.astype(bool)
+
+    if not np.issubdtype(target.dtype, bool):
+        err = ValueError(
+            f"'target' should be boolean. passed type: {target.dtype}"
+            f" with value: {target}"
+        )
+        raise err
+    return target
+
+
 @typechecked
 def tdc(
     scores: np.ndarray[float], target: np.ndarray[bool], desc: bool = True
@@ -76,28 +103,7 @@ def tdc(
         A 1D array with the estimated q-value for each entry. The
         array is the same length as the `scores` and `target` arrays.
     """
-    # Since numpy 2.x relying in attribute errors is not viable here
-    # https://numpy.org/neps/nep-0050-scalar-promotion.html#impact-on-can-cast
-    # So I am manually checking the constraints.
-    if (
-        np.issubdtype(target.dtype, np.integer)
-        and target.max() <= 1
-        and target.min() >= 0
-    ):
-        target = target.astype(bool)
-
-    if np.issubdtype(target.dtype, np.floating):
-        like_one = target == np.ones_like(target)
-        like_zero = target == np.zeros_like(target)
-        if np.all(like_one | like_zero):
-            target = target.astype(bool)
-
-    if not np.issubdtype(target.dtype, bool):
-        err = ValueError(
-            f"'target' should be boolean. passed type: {target.dtype}"
-            f" with value: {target}"
-        )
-        raise err
+    target = _check_target(target)
 
     if scores.shape[0] != target.shape[0]:
         raise ValueError("'scores' and 'target' must be the same length")
@@ -152,6 +158,461 @@ def tdc(
     return np_qval
 
 
+@typechecked
+def tdc_batch(
+    scores: np.ndarray, target: np.ndarray, desc: bool = True
+) -> np.ndarray:
+    """Estimate q-values for several scores using target decoy competition.
+
+    The q-values of each column of `scores` are identical to the ones of
+    `tdc`, including the handling of ties, but each column is only sorted
+    once and the work buffers are shared between the columns.
+
+    Parameters
+    ----------
+    scores : numpy.ndarray of float
+        A 2D array (entries x scores) containing the scores to rank by.
+    target : numpy.ndarray of bool
+        A 1D array indicating if the entry is from a target or decoy hit.
+    desc : bool
+        Are higher scores better?
+
+    Returns
+    -------
+    numpy.ndarray
+        A 2D array with the estimated q-value of each entry for each of the
+        scores.
+    """
+    kernel = _TdcKernel(scores, target)
+    qvals = np.empty(scores.shape, dtype=np.float32)
+    for col in range(scores.shape[1]):
+        if kernel.run(col, desc):
+            qvals[kernel.perm, col] = np.repeat(
+                kernel.qvalues, kernel.group_sizes
+            )
+        else:
+            qvals[:, col] = tdc(scores[:, col], kernel.target, desc=desc)
+    return qvals
+
+
+@typechecked
+def tdc_count_passing(
+    scores: np.ndarray,
+    target: np.ndarray,
+    eval_fdr: float,
+    desc: bool = True,
+) -> np.ndarray:
+    """Count the targets accepted by target decoy competition.
+
+    This counts the targets with a q-value (as estimated by `tdc`) of at
+    most `eval_fdr` for each column of `scores`. No q-value is mapped back
+    to its entry, which makes this cheaper than `tdc_batch`.
+
+    Parameters
+    ----------
+    scores : numpy.ndarray of float
+        A 2D array (entries x scores) containing the scores to rank by.
+    target : numpy.ndarray of bool
+        A 1D array indicating if the entry is from a target or decoy hit.
+    eval_fdr : float
+        The false discovery rate threshold.
+    desc : bool
+        Are higher scores better?
+
+    Returns
+    -------
+    numpy.ndarray
+        The number of accepted targets for each of the scores.
+    """
+    kernel = _TdcKernel(scores, target)
+    counts = np.zeros(scores.shape[1], dtype=int)
+    for col in range(scores.shape[1]):
+        if kernel.run(col, desc):
+            passing = ~(kernel.qvalues > eval_fdr)
+            counts[col] = kernel.group_targets[passing].sum()
+        else:
+            qvals = tdc(scores[:, col], kernel.target, desc=desc)
+            counts[col] = (~(qvals > eval_fdr) & kernel.target).sum()
+    return counts
+
+
+@typechecked
+def tdc_threshold(
+    scores: np.ndarray,
+    target: np.ndarray,
+    eval_fdr: float,
+    desc: bool = True,
+    num_bins: int = 4096,
+) -> float | None:
+    """Find the score threshold of target decoy competition.
+
+    The targets accepted at `eval_fdr` by `tdc` are exactly the targets
+    with a score at least as good as the returned threshold. Instead of
+    sorting all scores, the scores are counted in `num_bins` bins. Going
+    from the worst to the best bin, a lower bound of the FDR within each
+    bin tells whether it can contain the threshold, and only such bins are
+    sorted to find the threshold with the tie handling of `tdc`. This takes
+    linear time unless many bins need to be checked.
+
+    Parameters
+    ----------
+    scores : numpy.ndarray of float
+        A 1D array containing the score to rank by.
+    target : numpy.ndarray of bool
+        A 1D array indicating if the entry is from a target or decoy hit.
+    eval_fdr : float
+        The false discovery rate threshold.
+    desc : bool
+        Are higher scores better?
+    num_bins : int
+        The number of bins the scores are counted in.
+
+    Returns
+    -------
+    float or None
+        The score threshold (as float32, like in `tdc`), or None if no
+        target is accepted.
+    """
+    target = _check_target(target)
+    if scores.shape[0] != target.shape[0]:
+        raise ValueError("'scores' and 'target' must be the same length")
+
+    # Higher keys are better in both directions
+    keys = scores.astype(np.float32)
+    if not desc:
+        np.negative(keys, out=keys)
+    if len(keys) == 0:
+        return None
+    if not np.isfinite(keys).all():
+        return _tdc_threshold_exact(scores, target, eval_fdr, desc)
+
+    lowest, highest = float(keys.min()), float(keys.max())
+    if lowest == highest:
+        return _tdc_threshold_exact(scores, target, eval_fdr, desc)
+    bin_width = (highest - lowest) / num_bins
+    bins = (np.subtract(keys, lowest, dtype=np.float64) / bin_width).astype(
+        np.int64
+    )
+    np.minimum(bins, num_bins - 1, out=bins)
+    num_targets = np.bincount(bins[target], minlength=num_bins)
+    num_decoys = np.bincount(bins[~target], minlength=num_bins)
+    # Targets and decoys in the bins with better scores
+    targets_above = np.cumsum(num_targets[::-1])[::-1] - num_targets
+    decoys_above = np.cumsum(num_decoys[::-1])[::-1] - num_decoys
+
+    # No entry of a bin can have a lower FDR than this (the slack covers
+    # the rounding of the FDR to float32 in `tdc`)
+    with np.errstate(divide="ignore"):
+        min_fdr = (decoys_above + 1) / (targets_above + num_targets)
+    min_fdr = np.minimum(min_fdr, 1.0)
+    num_entries = num_targets + num_decoys
+    candidates = np.flatnonzero(
+        (min_fdr * (1 - 1e-6) <= eval_fdr) & (num_entries > 0)
+    )
+    worst_bin = np.flatnonzero(num_entries)[0]
+
+    for bin_idx in candidates:
+        idx = np.flatnonzero(bins == bin_idx)
+        # Within the bin, sort by score and put decoys first on ties
+        idx = idx[np.lexsort((target[idx], -keys[idx]))]
+        bin_keys = keys[idx]
+        cum_targets = targets_above[bin_idx] + target[idx].cumsum()
+        cum_decoys = decoys_above[bin_idx] + (~target[idx]).cumsum()
+        fdr = np.divide(
+            (cum_decoys + 1),
+            cum_targets,
+            out=np.ones_like(cum_targets, dtype=np.float32),
+            where=(cum_targets != 0),
+        )
+        fdr = np.minimum(fdr, 1.0)
+
+        # The worst group of tied scores with an FDR below the threshold
+        # determines the q-values of all better groups
+        starts = np.flatnonzero(bin_keys[1:] != bin_keys[:-1]) + 1
+        starts = np.concatenate([[0], starts])
+        group_fdr = np.minimum.reduceat(fdr, starts)
+        accepted = np.flatnonzero(~(group_fdr > eval_fdr))
+        if len(accepted) == 0:
+            continue
+        if bin_idx == worst_bin and accepted[-1] == len(starts) - 1:
+            # The worst group gets special treatment in `tdc`
+            return _tdc_threshold_exact(scores, target, eval_fdr, desc)
+        threshold = bin_keys[starts[accepted[-1]]]
+        return float(threshold if desc else -threshold)
+
+    return None
+
+
+def _tdc_threshold_exact(scores, target, eval_fdr, desc):
+    qvals = tdc(scores, target, desc=desc)
+    accepted = scores.astype(np.float32)[target & ~(qvals > eval_fdr)]
+    if len(accepted) == 0:
+        return None
+    return float(accepted.min() if desc else accepted.max())
+
+
+class _TdcKernel:
+    """Target decoy competition for the columns of a score matrix.
+
+    `run` sorts a single column, such that ties are ranked decoys first
+    (like in `tdc`), and estimates the q-value of each group of tied
+    scores. Since the q-values are the same for all entries with the same
+    score, the second sort of `tdc` is not needed.
+    """
+
+    def __init__(self, scores: np.ndarray, target: np.ndarray):
+        target = _check_target(target)
+        if scores.ndim != 2:
+            raise ValueError("'scores' must be a 2D array")
+        if scores.shape[0] != target.shape[0]:
+            raise ValueError("'scores' and 'target' must be the same length")
+
+        num_entries = len(target)
+        self.scores = scores
+        self.target = target
+        # Entries with tied scores are ranked by target (decoys first) and
+        # then by their position, like `np.lexsort` in `tdc` does
+        self.order = np.argsort(target, kind="stable")
+        self.ranks = np.arange(1, num_entries + 1)
+        self.keys = np.empty(num_entries, dtype=np.float32)
+        self.cum_targets = np.empty(num_entries, dtype=int)
+        self.cum_decoys = np.empty(num_entries, dtype=int)
+        self.fdr = np.empty(num_entries, dtype=np.float32)
+
+        self.perm = None
+        self.qvalues = None
+        self.group_sizes = None
+        self.group_targets = None
+
+    def run(self, col: int, desc: bool) -> bool:
+        """Estimate the q-values of the groups of tied scores of a column.
+
+        Returns False (and estimates nothing) if the column contains NaN
+        values, which cannot be grouped by their value.
+        """
+        keys = self.keys
+        # Unsigned integers can cause weird things to happen.
+        # Convert all scores to floats to for safety.
+        keys[:] = self.scores[:, col]
+        if np.isnan(keys).any():
+            return False
+        if desc:
+            np.negative(keys, out=keys)
+
+        perm = self.order[np.argsort(keys[self.order], kind="stable")]
+        keys = keys[perm]
+        target = self.target[perm]
+
+        np.cumsum(target, out=self.cum_targets)
+        np.subtract(self.ranks, self.cum_targets, out=self.cum_decoys)
+        # Handles zeros in denominator
+        self.fdr.fill(1.0)
+        np.divide(
+            self.cum_decoys + 1,
+            self.cum_targets,
+            out=self.fdr,
+            where=(self.cum_targets != 0),
+        )
+        # Clamp the FDR to 1.0
+        np.minimum(self.fdr, 1.0, out=self.fdr)
+
+        # The q-value of a group of tied scores is the lowest FDR of the
+        # group itself and all groups with worse scores
+        starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate([[0], starts]) if len(keys) else starts
+        qvalues = np.minimum.reduceat(self.fdr, starts)
+        qvalues = np.minimum.accumulate(qvalues[::-1])[::-1]
+        # Set the FDR to 1 for the lowest score (see `tdc`)
+        if len(qvalues):
+            qvalues[qvalues == qvalues[-1]] = 1.0
+
+        self.perm = perm
+        self.qvalues = qvalues
+        self.group_sizes = np.diff(np.append(starts, len(keys)))
+        self.group_targets = np.add.reduceat(target, starts, dtype=int)
+        return True
+
+
+@typechecked
+class StreamingTdc:
+    """Exact target decoy competition over chunks of score-sorted data.
+
+    This gives the same q-values as `tdc` for data that is too large to be
+    held in memory, provided it is sorted by score (best first) and read
+    twice in the same order:
+
+    1. Pass the chunks to `add`, which collects the number of targets and
+       decoys for each group of tied scores. Only these counts are kept.
+    2. Call `finalize`, which computes the FDRs of the groups and takes the
+       running minimum from the worst group upwards.
+    3. Pass the chunks again to `qvalues`, which returns the q-values of
+       the entries of each chunk.
+
+    Parameters
+    ----------
+    desc : bool
+        Are higher scores better? `True` indicates that they are,
+        `False` indicates that they are not.
+    """
+
+    def __init__(self, desc: bool = True):
+        self.desc = desc
+        self.qvalues_by_group = None
+        self._target_counts = []
+        self._decoy_counts = []
+        self._last_key = None
+        self._last_group = -1
+
+    def __repr__(self):
+        return f"StreamingTdc({self.desc=},{len(self._target_counts)=})"
+
+    def _group_starts(self, scores: np.ndarray) -> np.ndarray:
+        # Flag the entries that start a new group of tied scores. Scores are
+        # compared as float32, just as in `tdc`
+        keys = scores.astype(np.float32)
+        if self.desc:
+            keys = -keys
+        if len(keys) == 0:
+            return np.zeros(0, dtype=bool)
+        if not np.all(keys[1:] >= keys[:-1]) or (
+            self._last_key is not None and not keys[0] >= self._last_key
+        ):
+            order = "descending" if self.desc else "ascending"
+            raise ValueError(
+                f"Scores must be sorted in {order} order and must not be NaN."
+            )
+        starts = np.empty(len(keys), dtype=bool)
+        starts[0] = self._last_key is None or keys[0] != self._last_key
+        np.not_equal(keys[1:], keys[:-1], out=starts[1:])
+        self._last_key = keys[-1]
+        return starts
+
+    def add(self, scores: np.ndarray, targets: np.ndarray):
+        """Count the targets and decoys of a chunk (first pass).
+
+        Parameters
+        ----------
+        scores : numpy.ndarray of float
+            The scores of the chunk.
+        targets : numpy.ndarray of bool
+            Whether each entry of the chunk is a target.
+        """
+        if self.qvalues_by_group is not None:
+            raise RuntimeError("Data cannot be added after `finalize`.")
+        targets = _check_target(targets)
+        if scores.shape[0] != targets.shape[0]:
+            raise ValueError("'scores' and 'target' must be the same length")
+        starts = self._group_starts(scores)
+        if len(starts) == 0:
+            return
+
+        idx = np.flatnonzero(starts)
+        if len(idx) == 0 or idx[0] != 0:
+            # The first group continues the last one of the previous chunk
+            idx = np.concatenate([[0], idx])
+            continued = True
+        else:
+            continued = False
+        group_targets = np.add.reduceat(targets, idx, dtype=np.int64)
+        group_sizes = np.diff(np.append(idx, len(targets)))
+        group_decoys = group_sizes - group_targets
+        if continued:
+            self._target_counts[-1][-1] += group_targets[0]
+            self._decoy_counts[-1][-1] += group_decoys[0]
+            group_targets = group_targets[1:]
+            group_decoys = group_decoys[1:]
+        if len(group_targets):
+            self._target_counts.append(group_targets)
+            self._decoy_counts.append(group_decoys)
+
+    def update_from_iterator(
+        self, score_target_iterator: Iterator
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Add all chunks of an iterator, passing them on unchanged.
+
+        This allows to count the targets and decoys while the chunks are
+        consumed for something else (e.g. a histogram).
+
+        Parameters
+        ----------
+        score_target_iterator:
+            An iterator that yields tuples of scores and targets.
+        """
+        for scores, targets in score_target_iterator:
+            self.add(scores, targets)
+            yield scores, targets
+
+    def finalize(self):
+        """Compute the q-values of all groups of tied scores."""
+        empty = np.zeros(0, dtype=np.int64)
+        target_counts = np.concatenate([empty, *self._target_counts])
+        decoy_counts = np.concatenate([empty, *self._decoy_counts])
+        self._target_counts = [target_counts]
+        self._decoy_counts = [decoy_counts]
+
+        # In `tdc`, tied scores are ranked decoys first. So the lowest FDR
+        # of a group is either at its first decoy or at its last target
+        cum_targets = np.cumsum(target_counts)
+        cum_decoys = np.cumsum(decoy_counts)
+        targets_before = cum_targets - target_counts
+        decoys_before = cum_decoys - decoy_counts
+
+        def fdr(num_decoys, num_targets, valid):
+            # Same arithmetic as in `tdc`
+            out = np.ones_like(num_targets, dtype=np.float32)
+            np.divide(
+                num_decoys + 1,
+                num_targets,
+                out=out,
+                where=(num_targets != 0),
+            )
+            # Groups without decoys (or targets) have no such candidate
+            out[~valid] = 1.0
+            return np.minimum(out, 1.0)
+
+        fdr_first_decoy = fdr(
+            decoys_before + 1, targets_before, decoy_counts > 0
+        )
+        fdr_last_target = fdr(cum_decoys, cum_targets, target_counts > 0)
+        qvalues = np.minimum(fdr_first_decoy, fdr_last_target)
+        qvalues = np.minimum.accumulate(qvalues[::-1])[::-1]
+        # Set the FDR to 1 for the lowest score (see `tdc`)
+        if len(qvalues):
+            qvalues[qvalues == qvalues[-1]] = 1.0
+
+        self.qvalues_by_group = qvalues
+        self._last_key = None
+        self._last_group = -1
+
+    def num_passing_targets(self, eval_fdr: float) -> int:
+        """The number of targets with a q-value of at most `eval_fdr`."""
+        passing = self.qvalues_by_group <= eval_fdr
+        return int(self._target_counts[0][passing].sum())
+
+    def qvalues(self, scores: np.ndarray) -> np.ndarray:
+        """Get the q-values of a chunk (second pass).
+
+        The chunks must be the same as in the first pass, in the same order.
+
+        Parameters
+        ----------
+        scores : numpy.ndarray of float
+            The scores of the chunk.
+
+        Returns
+        -------
+        numpy.ndarray
+            The q-values of the entries of the chunk.
+        """
+        if self.qvalues_by_group is None:
+            raise RuntimeError("`finalize` must be called first.")
+        starts = self._group_starts(scores)
+        groups = self._last_group + np.cumsum(starts)
+        if len(groups):
+            self._last_group = groups[-1]
+        return self.qvalues_by_group[groups]
+
+
 @typechecked
 def qvalues_from_scores(
     scores: np.ndarray[float],
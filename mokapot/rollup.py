@@ -1,15 +1,21 @@
 import logging
+from functools import partial
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 from typeguard import typechecked
 
 from mokapot.cli_helper import make_timer
 from mokapot.column_defs import STANDARD_COLUMN_NAME_MAP
-from mokapot.confidence import compute_and_write_confidence
+from mokapot.confidence import (
+    compute_and_write_confidence,
+    estimate_level_memory,
+    level_max_workers,
+)
+from mokapot.level_scheduler import run_level_tasks
 from mokapot.statistics import OnlineStatistics
 from mokapot.tabular_data import (
-    BufferType,
     ComputedTabularDataReader,
     MergedTabularDataReader,
     TabularDataReader,
@@ -18,6 +24,7 @@ from mokapot.tabular_data import (
     remove_columns,
 )
 from mokapot.tabular_data.target_decoy_writer import TargetDecoyWriter
+from mokapot.utils import SeenHashes, hash_rows
 
 
 @typechecked
@@ -48,6 +55,44 @@ def get_target_decoy_reader(path: Path, is_decoy: bool):
     )
 
 
+@typechecked
+def find_new_rows(
+    chunk: pd.DataFrame,
+    levels: list[str],
+    seen_entities: dict[str, SeenHashes],
+) -> dict[str, np.ndarray]:
+    """Find the rows of a chunk with entities that have not been seen yet.
+
+    The chunks must be passed in order of descending score (e.g. as returned
+    by a `MergedTabularDataReader`), so that the first row of an entity is
+    also its best scoring one. The entities of the chunk are added to
+    `seen_entities`. The entities are looked up by their 64-bit hashes, but
+    compared by their actual values whenever a hash was seen before, so a
+    hash collision cannot drop an entity.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        The next PSMs in order of descending score.
+    levels : list[str]
+        The level columns, which identify the entities of each level.
+    seen_entities : dict[str, SeenHashes]
+        For each level, the entities seen so far, in an exact `SeenHashes`.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        For each level, the indices of the first row of every new entity, in
+        the order of the chunk.
+    """
+    return {
+        level: seen_entities[level].add_new(
+            hash_rows(chunk.loc[:, [level]]), keys=chunk[level].to_numpy()
+        )
+        for level in levels
+    }
+
+
 DEFAULT_PARENT_LEVELS = {
     "precursor": "psm",
     "modified_peptide": "precursor",
@@ -145,17 +190,11 @@ def do_rollup(config):
     )
 
     # Configure temp writers
-    merge_row_type = BufferType.Dicts
-
-    temp_buffer_size = 1000
-
     temp_writers = {
         level: TabularDataWriter.from_suffix(
             temp_files[level],
             columns=temp_column_names,
             column_types=temp_column_types,
-            buffer_size=temp_buffer_size,
-            buffer_type=merge_row_type,
         )
         for level in levels
     }
@@ -171,39 +210,27 @@ def do_rollup(config):
 
     timer = make_timer()
     score_stats = OnlineStatistics()
+    seen_entities = {level: SeenHashes(exact=True) for level in levels}
     with auto_finalize(temp_writers.values()):
         count = 0
-        seen_entities: dict[str, set] = {level: set() for level in levels}
-        for data_row in reader.get_row_iterator(
-            temp_column_names, row_type=merge_row_type
-        ):
-            count += 1
-            if count % 10000 == 0:
-                logging.debug(
-                    f"  Processed {count} lines ({timer():.2f} seconds)"
-                )
-
+        for chunk in reader.get_merged_batch_iterator(temp_column_names):
+            count += len(chunk)
+            logging.debug(f"  Processed {count} lines ({timer():.2f} seconds)")
+            new_rows = find_new_rows(chunk, levels, seen_entities)
             for level in levels:
-                seen = seen_entities[level]
-                id_col = level
-                if merge_row_type == BufferType.DataFrame:
-                    id = data_row.loc[0, id_col]
-                else:
-                    id = data_row[id_col]
-                if id not in seen:
-                    seen.add(id)
-                    temp_writers[level].append_data(data_row)
-
-            score_stats.update_single(
-                data_row[STANDARD_COLUMN_NAME_MAP["score"]]
+                temp_writers[level].append_data(
+                    chunk.take(new_rows[level]).reset_index(drop=True)
+                )
+            score_stats.update(
+                chunk[STANDARD_COLUMN_NAME_MAP["score"]].to_numpy(dtype=float)
             )
 
         logging.info(f"Read {count} PSMs")
         logging.debug(f"Score statistics: {score_stats.describe()}")
         for level in levels:
-            seen = seen_entities[level]
             logging.info(
-                f"Rollup level {level}: found {len(seen)} unique entities"
+                f"Rollup level {level}: found {len(seen_entities[level])} "
+                "unique entities"
             )
 
     # Determine output files
@@ -229,7 +256,7 @@ def do_rollup(config):
     def create_writer(path: Path):
         return TabularDataWriter.from_suffix(path, **output_options)
 
-    for level in levels:
+    def rollup_level(level):
         output_writers = list(map(create_writer, out_files_map[level]))
         writer = TargetDecoyWriter(
             output_writers, write_decoys=True, decoy_column="is_decoy"
@@ -247,3 +274,16 @@ def do_rollup(config):
                 level=level,
                 eval_fdr=0.01,
             )
+
+    run_level_tasks(
+        {level: partial(rollup_level, level) for level in levels},
+        max_workers=level_max_workers(
+            config.max_workers, config.peps_algorithm
+        ),
+        memory_estimates={
+            level: estimate_level_memory(
+                temp_files[level], config.stream_confidence
+            )
+            for level in levels
+        },
+    )
@@ -1,10 +1,16 @@
+from __future__ import annotations
+
+import json
 import math
 from collections import namedtuple
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from pathlib import Path
 
 import numpy as np
 from typeguard import typechecked
 
+from mokapot.constants import QUANTILE_SKETCH_SIZE
+
 SummaryStatistics = namedtuple(
     "SummaryStatistics", ("n", "min", "max", "sum", "mean", "var", "sd")
 )
@@ -103,6 +109,67 @@ class OnlineStatistics:
             self.n, self.min, self.max, self.sum, self.mean, self.var, self.sd
         )
 
+    def merge(self, other: OnlineStatistics) -> None:
+        """
+        Update the statistics with those of another set of values.
+
+        The variance is merged with the parallel algorithm of Chan et al.
+        (see e.g.
+        https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm),
+        so statistics can be computed for parts of the data independently
+        (e.g. per file or per worker) and merged afterwards. Merging is
+        associative and commutative (up to rounding).
+
+        Parameters
+        ----------
+        other : OnlineStatistics
+            The statistics to merge into these ones.
+        """  # noqa: E501
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.M2n += other.M2n + delta * delta * self.n * other.n / n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.n = n
+        self.sum += other.sum
+        self.mean = self.sum / self.n
+
+    @staticmethod
+    def combine(*stats: OnlineStatistics) -> OnlineStatistics:
+        """Merge any number of statistics into a new object."""
+        unbiased = stats[0].unbiased if stats else True
+        combined = OnlineStatistics(unbiased=unbiased)
+        for other in stats:
+            combined.merge(other)
+        return combined
+
+    def to_dict(self) -> dict:
+        """Convert the statistics into a dict of plain python values."""
+        data = asdict(self)
+        data["n"] = int(data["n"])
+        for key in ["min", "max", "sum", "mean", "M2n", "ddof"]:
+            data[key] = float(data[key])
+        data["unbiased"] = bool(data["unbiased"])
+        return data
+
+    @staticmethod
+    def from_dict(data: dict) -> OnlineStatistics:
+        """Create statistics from a dict written by `to_dict`."""
+        return OnlineStatistics(**data)
+
+    def save(self, path: Path) -> None:
+        """Write the statistics to a (small) JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @staticmethod
+    def load(path: Path) -> OnlineStatistics:
+        """Read statistics from a file written by `save`."""
+        with open(path) as f:
+            return OnlineStatistics.from_dict(json.load(f))
+
 
 @typechecked
 @dataclass(slots=True)
@@ -175,6 +242,259 @@ class HistData:
         return bin_edges
 
 
+@typechecked
+class QuantileSketch:
+    """A streaming sketch of the distribution of values.
+
+    This is a deterministic variant of the KLL sketch (Karnin, Lang and
+    Liberty, 2016). Values are collected in blocks of `k`. A full block is
+    sorted and compacted: every other value is kept (alternating between
+    the even and the odd ones) and passed on to the next level with twice
+    the weight, where it is collected and compacted in the same way. With
+    `L` levels, the rank error of any quantile is at most `L * n / k`, and
+    usually much smaller, as the errors of the compactions mostly cancel.
+    The memory needed is O(k log(n / k)).
+
+    The content of the sketch only depends on the sequence of values, not
+    on how they were chunked. The exact minimum and maximum are kept as
+    well.
+
+    Parameters
+    ----------
+    k : int, optional
+        The block size (must be even). Can be set with the
+        `MOKAPOT_QUANTILE_SKETCH_SIZE` environment variable.
+    """
+
+    def __init__(self, k: int = QUANTILE_SKETCH_SIZE):
+        if k < 2 or k % 2:
+            raise ValueError(f"The block size must be even and >= 2 ({k=})")
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels: list[np.ndarray] = []
+        self._num_compactions: list[int] = []
+
+    def __repr__(self):
+        return (
+            f"QuantileSketch({self.k=},{self.n=},{self.min=},{self.max=},"
+            f"{len(self.levels)=})"
+        )
+
+    def update(self, vals: np.ndarray) -> None:
+        """
+        Update the sketch with an array of values.
+
+        Parameters
+        ----------
+        vals : np.ndarray
+            The array of values to update the sketch with.
+        """
+        vals = np.asarray(vals, dtype=float).ravel()
+        if len(vals) == 0:
+            return
+        self.n += len(vals)
+        self.min = min(self.min, float(vals.min()))
+        self.max = max(self.max, float(vals.max()))
+        self._add(0, vals)
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Update the sketch with the values of another sketch."""
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for level, vals in enumerate(other.levels):
+            self._add(level, vals)
+
+    def _add(self, level: int, vals: np.ndarray) -> None:
+        k = self.k
+        while len(vals):
+            if level == len(self.levels):
+                self.levels.append(np.zeros(0))
+                self._num_compactions.append(0)
+            vals = np.concatenate([self.levels[level], vals])
+            num_blocks = len(vals) // k
+            self.levels[level] = vals[num_blocks * k :]
+            blocks = np.sort(vals[: num_blocks * k].reshape(-1, k), axis=1)
+
+            # Keep every other value of each block, starting alternately with
+            # the first and the second one
+            offsets = self._num_compactions[level] + np.arange(num_blocks)
+            self._num_compactions[level] += num_blocks
+            idx = (offsets % 2)[:, None] + np.arange(0, k, 2)[None, :]
+            vals = np.take_along_axis(blocks, idx, axis=1).ravel()
+            level += 1
+
+    def weighted_values(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the sorted values in the sketch and their weights.
+
+        The weights sum up to the number of values added to the sketch.
+        """
+        values = np.concatenate([np.zeros(0), *self.levels])
+        weights = np.concatenate([
+            np.zeros(0),
+            *(
+                np.full(len(vals), 2.0**h)
+                for h, vals in enumerate(self.levels)
+            ),
+        ])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def quantiles(self, probs: np.ndarray) -> np.ndarray:
+        """Estimate the quantiles of the values for the given probabilities.
+
+        The quantiles for the probabilities 0 and 1 are the exact minimum
+        and maximum.
+        """
+        values, weights = self.weighted_values()
+        return _weighted_quantiles(values, weights, probs, self.min, self.max)
+
+    def cdf(self, x: np.ndarray) -> np.ndarray:
+        """Estimate the fraction of values less than or equal to `x`."""
+        values, weights = self.weighted_values()
+        cum_weights = np.concatenate([[0.0], np.cumsum(weights)])
+        idx = np.searchsorted(values, x, side="right")
+        return cum_weights[idx] / max(self.n, 1)
+
+
+@typechecked
+class TDQuantileSketch:
+    """Quantile sketches of the scores of targets and decoys.
+
+    Parameters
+    ----------
+    k : int, optional
+        The block size of the sketches (see `QuantileSketch`).
+    """
+
+    def __init__(self, k: int = QUANTILE_SKETCH_SIZE):
+        self.targets = QuantileSketch(k)
+        self.decoys = QuantileSketch(k)
+
+    def __repr__(self):
+        return f"TDQuantileSketch({self.targets=},{self.decoys=})"
+
+    def update(self, scores: np.ndarray, targets: np.ndarray) -> None:
+        """Update the sketches with the scores of targets and decoys."""
+        self.targets.update(scores[targets])
+        self.decoys.update(scores[~targets])
+
+    def merge(self, other: TDQuantileSketch) -> None:
+        """Update the sketches with the values of other sketches."""
+        self.targets.merge(other.targets)
+        self.decoys.merge(other.decoys)
+
+    def get_bin_edges(
+        self,
+        eval_fdr: float = 0.01,
+        clip: tuple[int, int] | None = (50, 500),
+        tail: float = 0.001,
+        num_tail_bins: int = 5,
+    ) -> np.ndarray:
+        """Compute bin edges that adapt to the distribution of the scores.
+
+        The bins have equal widths in the core of the score distribution,
+        which is the range between the `tail` and `1 - tail` quantiles of
+        all scores, extended to the scores where the q-values (estimated
+        from the sketches) are between `eval_fdr / 4` and `4 * eval_fdr`.
+        The width follows Scott's rule, with the standard deviation
+        estimated from the interquartile range, so a few extreme scores
+        neither widen the bins nor stretch them over empty ranges. Each of
+        the two tails is split into `num_tail_bins` bins with equal numbers
+        of scores.
+
+        Parameters
+        ----------
+        eval_fdr : float, optional
+            The FDR threshold that is most relevant.
+        clip : tuple[int, int] | None, optional
+            The minimum number of bins over the whole range of scores and
+            the maximum number of bins in the core.
+        tail : float, optional
+            The fraction of scores in each tail.
+        num_tail_bins : int, optional
+            The number of bins in each tail.
+
+        Returns
+        -------
+        np.ndarray
+            The sorted and unique bin edges, spanning all scores.
+        """
+        num_scores = self.targets.n + self.decoys.n
+        lo = min(self.targets.min, self.decoys.min)
+        hi = max(self.targets.max, self.decoys.max)
+        if num_scores == 0:
+            lo = hi = 0.0
+        if not lo < hi:
+            return np.array([lo - 0.5, hi + 0.5])
+
+        target_values, target_weights = self.targets.weighted_values()
+        decoy_values, decoy_weights = self.decoys.weighted_values()
+        values = np.concatenate([target_values, decoy_values])
+        weights = np.concatenate([target_weights, decoy_weights])
+        order = np.argsort(values, kind="stable")
+
+        def quantiles(probs):
+            return _weighted_quantiles(
+                values[order], weights[order], np.asarray(probs), lo, hi
+            )
+
+        q25, q75, core_lo, core_hi = quantiles([0.25, 0.75, tail, 1 - tail])
+
+        # Estimate the q-values at the target scores, from the best down
+        target_values = target_values[::-1]
+        num_targets = np.cumsum(target_weights[::-1])
+        decoy_cum_weights = np.concatenate([[0.0], np.cumsum(decoy_weights)])
+        num_decoys = (
+            decoy_cum_weights[-1]
+            - decoy_cum_weights[
+                np.searchsorted(decoy_values, target_values, side="left")
+            ]
+        )
+        qvalues = (num_decoys + 1) / num_targets
+        qvalues = np.minimum.accumulate(qvalues[::-1])[::-1]
+        for fdr in (4 * eval_fdr, eval_fdr / 4):
+            accepted = np.flatnonzero(qvalues <= fdr)
+            if len(accepted):
+                threshold = target_values[accepted[-1]]
+                core_lo = min(core_lo, threshold)
+                core_hi = max(core_hi, threshold)
+
+        # Scott's rule with a robust estimate of the standard deviation
+        sd = (q75 - q25) / 1.349
+        bin_size = (
+            (24 * 24 * np.pi) ** (1.0 / 6.0) * sd * num_scores ** (-1.0 / 3.0)
+        )
+        if bin_size > 0 and core_lo < core_hi:
+            num_bins = int(np.ceil((core_hi - core_lo) / bin_size))
+        else:
+            num_bins = 1
+        if clip is not None:
+            # The minimum number of bins applies to the whole range of scores
+            min_bins = np.ceil(clip[0] * (core_hi - core_lo) / (hi - lo))
+            num_bins = int(np.clip(num_bins, max(min_bins, 1), clip[1]))
+
+        edges = [
+            np.linspace(core_lo, core_hi, num_bins + 1),
+            quantiles(np.linspace(0, tail, num_tail_bins + 1)),
+            quantiles(np.linspace(1 - tail, 1, num_tail_bins + 1)),
+        ]
+        return np.unique(np.concatenate(edges))
+
+
+def _weighted_quantiles(values, weights, probs, lo, hi):
+    cum_weights = np.cumsum(weights)
+    if len(cum_weights) == 0:
+        return np.where(probs < 1, lo, hi)
+    idx = np.searchsorted(cum_weights, probs * cum_weights[-1], side="left")
+    quantiles = values[np.minimum(idx, len(values) - 1)]
+    quantiles[probs <= 0] = lo
+    quantiles[probs >= 1] = hi
+    return quantiles
+
+
 def gaussian_iqr(mu: float, sigma: float) -> tuple[float, float]:
     # Quartiles for the standard normal distribution are about +-0.67.
     # Get the exact value with `scipy.stats.norm.isf(0.25)`.
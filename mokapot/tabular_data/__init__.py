@@ -1,3 +1,4 @@
+from .arrow_ipc import ArrowIpcFileReader, ArrowIpcFileWriter
 from .base import (
     BufferType,
     ColumnMappedReader,
@@ -17,3 +18,4 @@ from .streaming import (
     JoinedTabularDataReader,
     MergedTabularDataReader,
 )
+from .traditional_pin import TraditionalPinReader
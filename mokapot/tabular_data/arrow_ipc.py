@@ -0,0 +1,177 @@
+from pathlib import Path
+from typing import Generator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typeguard import typechecked
+
+from mokapot.tabular_data.base import TabularDataReader, TabularDataWriter
+
+
+@typechecked
+class ArrowIpcFileWriter(TabularDataWriter):
+    """
+    This class is responsible for writing tabular data into Arrow IPC files.
+
+    Arrow IPC files store the data in the in-memory layout of arrow, which
+    makes writing and (memory mapped) reading them back very cheap. This is
+    the format used for temporary files, e.g. the runs of an external sort.
+
+    Attributes:
+    -----------
+    file_name : Path
+        The path to the Arrow IPC file being written.
+    compression : str | None
+        The buffer compression to use ("lz4", "zstd" or None).
+    """
+
+    file_name: Path
+
+    def __init__(
+        self,
+        file_name: Path,
+        columns: list[str],
+        column_types: list[np.dtype],
+        compression: str | None = None,
+    ):
+        super().__init__(columns, column_types)
+        self.file_name = file_name
+        self.compression = compression
+        self.writer = None
+        self.schema = None
+
+    def __str__(self):
+        return f"ArrowIpcFileWriter({self.file_name=},{self.columns=})"
+
+    def __repr__(self):
+        return f"ArrowIpcFileWriter({self.file_name=},{self.columns=})"
+
+    @staticmethod
+    def _from_numpy_dtype(type):
+        if type == "object":
+            return pa.string()
+        elif isinstance(type, np.dtype):
+            return pa.from_numpy_dtype(type)
+        else:
+            # Pandas extension types (e.g. categoricals) are converted the
+            # same way as in `pa.Table.from_pandas`, except that categoricals
+            # are stored by their values (as if they were read from a file)
+            schema = pa.Schema.from_pandas(
+                pd.DataFrame({"column": pd.Series(dtype=type)}),
+                preserve_index=False,
+            )
+            arrow_type = schema.field("column").type
+            if pa.types.is_dictionary(arrow_type):
+                arrow_type = arrow_type.value_type
+            return arrow_type
+
+    def _get_schema(self):
+        schema = [
+            (name, ArrowIpcFileWriter._from_numpy_dtype(type))
+            for name, type in zip(self.columns, self.column_types)
+        ]
+        return pa.schema(schema)
+
+    def initialize(self):
+        if self.writer is not None:
+            return
+        if self.column_types is None or len(self.column_types) == 0:
+            # The schema is inferred from the first dataframe appended
+            return
+        self.schema = self._get_schema()
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        self.writer = pa.ipc.new_file(
+            str(self.file_name), self.schema, options=options
+        )
+
+    def finalize(self):
+        if self.writer is None:
+            # Nothing has been written, but we still want a valid file
+            if self.column_types is None or len(self.column_types) == 0:
+                self.column_types = [np.dtype("object")] * len(self.columns)
+            self.initialize()
+        self.writer.close()
+
+    def append_data(self, data: pd.DataFrame):
+        if self.writer is None:
+            if self.column_types is None or len(self.column_types) == 0:
+                self.column_types = data.loc[:, self.columns].dtypes.to_list()
+            self.initialize()
+
+        table = pa.Table.from_pandas(
+            data.loc[:, self.columns], preserve_index=False, schema=self.schema
+        )
+        self.writer.write_table(table)
+
+    def write(self, data: pd.DataFrame):
+        self.initialize()
+        self.append_data(data)
+        self.finalize()
+
+    def get_associated_reader(self):
+        return ArrowIpcFileReader(self.file_name)
+
+    def read(self) -> pd.DataFrame:
+        return self.get_associated_reader().read()
+
+
+@typechecked
+class ArrowIpcFileReader(TabularDataReader):
+    """
+    A class for reading Arrow IPC files and retrieving data in tabular format.
+
+    The files are memory mapped, so that reading them chunk-wise only keeps
+    the current chunk in memory.
+
+    Attributes:
+    -----------
+    file_name : Path
+        The path to the Arrow IPC file.
+    """
+
+    def __init__(self, file_name: Path):
+        self.file_name = file_name
+
+    def __str__(self):
+        return f"ArrowIpcFileReader({self.file_name=})"
+
+    def __repr__(self):
+        return f"ArrowIpcFileReader({self.file_name=})"
+
+    def _get_schema(self) -> pa.Schema:
+        with pa.memory_map(str(self.file_name), "r") as source:
+            return pa.ipc.open_file(source).schema
+
+    def get_column_names(self) -> list[str]:
+        return self._get_schema().names
+
+    def get_column_types(self) -> list[np.dtype]:
+        types = self._get_schema().types
+        return [np.dtype(type.to_pandas_dtype()) for type in types]
+
+    def read(self, columns: list[str] | None = None) -> pd.DataFrame:
+        with pa.memory_map(str(self.file_name), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            return table.to_pandas()
+
+    def get_chunked_data_iterator(
+        self, chunk_size: int, columns: list[str] | None = None
+    ) -> Generator[pd.DataFrame, None, None]:
+        with pa.memory_map(str(self.file_name), "r") as source:
+            ipc_file = pa.ipc.open_file(source)
+            offset = 0
+            for i in range(ipc_file.num_record_batches):
+                batch = ipc_file.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_size):
+                    df = batch.slice(start, chunk_size).to_pandas()
+                    df.index += offset
+                    offset += len(df)
+                    yield df
+
+    def get_default_extension(self) -> str:
+        return ".arrow"
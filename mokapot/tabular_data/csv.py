@@ -4,6 +4,8 @@ from typing import Generator
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from typeguard import typechecked
 
 from mokapot.tabular_data import TabularDataReader, TabularDataWriter
@@ -28,9 +30,13 @@ class CSVFileReader(TabularDataReader):
             `read_csv` function.
     """
 
+    # Bytes of the file parsed at once by `get_arrow_batch_iterator`
+    ARROW_BLOCK_SIZE = 1 << 24
+
     def __init__(self, file_name: Path, sep: str = "\t"):
         self.file_name = file_name
         self.stdargs = {"sep": sep, "index_col": False}
+        self._header = None
 
     def __str__(self):
         return f"CSVFileReader({self.file_name=})"
@@ -38,13 +44,17 @@ class CSVFileReader(TabularDataReader):
     def __repr__(self):
         return f"CSVFileReader({self.file_name=},{self.stdargs=})"
 
+    def _get_header(self) -> pd.DataFrame:
+        # The header is only read once
+        if self._header is None:
+            self._header = pd.read_csv(self.file_name, **self.stdargs, nrows=2)
+        return self._header
+
     def get_column_names(self) -> list[str]:
-        df = pd.read_csv(self.file_name, **self.stdargs, nrows=0)
-        return df.columns.tolist()
+        return self._get_header().columns.tolist()
 
     def get_column_types(self) -> list[np.dtype]:
-        df = pd.read_csv(self.file_name, **self.stdargs, nrows=2)
-        return df.dtypes.tolist()
+        return self._get_header().dtypes.tolist()
 
     def read(self, columns: list[str] | None = None) -> pd.DataFrame:
         result = pd.read_csv(self.file_name, usecols=columns, **self.stdargs)
@@ -61,6 +71,49 @@ class CSVFileReader(TabularDataReader):
         ):
             yield chunk if columns is None else chunk[columns]
 
+    def get_arrow_batch_iterator(
+        self, columns: list[str], column_types: dict[str, pa.DataType]
+    ) -> Generator[pa.RecordBatch, None, None]:
+        """Read columns as arrow record batches with an explicit schema.
+
+        The file is parsed with pyarrow's multithreaded CSV reader, which
+        converts each column straight to the given type (e.g. float32 or a
+        dictionary type for repeated strings). This is currently only used
+        to scan PIN files for missing values and spectra (see
+        `mokapot.parsers.pin.scan_features_and_spectra`); `read` and
+        `get_chunked_data_iterator` still parse with pandas and its default
+        dtypes.
+
+        Parameters
+        ----------
+        columns : list[str]
+            The columns to read.
+        column_types : dict[str, pyarrow.DataType]
+            The type of the columns. Columns without a type are inferred.
+
+        Raises
+        ------
+        pyarrow.ArrowInvalid
+            If a row has a different number of fields than the header or a
+            value cannot be converted to the type of its column.
+        """
+        read_options = pa_csv.ReadOptions(
+            use_threads=True, block_size=self.ARROW_BLOCK_SIZE
+        )
+        parse_options = pa_csv.ParseOptions(delimiter=self.stdargs["sep"])
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types=column_types,
+            strings_can_be_null=True,
+        )
+        with pa_csv.open_csv(
+            self.file_name,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options,
+        ) as reader:
+            yield from reader
+
     def get_default_extension(self) -> str:
         return ".tsv"
 
@@ -0,0 +1,231 @@
+import logging
+from pathlib import Path
+
+import pandas as pd
+from joblib import Parallel, delayed
+from typeguard import typechecked
+
+from mokapot.constants import (
+    EXTERNAL_SORT_MAX_FAN_IN,
+    EXTERNAL_SORT_MEMORY_BUDGET,
+)
+from mokapot.tabular_data.arrow_ipc import (
+    ArrowIpcFileReader,
+    ArrowIpcFileWriter,
+)
+from mokapot.tabular_data.streaming import MergedTabularDataReader
+
+LOGGER = logging.getLogger(__name__)
+
+
+@typechecked
+class ExternalSorter:
+    """
+    Sorts tabular data that does not fit into memory by a priority column.
+
+    Chunks passed to `add` are collected in memory until `memory_budget`
+    bytes are reached. They are then sorted and spilled to disk as one sorted
+    run (an Arrow IPC file). When all data has been added, the runs are merged
+    in passes of at most `max_fan_in` runs each, until at most `max_fan_in`
+    runs remain. Those are merged on the fly by the reader returned from
+    `get_sorted_reader`. Rows with equal priority keep the order in which
+    they were added.
+
+    Attributes:
+    -----------
+    dest_dir : Path
+        The directory in which the runs are stored.
+    priority_column : str
+        The column to sort by.
+    descending : bool
+        Whether to sort in descending order (default: True).
+    memory_budget : int
+        The approximate number of bytes to use for buffering rows, both when
+        creating the runs and when merging them.
+    max_fan_in : int
+        The maximum number of runs merged at once.
+    deduplication_columns : list[str] | tuple[str, ...] | None
+        If given, only the first row (after sorting) for each combination of
+        values in those columns is kept within each run.
+    file_prefix : str
+        A prefix for the names of the run files.
+    max_workers : int
+        The number of merges that may run concurrently in a merge pass.
+    """
+
+    def __init__(
+        self,
+        dest_dir: Path,
+        priority_column: str,
+        descending: bool = True,
+        memory_budget: int = EXTERNAL_SORT_MEMORY_BUDGET,
+        max_fan_in: int = EXTERNAL_SORT_MAX_FAN_IN,
+        deduplication_columns: list[str] | tuple[str, ...] | None = None,
+        file_prefix: str = "",
+        max_workers: int = 1,
+    ):
+        if max_fan_in < 2:
+            raise ValueError(
+                f"`max_fan_in` must be at least 2 ({max_fan_in=})"
+            )
+
+        self.dest_dir = dest_dir
+        self.priority_column = priority_column
+        self.descending = descending
+        self.memory_budget = memory_budget
+        self.max_fan_in = max_fan_in
+        self.deduplication_columns = deduplication_columns
+        self.file_prefix = file_prefix
+        self.max_workers = max_workers
+
+        self.columns = None
+        self.column_types = None
+        self.runs: list[Path] = []
+        self.buffer: list[pd.DataFrame] = []
+        self.buffer_bytes = 0
+        self.row_bytes = 1.0
+        self._num_files = 0
+
+    def __repr__(self):
+        return (
+            f"ExternalSorter({self.dest_dir=},{self.priority_column=},"
+            f"{self.memory_budget=},{self.max_fan_in=},{len(self.runs)=})"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+
+    def _new_run_path(self) -> Path:
+        path = (
+            self.dest_dir
+            / f"{self.file_prefix}sort_run_{self._num_files}.arrow"
+        )
+        self._num_files += 1
+        return path
+
+    def _reader_chunk_size(self, num_readers: int) -> int:
+        # Every reader buffers one chunk, and a merged batch can hold up to
+        # as many rows as all of those buffers together
+        budget_rows = self.memory_budget / (self.row_bytes * self.max_workers)
+        return max(1, int(budget_rows / (2 * num_readers)))
+
+    def add(self, chunk: pd.DataFrame):
+        """Add a chunk of (unsorted) rows."""
+        if self.columns is None:
+            self.columns = chunk.columns.tolist()
+            self.column_types = chunk.dtypes.tolist()
+        elif chunk.columns.tolist() != self.columns:
+            raise ValueError(
+                f"Column names {chunk.columns.tolist()} do not "
+                f"match {self.columns}"
+            )
+
+        self.buffer.append(chunk)
+        self.buffer_bytes += chunk.memory_usage(index=False, deep=True).sum()
+        if self.buffer_bytes >= self.memory_budget:
+            self._spill()
+
+    def _spill(self):
+        if len(self.buffer) == 0:
+            return
+        data = pd.concat(self.buffer, ignore_index=True)
+        data_bytes = self.buffer_bytes
+        self.buffer = []
+        self.buffer_bytes = 0
+        if len(data) == 0:
+            return
+        self.row_bytes = max(data_bytes / len(data), 1.0)
+
+        data.sort_values(
+            by=self.priority_column,
+            ascending=not self.descending,
+            kind="stable",
+            inplace=True,
+        )
+        if self.deduplication_columns is not None:
+            try:
+                data.drop_duplicates(self.deduplication_columns, inplace=True)
+            except KeyError as e:
+                msg = "Duplication error trying to use the following columns: "
+                msg += str(self.deduplication_columns)
+                msg += f". Found: {data.columns} "
+                msg += ". Please check the input data."
+                raise KeyError(msg) from e
+
+        run_path = self._new_run_path()
+        writer = ArrowIpcFileWriter(run_path, self.columns, self.column_types)
+        writer.write(data)
+        self.runs.append(run_path)
+        LOGGER.debug(
+            "Spilled sorted run of %i rows to %s", len(data), run_path
+        )
+
+    def _merge_runs(self, runs: list[Path], run_path: Path) -> Path:
+        reader = MergedTabularDataReader(
+            [ArrowIpcFileReader(path) for path in runs],
+            priority_column=self.priority_column,
+            descending=self.descending,
+            reader_chunk_size=self._reader_chunk_size(len(runs)),
+        )
+        writer = ArrowIpcFileWriter(run_path, self.columns, self.column_types)
+        with writer:
+            for batch in reader.get_merged_batch_iterator():
+                writer.append_data(batch)
+        for path in runs:
+            path.unlink(missing_ok=True)
+        return run_path
+
+    def _merge_pass(self):
+        groups = [
+            self.runs[i : i + self.max_fan_in]
+            for i in range(0, len(self.runs), self.max_fan_in)
+        ]
+        LOGGER.debug(
+            "Merging %i sorted runs into %i runs", len(self.runs), len(groups)
+        )
+        self.runs = Parallel(n_jobs=self.max_workers, require="sharedmem")(
+            delayed(self._merge_runs)(group, self._new_run_path())
+            for group in groups
+        )
+
+    def get_sorted_reader(self) -> MergedTabularDataReader:
+        """Finish the sort and return a reader over all rows in order.
+
+        The reader is only valid until `cleanup` is called.
+        """
+        if self.columns is None:
+            raise ValueError("No data has been added to the sorter")
+
+        self._spill()
+        if len(self.runs) == 0:
+            run_path = self._new_run_path()
+            writer = ArrowIpcFileWriter(
+                run_path, self.columns, self.column_types
+            )
+            writer.write(pd.DataFrame(columns=self.columns))
+            self.runs.append(run_path)
+
+        while len(self.runs) > self.max_fan_in:
+            self._merge_pass()
+
+        return MergedTabularDataReader(
+            [ArrowIpcFileReader(path) for path in self.runs],
+            priority_column=self.priority_column,
+            descending=self.descending,
+            reader_chunk_size=self._reader_chunk_size(len(self.runs)),
+        )
+
+    def cleanup(self):
+        """Delete all run files."""
+        self.buffer = []
+        for path in self.runs:
+            try:
+                path.unlink(missing_ok=True)
+            except Exception as e:
+                LOGGER.warning(
+                    "Caught exception while deleting temp files: %s", e
+                )
+        self.runs = []
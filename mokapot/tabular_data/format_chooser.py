@@ -4,11 +4,14 @@ from pathlib import Path
 import numpy as np
 from typeguard import typechecked
 
+from mokapot.tabular_data.arrow_ipc import (
+    ArrowIpcFileReader,
+    ArrowIpcFileWriter,
+)
 from mokapot.tabular_data.base import (
     BufferType,
     ColumnMappedReader,
     ColumnSelectReader,
-    DataFrameReader,
     TabularDataReader,
     TabularDataWriter,
 )
@@ -25,8 +28,8 @@ from mokapot.tabular_data.streaming import (
     BufferedWriter,
 )
 from mokapot.tabular_data.traditional_pin import (
+    TraditionalPinReader,
     is_traditional_pin,
-    read_traditional_pin,
 )
 
 CSV_SUFFIXES = [
@@ -44,6 +47,7 @@ CSV_SUFFIXES = [
 ]
 PIN_SUFFIXES = [".pin"]
 PARQUET_SUFFIXES = [".parquet"]
+ARROW_SUFFIXES = [".arrow"]
 SQLITE_SUFFIXES = [".db"]
 
 
@@ -63,7 +67,7 @@ def reader_from_path(
         reader = None
         try:
             if is_traditional_pin(file_name):
-                reader = DataFrameReader(read_traditional_pin(file_name))
+                reader = TraditionalPinReader(file_name, **kwargs)
         except ValueError as e:
             msg = "Deprecation warning: Passing files with a .pin extesion"
             msg += " that are not compliant with the format specification"
@@ -80,6 +84,8 @@ def reader_from_path(
         reader = CSVFileReader(file_name, **kwargs)
     elif suffix in PARQUET_SUFFIXES:
         reader = ParquetFileReader(file_name, **kwargs)
+    elif suffix in ARROW_SUFFIXES:
+        reader = ArrowIpcFileReader(file_name, **kwargs)
     else:
         # Fallback
         warnings.warn(
@@ -112,6 +118,8 @@ def writer_from_suffix(
         writer = CSVFileWriter(file_name, columns, column_types, **kwargs)
     elif suffix in PARQUET_SUFFIXES:
         writer = ParquetFileWriter(file_name, columns, column_types, **kwargs)
+    elif suffix in ARROW_SUFFIXES:
+        writer = ArrowIpcFileWriter(file_name, columns, column_types, **kwargs)
     elif suffix in SQLITE_SUFFIXES:
         writer = SqliteWriter(file_name, columns, column_types, **kwargs)
     else:  # Fallback
@@ -40,6 +40,13 @@ class ParquetFileWriter(TabularDataWriter):
     def __repr__(self):
         return f"ParquetFileWriter({self.file_name=},{self.columns=})"
 
+    def __getstate__(self):
+        # The pyarrow writer cannot be pickled, so only finalized writers can
+        # be passed between processes
+        state = self.__dict__.copy()
+        state["writer"] = None
+        return state
+
     @staticmethod
     def _from_numpy_dtype(type):
         if type == "object":
@@ -180,9 +180,16 @@ class ComputedTabularDataReader(TabularDataReader):
 class MergedTabularDataReader(TabularDataReader):
     """
     Merges data from multiple tabular data sources vertically into a single
-    data source, ordering the rows (one by one) by the value of a priority
-    column. I.e. for each output row, the row of the input readers with the
-    highest value of the priority column is picked.
+    data source, ordering the rows by the value of a priority column. I.e. for
+    each output row, the row of the input readers with the highest value of
+    the priority column is picked. Ties are resolved in favour of the reader
+    that comes first in `readers`, and rows of the same reader keep their
+    original order.
+
+    The merge is done block-wise: from the chunks currently buffered for each
+    reader, all rows that can not be preceded by any row that has not been
+    read yet are emitted at once as one merged batch (see
+    `get_merged_batch_iterator`).
 
     Attributes:
     -----------
@@ -238,6 +245,121 @@ class MergedTabularDataReader(TabularDataReader):
     def get_column_types(self) -> list:
         return self.column_types
 
+    def _sort_keys(self, df: pd.DataFrame) -> np.ndarray:
+        # Internally we always merge in ascending order of the keys, so for a
+        # descending merge the priority values are negated.
+        keys = df[self.priority_column].to_numpy(dtype=float)
+        return -keys if self.descending else keys
+
+    def _check_sorted(self, keys: np.ndarray, last_key: float | None):
+        if last_key is not None and len(keys) > 0:
+            keys = np.concatenate(([last_key], keys))
+        unsorted = np.flatnonzero(np.diff(keys) < 0)
+        if len(unsorted) == 0:
+            return
+        value = keys[unsorted[0] + 1]
+        if self.descending:
+            raise ValueError(
+                f"Value {-value} exceeds {self.priority_column}"
+                " but should be descending"
+            )
+        raise ValueError(
+            f"Value {value} lower than {self.priority_column}"
+            " but should be ascending"
+        )
+
+    def get_merged_batch_iterator(
+        self, columns: list[str] | None = None
+    ) -> Generator[pd.DataFrame, None, None]:
+        """
+        Iterate over the merged data in batches of varying size.
+
+        Each reader is read chunk-wise and its current chunk is kept in a
+        buffer. The largest key (in merge order) that may still be followed by
+        unread rows is the smallest last buffered key over all readers that
+        are not exhausted yet. Every buffered row up to this bound is safe to
+        emit, and all of them are merged with a single stable sort. The reader
+        that determines the bound always gets its complete buffer emitted, so
+        each step makes progress and only a single chunk per reader is held
+        in memory.
+
+        Parameters
+        ----------
+        columns : list[str] | None, optional
+            The columns to read, by default all columns.
+
+        Yields
+        ------
+        pd.DataFrame
+            The next merged batch with a fresh range index.
+        """
+        read_columns = columns
+        if columns is not None and self.priority_column not in columns:
+            read_columns = columns + [self.priority_column]
+
+        iterators = [
+            reader.get_chunked_data_iterator(
+                chunk_size=self.reader_chunk_size, columns=read_columns
+            )
+            for reader in self.readers
+        ]
+        num_readers = len(iterators)
+        buffers: list[pd.DataFrame | None] = [None] * num_readers
+        keys: list[np.ndarray | None] = [None] * num_readers
+        last_keys: list[float | None] = [None] * num_readers
+        exhausted = [False] * num_readers
+
+        def fill_buffer(i):
+            # Fetch the next non-empty chunk of reader i, if there is any
+            while not exhausted[i]:
+                try:
+                    chunk = next(iterators[i])
+                except StopIteration:
+                    exhausted[i] = True
+                    buffers[i] = keys[i] = None
+                    return
+                if len(chunk) == 0:
+                    continue
+                chunk_keys = self._sort_keys(chunk)
+                self._check_sorted(chunk_keys, last_keys[i])
+                buffers[i] = chunk
+                keys[i] = chunk_keys
+                last_keys[i] = chunk_keys[-1]
+                return
+
+        for i in range(num_readers):
+            fill_buffer(i)
+
+        while not all(exhausted):
+            pending = [i for i in range(num_readers) if not exhausted[i]]
+            bound = min(last_keys[i] for i in pending)
+            first_at_bound = min(i for i in pending if last_keys[i] == bound)
+
+            # Rows with keys equal to the bound are only safe for readers
+            # that win the tie against the reader defining the bound
+            slices = []
+            slice_keys = []
+            for i in pending:
+                side = "right" if i <= first_at_bound else "left"
+                num_safe = int(np.searchsorted(keys[i], bound, side=side))
+                if num_safe == 0:
+                    continue
+                slices.append(buffers[i].iloc[:num_safe])
+                slice_keys.append(keys[i][:num_safe])
+                if num_safe == len(keys[i]):
+                    fill_buffer(i)
+                else:
+                    buffers[i] = buffers[i].iloc[num_safe:]
+                    keys[i] = keys[i][num_safe:]
+
+            # The slices are concatenated in reader order, so a stable sort
+            # keeps the tie-breaking by reader and by position within reader
+            batch = pd.concat(slices, ignore_index=True)
+            order = np.argsort(np.concatenate(slice_keys), kind="stable")
+            batch = batch.take(order)
+            batch.reset_index(drop=True, inplace=True)
+            yield batch if columns is None else batch[columns]
+
     def get_row_iterator(
         self,
         columns: list[str] | None = None,
@@ -249,108 +371,60 @@ class MergedTabularDataReader(TabularDataReader):
                 row.index = [0]
                 yield row
 
-        def get_value_df(row, col):
-            return row[col].iloc[0]
-
         def iterate_over_dicts(df: pd.DataFrame) -> Iterator:
             dict = df.to_dict(orient="records")
             return iter(dict)
 
-        def get_value_dict(row, col):
-            return row[col]
-
         def iterate_over_records(df: pd.DataFrame) -> Iterator:
             records = df.to_records(index=False)
             return iter(records)
 
         if row_type == BufferType.DataFrame:
             iterate_over_chunk = iterate_over_df
-            get_value = get_value_df
         elif row_type == BufferType.Dicts:
             iterate_over_chunk = iterate_over_dicts
-            get_value = get_value_dict
         elif row_type == BufferType.Records:
             iterate_over_chunk = iterate_over_records
-            get_value = get_value_dict
         else:
             raise ValueError(
                 "ret_type must be 'dataframe', 'records' or 'dicts',"
                 f" not {row_type}"
             )
 
-        def row_iterator_from_chunked(chunked_iter: Iterator) -> Iterator:
-            yield from itertools.chain.from_iterable(
-                iterate_over_chunk(chunk) for chunk in chunked_iter
-            )
-
-        row_iterators = [
-            row_iterator_from_chunked(
-                reader.get_chunked_data_iterator(
-                    chunk_size=self.reader_chunk_size, columns=columns
-                )
-            )
-            for reader in self.readers
-        ]
-        current_rows = [next(row_iterator) for row_iterator in row_iterators]
-
-        values = [get_value(row, self.priority_column) for row in current_rows]
-        while len(row_iterators):
-            if self.descending:
-                iterator_index = np.argmax(values)
-            else:
-                iterator_index = np.argmin(values)
-
-            row = current_rows[iterator_index]
-            yield row
-
-            try:
-                current_rows[iterator_index] = next(
-                    row_iterators[iterator_index]
-                )
-                new_value = get_value(
-                    current_rows[iterator_index], self.priority_column
-                )
-                if self.descending and new_value > values[iterator_index]:
-                    raise ValueError(
-                        f"Value {new_value} exceeds {self.priority_column}"
-                        " but should be descending"
-                    )
-                if not self.descending and new_value < values[iterator_index]:
-                    raise ValueError(
-                        f"Value {new_value} lower than {self.priority_column}"
-                        " but should be ascending"
-                    )
-
-                values[iterator_index] = new_value
-            except StopIteration:
-                del row_iterators[iterator_index]
-                del current_rows[iterator_index]
-                del values[iterator_index]
+        yield from itertools.chain.from_iterable(
+            iterate_over_chunk(batch)
+            for batch in self.get_merged_batch_iterator(columns=columns)
+        )
 
     def get_chunked_data_iterator(
         self, chunk_size: int, columns: list[str] | None = None
     ) -> Generator[pd.DataFrame, None, None]:
-        row_iterator = self.get_row_iterator(columns=columns)
-        finished = False
-        rows = []
-        while not finished:
-            try:
-                row = next(row_iterator)
-                rows.append(row)
-            except StopIteration:
-                finished = True
-            if (finished and len(rows) > 0) or len(rows) == chunk_size:
-                df = pd.concat(rows)
-                df.reset_index(drop=True, inplace=True)
-                yield df
-                rows = []
+        # Re-batch the merged batches (which have varying sizes) to chunks of
+        # exactly `chunk_size` rows (except for the last one)
+        pieces = []
+        num_rows = 0
+        for batch in self.get_merged_batch_iterator(columns=columns):
+            pieces.append(batch)
+            num_rows += len(batch)
+            if num_rows < chunk_size:
+                continue
+            df = pd.concat(pieces, ignore_index=True)
+            start = 0
+            while num_rows - start >= chunk_size:
+                chunk = df.iloc[start : start + chunk_size]
+                yield chunk.reset_index(drop=True)
+                start += chunk_size
+            pieces = [df.iloc[start:]]
+            num_rows -= start
+
+        if num_rows > 0:
+            yield pd.concat(pieces, ignore_index=True)
 
     def read(self, columns: list[str] | None = None) -> pd.DataFrame:
-        row_iterator = self.get_row_iterator(columns=columns)
-        rows = [row for row in row_iterator]
-        df = pd.concat(rows)
-        df.reset_index(drop=True, inplace=True)
-        return df
+        batches = list(self.get_merged_batch_iterator(columns=columns))
+        if len(batches) == 0:
+            return pd.DataFrame(columns=columns or self.column_names)
+        return pd.concat(batches, ignore_index=True)
 
 
 @typechecked
@@ -1,10 +1,24 @@
+from contextlib import ExitStack
 from io import StringIO
+from itertools import islice
 from pathlib import Path
+from typing import Generator, Iterator, TextIO
 
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from typeguard import typechecked
 
+from mokapot.constants import (
+    CHUNK_SIZE_READ_ALL_DATA,
+    PIN_FORMAT_SNIFF_LINES,
+)
+from mokapot.tabular_data.base import TabularDataReader
 
-def is_traditional_pin(path: Path) -> bool:
+
+def is_traditional_pin(
+    path: Path, max_lines: int | None = PIN_FORMAT_SNIFF_LINES
+) -> bool:
     """Check if the PIN file is a traditional PIN file.
 
     The traditional PIN file uses tabs both as field delimiters
@@ -16,10 +30,16 @@ def is_traditional_pin(path: Path) -> bool:
     3. The rest of the file is tab delimited.
     4. The number of delimiters in the other rows is >= number of columns.
 
+    Only the first `max_lines` lines are checked, so a file whose first
+    ragged line comes later is taken for a regular tsv file.
+
     Parameters
     ----------
     path : Path
         The path to the PIN file.
+    max_lines : int or None, optional
+        The maximum number of lines to check. If None, the whole file is
+        checked.
 
     Returns
     -------
@@ -48,7 +68,7 @@ def is_traditional_pin(path: Path) -> bool:
             )
 
         num_fields = len(header)
-        for line in f:
+        for line in islice(f, max_lines):
             nread += 1
             line = line.strip()
             if line.startswith("#") or line.startswith("DefaultDirection"):
@@ -74,7 +94,7 @@ def read_traditional_pin(path) -> pd.DataFrame:
 
     The PIN file is assumed to be a traditional PIN file.
     The PIN file is read in memory and the proteins are bundled into a single
-    column.
+    column. Use `TraditionalPinReader` to read it chunk-wise instead.
 
     Parameters
     ----------
@@ -86,35 +106,140 @@ def read_traditional_pin(path) -> pd.DataFrame:
     pd.DataFrame
         The PIN file as a pandas DataFrame.
     """
-    header_names = None
-    num_cols = None
+    return TraditionalPinReader(Path(path)).read()
 
-    out_lines = []
 
-    with open(path) as f:
+@typechecked
+class TraditionalPinReader(TabularDataReader):
+    """
+    A tabular data reader for traditional PIN files with ragged proteins.
+
+    In traditional PIN files, the proteins of a PSM are separated by tabs,
+    just like the fields, so the rows have different numbers of fields. The
+    file is read in chunks of lines, and the proteins of each line are
+    joined with ":" into the last column, before the chunk is parsed as a
+    tsv. Only the current chunk is kept in memory.
+
+    Attributes:
+    -----------
+        file_name : Path
+            The path to the PIN file.
+        max_workers : int
+            The number of processes used to join the proteins of a chunk.
+    """
+
+    # Number of rows used to infer the column types
+    NUM_TYPE_ROWS = 2
+
+    def __init__(self, file_name: Path, max_workers: int = 1):
+        self.file_name = file_name
+        self.max_workers = max_workers
+        self._columns = None
+        self._head = None
+
+    def __str__(self):
+        return f"TraditionalPinReader({self.file_name=})"
+
+    def __repr__(self):
+        return f"TraditionalPinReader({self.file_name=},{self.max_workers=})"
+
+    def _read_lines(self, f: TextIO) -> Iterator[str]:
+        # Comments and the default direction are not data
         for line in f:
             line = line.strip()
-            if line.startswith("#"):
+            if not line or line.startswith(("#", "DefaultDirection")):
                 continue
+            yield line
+
+    def _get_head(self) -> pd.DataFrame:
+        # The header is only read once
+        if self._head is None:
+            with open(self.file_name) as f:
+                lines = self._read_lines(f)
+                self._columns = next(lines).split("\t")
+                text = _join_proteins(
+                    list(islice(lines, self.NUM_TYPE_ROWS)),
+                    len(self._columns),
+                )
+            self._head = self._parse(text)
+        return self._head
+
+    def _parse(
+        self, text: str, columns: list[str] | None = None
+    ) -> pd.DataFrame:
+        if not text:
+            return pd.DataFrame(columns=columns or self._columns)
+        with StringIO(text) as f:
+            return pd.read_csv(
+                f,
+                sep="\t",
+                header=None,
+                names=self._columns,
+                usecols=columns,
+            )
 
-            if header_names is None:
-                header_names = line.split("\t")
-                num_cols = len(header_names)
-                continue
+    def get_column_names(self) -> list[str]:
+        return self._get_head().columns.tolist()
 
-            line_data = line.split("\t")
-            line_data = line_data[: num_cols - 1] + [
-                ":".join(line_data[num_cols - 1 :])
-            ]
-            if len(line_data) != num_cols:
-                raise RuntimeError(
-                    "Error parsing PIN file. "
-                    f" Line: {line}"
-                    f" Expected: {num_cols} columns"
-                )
-            out_lines.append("\t".join(line_data))
+    def get_column_types(self) -> list[np.dtype]:
+        return self._get_head().dtypes.tolist()
 
-    with StringIO("\n".join(out_lines)) as f:
-        df = pd.read_csv(f, sep="\t", header=None)
-        df.columns = header_names
-        return df
+    def read(self, columns: list[str] | None = None) -> pd.DataFrame:
+        chunks = list(
+            self.get_chunked_data_iterator(
+                chunk_size=CHUNK_SIZE_READ_ALL_DATA, columns=columns
+            )
+        )
+        if len(chunks) == 0:
+            return self._parse("", columns)
+        return pd.concat(chunks)
+
+    def get_chunked_data_iterator(
+        self, chunk_size: int, columns: list[str] | None = None
+    ) -> Generator[pd.DataFrame, None, None]:
+        self._get_head()
+        num_cols = len(self._columns)
+        offset = 0
+        with ExitStack() as stack:
+            f = stack.enter_context(open(self.file_name))
+            parallel = stack.enter_context(Parallel(n_jobs=self.max_workers))
+            lines = self._read_lines(f)
+            next(lines)
+            while batch := list(islice(lines, chunk_size)):
+                if self.max_workers > 1:
+                    step = -(-len(batch) // self.max_workers)
+                    text = "\n".join(
+                        parallel(
+                            delayed(_join_proteins)(
+                                batch[i : i + step], num_cols
+                            )
+                            for i in range(0, len(batch), step)
+                        )
+                    )
+                else:
+                    text = _join_proteins(batch, num_cols)
+                del batch
+
+                chunk = self._parse(text, columns)
+                chunk.index += offset
+                offset += len(chunk)
+                yield chunk if columns is None else chunk[columns]
+
+    def get_default_extension(self) -> str:
+        return ".tsv"
+
+
+def _join_proteins(lines: list[str], num_cols: int) -> str:
+    """Join the ragged proteins of PIN lines into the last field."""
+    out_lines = []
+    for line in lines:
+        fields = line.split("\t", num_cols - 1)
+        if len(fields) != num_cols:
+            raise RuntimeError(
+                "Error parsing PIN file. "
+                f" Line: {line}"
+                f" Expected: {num_cols} columns"
+            )
+        fields[-1] = fields[-1].replace("\t", ":")
+        out_lines.append("\t".join(fields))
+    return "\n".join(out_lines)
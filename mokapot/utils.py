@@ -2,6 +2,8 @@
 Utility functions
 """
 
+from __future__ import annotations
+
 import gzip
 import itertools
 from pathlib import Path
@@ -121,6 +123,119 @@ def get_next_row(
     return max_row
 
 
+def hash_rows(data: pd.DataFrame) -> np.ndarray:
+    """Hash each row of `data` into a single uint64 value.
+
+    The columns are hashed column-wise, and the hashes do not depend on the
+    run, so they can be used to group rows reproducibly.
+    """
+    # Numeric columns can come out as int or float depending on the chunk
+    # they were read from, so cast them to make the hashes comparable.
+    float_columns = {
+        col: float
+        for col, dtype in data.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype)
+        and not pd.api.types.is_bool_dtype(dtype)
+    }
+    data = data.astype(float_columns)
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+class SeenHashes:
+    """Set of 64-bit row hashes kept as a few sorted numpy runs.
+
+    New hashes are added as a sorted run; runs of similar size are merged so
+    that only a logarithmic number of runs has to be searched per lookup.
+
+    By default, distinct rows with the same hash are not told apart. With
+    `exact=True`, the key of every row is kept next to its hash, and a row
+    only counts as seen if its key equals one of the keys stored under its
+    hash, so hash collisions cannot drop a row.
+
+    Parameters
+    ----------
+    exact : bool, optional
+        Whether to keep and compare the keys of the rows, by default False.
+        If True, the keys must be passed along with the hashes.
+    """
+
+    def __init__(self, exact: bool = False):
+        self.exact = exact
+        self.runs: list[np.ndarray] = []
+        self.key_runs: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self.runs)
+
+    def contains(
+        self, hashes: np.ndarray, keys: np.ndarray | None = None
+    ) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run_idx, run in enumerate(self.runs):
+            idx = np.searchsorted(run, hashes)
+            idx[idx == len(run)] = 0
+            if not self.exact:
+                found |= run[idx] == hashes
+                continue
+            run_keys = self.key_runs[run_idx]
+            candidates = np.flatnonzero((run[idx] == hashes) & ~found)
+            same = _keys_equal(run_keys[idx[candidates]], keys[candidates])
+            found[candidates[same]] = True
+            # On a hash collision, the key may be stored further down
+            ends = np.searchsorted(run, hashes[candidates], side="right")
+            for pos, end in zip(candidates[~same], ends[~same]):
+                other_keys = run_keys[idx[pos] + 1 : end]
+                found[pos] = _keys_equal(other_keys, keys[pos]).any()
+        return found
+
+    def add(self, hashes: np.ndarray, keys: np.ndarray | None = None) -> None:
+        """Add hashes that are unique and not yet contained in the set."""
+        if len(hashes) == 0:
+            return
+        if not self.exact:
+            new_run = np.sort(hashes)
+            while self.runs and len(self.runs[-1]) <= 2 * len(new_run):
+                new_run = np.sort(np.concatenate([self.runs.pop(), new_run]))
+            self.runs.append(new_run)
+            return
+
+        order = np.argsort(hashes, kind="stable")
+        new_run = hashes[order]
+        new_keys = np.asarray(keys, dtype=object)[order]
+        while self.runs and len(self.runs[-1]) <= 2 * len(new_run):
+            new_run = np.concatenate([self.runs.pop(), new_run])
+            new_keys = np.concatenate([self.key_runs.pop(), new_keys])
+            order = np.argsort(new_run, kind="stable")
+            new_run, new_keys = new_run[order], new_keys[order]
+        self.runs.append(new_run)
+        self.key_runs.append(new_keys)
+
+    def add_new(
+        self, hashes: np.ndarray, keys: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Add the hashes of a chunk of rows and return the new rows.
+
+        Returns the (sorted) indices of the first row of every hash (or key,
+        if the set is exact) that was not contained in the set yet.
+        """
+        if self.exact:
+            first_idx = np.flatnonzero(~pd.Series(keys).duplicated().values)
+        else:
+            _, first_idx = np.unique(hashes, return_index=True)
+            first_idx = np.sort(first_idx)
+        new_keys = None if keys is None else np.asarray(keys)[first_idx]
+        is_new = ~self.contains(hashes[first_idx], new_keys)
+        new_idx = first_idx[is_new]
+        self.add(hashes[new_idx], None if keys is None else new_keys[is_new])
+        return new_idx
+
+
+def _keys_equal(left: np.ndarray, right) -> np.ndarray:
+    """Compare keys elementwise, where missing values equal each other."""
+    equal = np.asarray(left == right, dtype=bool)
+    return equal | (pd.isna(left) & pd.isna(right))
+
+
 @typechecked
 def make_bool_trarget(target_column: pd.Series):
     """Convert target column to boolean if possible.
@@ -139,7 +254,7 @@ def make_bool_trarget(target_column: pd.Series):
                 "The target column is not convertible to integers."
             ) from e
 
-    if target_column.dtype == int or target_column.dtype == float:
+    if target_column.dtype.kind in "iuf":
         # Check if all values are 0 or 1
         uniq_vals = target_column.unique().tolist()
         uniq_vals.sort()
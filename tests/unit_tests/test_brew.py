@@ -1,6 +1,8 @@
 """Tests that the brew function works"""
 
 import copy
+import sys
+from unittest.mock import patch
 
 import numpy as np
 import pytest
@@ -8,6 +10,8 @@ from sklearn.tree import DecisionTreeClassifier
 
 import mokapot
 from mokapot import LinearPsmDataset, Model, PercolatorModel
+from mokapot.brew import _predict, make_fold_ids, make_train_sets
+from mokapot.dataset import calibrate_scores
 
 np.random.seed(42)
 
@@ -297,3 +301,104 @@ def test_brew_using_non_trained_models_error(psms_ondisk, svm):
 def assert_not_close(x, y):
     """Assert that two arrays are not equal"""
     np.testing.assert_raises(AssertionError, np.testing.assert_allclose, x, y)
+
+
+def test_make_train_sets():
+    """Test that the training sets are the complements of the test folds"""
+    test_idx = [
+        (np.array([0, 3, 4]), np.array([2]), np.array([1, 5])),
+        (np.array([1]), np.array([0, 2]), np.array([], dtype=int)),
+    ]
+    fold_ids = make_fold_ids(test_idx, [6, 3])
+    assert fold_ids[0].dtype == np.int8
+    np.testing.assert_array_equal(fold_ids[0], [0, 2, 1, 0, 0, 2])
+    np.testing.assert_array_equal(fold_ids[1], [1, 0, 1])
+
+    rng = np.random.default_rng(0)
+    train_sets = list(make_train_sets(fold_ids, 3, None, rng))
+    assert len(train_sets) == 3
+    np.testing.assert_array_equal(train_sets[0][0], [1, 2, 5])
+    np.testing.assert_array_equal(train_sets[0][1], [0, 2])
+    np.testing.assert_array_equal(train_sets[2][0], [0, 2, 3, 4])
+    np.testing.assert_array_equal(train_sets[2][1], [0, 1, 2])
+
+    train_sets = list(make_train_sets(fold_ids, 3, 3, rng))
+    sizes = [[len(idx) for idx in train_set] for train_set in train_sets]
+    assert sizes == [[1, 2], [1, 1], [1, 2]]
+    for fold, train_set in enumerate(train_sets):
+        for ids, idx in zip(fold_ids, train_set):
+            assert np.all(ids[idx] != fold)
+
+
+def test_brew_fold_executor(psm_df_builder, svm):
+    """Training the folds in processes gives the same results as threads"""
+    data = psm_df_builder(1000, 1000, score_diffs=[3.0, 3.0])
+    psms = LinearPsmDataset(
+        psms=data.df,
+        target_column="target",
+        spectrum_columns=["specid"],
+        peptide_column="peptide",
+        feature_columns=list(data.score_cols),
+        copy_data=True,
+        rng=42,
+    )
+
+    _, thread_scores = mokapot.brew(
+        [psms], copy.deepcopy(svm), test_fdr=0.05, max_workers=2, rng=1
+    )
+    models, process_scores = mokapot.brew(
+        [psms],
+        copy.deepcopy(svm),
+        test_fdr=0.05,
+        max_workers=2,
+        rng=1,
+        fold_executor="processes",
+    )
+    assert all(model.is_trained for model in models)
+    np.testing.assert_array_equal(thread_scores[0], process_scores[0])
+
+    # With a memory budget too small for two folds, they are trained one
+    # after another
+    brew_module = sys.modules["mokapot.brew"]
+    with patch.object(brew_module, "TRAINING_MEMORY_BUDGET", 1):
+        _, budget_scores = mokapot.brew(
+            [psms], copy.deepcopy(svm), test_fdr=0.05, max_workers=2, rng=1
+        )
+    np.testing.assert_array_equal(thread_scores[0], budget_scores[0])
+
+    with pytest.raises(ValueError, match="fold executor"):
+        mokapot.brew([psms], svm, test_fdr=0.05, fold_executor="dask")
+
+
+def test_predict_fold_ids(psm_df_builder, svm):
+    """Every PSM is scored by the model of its fold, in the input order"""
+    data = psm_df_builder(1000, 1000, score_diffs=[3.0, 3.0])
+    psms = LinearPsmDataset(
+        psms=data.df,
+        target_column="target",
+        spectrum_columns=["specid"],
+        peptide_column="peptide",
+        feature_columns=list(data.score_cols),
+        copy_data=True,
+        rng=42,
+    )
+    models, _ = mokapot.brew([psms], svm, test_fdr=0.05, rng=1)
+    fold_ids = np.random.default_rng(1).integers(0, 3, len(data.df))
+    fold_ids = fold_ids.astype(np.int8)
+
+    expected = np.empty(len(data.df))
+    for fold, model in enumerate(models):
+        in_fold = fold_ids == fold
+        expected[in_fold] = calibrate_scores(
+            model.predict(psms)[in_fold], psms.targets[in_fold], 0.05
+        )
+
+    (scores,) = _predict([fold_ids], [psms], models, 0.05, max_workers=1)
+    np.testing.assert_allclose(scores, expected, rtol=1e-4, atol=1e-4)
+
+    # Without the linear coefficients each fold is predicted by its model
+    nonlinear = copy.deepcopy(models)
+    for model in nonlinear:
+        model.linear_coef = None
+    (scores,) = _predict([fold_ids], [psms], nonlinear, 0.05, max_workers=2)
+    np.testing.assert_allclose(scores, expected)
@@ -71,6 +71,27 @@ def test_assign_unscored_confidence(inmem_psms_ds, tmp_path, deduplication):
     # TODO actually add assertions here ...
 
 
+def test_assign_confidence_categorical(psm_df_builder, tmp_path):
+    """Test that categorical columns survive the external sort"""
+    data = psm_df_builder(1000, 1000, score_diffs=[5.0])
+    df = data.df.copy()
+    df["peptide"] = df["peptide"].astype("category")
+    psms = LinearPsmDataset(
+        psms=df,
+        target_column="target",
+        spectrum_columns=["specid"],
+        peptide_column="peptide",
+        feature_columns=list(data.score_cols),
+        copy_data=True,
+    )
+    confidence = assign_confidence(
+        [psms], scores_list=None, eval_fdr=0.01, dest_dir=tmp_path
+    )
+    out = confidence[0].out_writers["psms"][0].read()
+    assert len(out) > 0
+    assert set(out["peptide"]) <= set(data.df["peptide"])
+
+
 @pytest.mark.parametrize("deduplication", [True, False])
 def test_chunked_assign_confidence(psm_df_1000, tmp_path, deduplication):
     """Test that assign_confidence() works correctly with small chunks"""
@@ -158,6 +179,100 @@ def test_chunked_assign_confidence(psm_df_1000, tmp_path, deduplication):
     ), "Bad PEPs should be gt 0.98"
 
 
+def test_streamed_assign_confidence(psm_df_1000, tmp_path):
+    """Test that streamed confidence does not depend on the chunk size"""
+    pin_file, df, _, score_cols = psm_df_1000
+    df_spectra = pd.read_csv(
+        pin_file,
+        sep="\t",
+        usecols=["scannr", "expmass", "target"],
+    )
+    psms_disk = OnDiskPsmDataset(
+        pin_file,
+        target_column="target",
+        spectrum_columns=["scannr", "specid", "expmass", "filename"],
+        peptide_column="peptide",
+        feature_columns=[],
+        extra_confidence_level_columns=[],
+        spectra_dataframe=df_spectra,
+    )
+
+    def run(chunk_size, stream_confidence):
+        dest_dir = tmp_path / f"{chunk_size}_{stream_confidence}"
+        dest_dir.mkdir()
+        with run_with_chunk_size(chunk_size):
+            assign_confidence(
+                [copy.copy(psms_disk)],
+                scores_list=[df[score_cols[0]].values],
+                prefixes=[None],
+                dest_dir=dest_dir,
+                eval_fdr=0.02,
+                peps_algorithm="hist_nnls",
+                stream_confidence=stream_confidence,
+            )
+        return pd.read_csv(dest_dir / "targets.psms.tsv", sep="\t")
+
+    streamed = run(100, True)
+    assert_frame_equal(streamed, run(1000, True))
+
+    # The streamed estimates are close to the ones from all data at once
+    direct = run(1000, False)
+    qvals_column = STANDARD_COLUMN_NAME_MAP["q-value"]
+    np.testing.assert_allclose(
+        streamed[qvals_column], direct[qvals_column], atol=0.01
+    )
+    peps_column = STANDARD_COLUMN_NAME_MAP["posterior_error_prob"]
+    assert np.abs(streamed[peps_column] - direct[peps_column]).mean() < 0.02
+
+
+def test_dataset_workers(psm_df_1000, tmp_path):
+    """Test that datasets processed in workers give the serial results"""
+    pin_file, df, _, score_cols = psm_df_1000
+    df_spectra = pd.read_csv(
+        pin_file,
+        sep="\t",
+        usecols=["scannr", "expmass", "target"],
+    )
+    psms_disk = OnDiskPsmDataset(
+        pin_file,
+        target_column="target",
+        spectrum_columns=["scannr", "specid", "expmass", "filename"],
+        peptide_column="peptide",
+        feature_columns=[],
+        extra_confidence_level_columns=[],
+        spectra_dataframe=df_spectra,
+    )
+    prefixes = ["a", "b"]
+
+    def run(dataset_workers):
+        dest_dir = tmp_path / str(dataset_workers)
+        dest_dir.mkdir()
+        datasets = [copy.copy(psms_disk), copy.copy(psms_disk)]
+        confidences = assign_confidence(
+            datasets,
+            scores_list=[df[col].values for col in score_cols[:2]],
+            prefixes=prefixes,
+            dest_dir=dest_dir,
+            eval_fdr=0.02,
+            dataset_workers=dataset_workers,
+        )
+        for con, dataset in zip(confidences, datasets):
+            assert con.dataset is dataset
+        return dest_dir
+
+    serial_dir, parallel_dir = run(1), run(2)
+    assert sorted(p.name for p in parallel_dir.iterdir()) == sorted(
+        p.name for p in serial_dir.iterdir()
+    )
+    for prefix in prefixes:
+        for level in ["psms", "peptides"]:
+            file_name = f"{prefix}.targets.{level}.tsv"
+            assert_frame_equal(
+                pd.read_csv(parallel_dir / file_name, sep="\t"),
+                pd.read_csv(serial_dir / file_name, sep="\t"),
+            )
+
+
 @pytest.mark.parametrize("deduplication", [True, False])
 def test_assign_confidence_parquet(
     psm_df_1000_parquet, tmp_path, deduplication
@@ -209,3 +324,65 @@ def test_assign_confidence_parquet(
         )
 
     assert_frame_equal(df_results_group1, df_results_group2)
+
+
+def test_level_writers_dedup_across_chunks(tmp_path):
+    """Only the first row per entity survives, also across chunk borders"""
+    df = pd.DataFrame({
+        "specid": [1, 2, 1, 3, 2, 4, 3],
+        "peptide": ["A", "B", "A", "C", "D", "A", "C"],
+        "mokapot_score": [7.0, 6.0, 5.0, 4.0, 3.0, 2.0, 1.0],
+    })
+    level_writers = mokapot.confidence.LevelWriterCollection(
+        levels=["psms", "peptides"],
+        level_data_paths={
+            "psms": tmp_path / "psms.csv",
+            "peptides": tmp_path / "peptides.csv",
+        },
+        schema_dict=df.dtypes.to_dict(),
+        level_input_output_column_mapping={c: c for c in df.columns},
+        level_hash_columns={"psms": ["specid"], "peptides": ["peptide"]},
+        deduplication=True,
+    )
+    # The float specid in the second chunk must match the int ones
+    level_writers.sink_iterator([
+        df.iloc[:3],
+        df.iloc[3:].astype({"specid": float}),
+    ])
+    level_writers.finalize()
+
+    psms = pd.read_csv(tmp_path / "psms.csv", sep="\t")
+    peptides = pd.read_csv(tmp_path / "peptides.csv", sep="\t")
+    assert psms["mokapot_score"].tolist() == [7.0, 6.0, 4.0, 2.0]
+    assert peptides["mokapot_score"].tolist() == [7.0, 6.0, 4.0, 3.0]
+    assert level_writers.score_stats.n == 8
+    assert len(level_writers.seen_level_entities["peptides"]) == 4
+
+
+def test_estimate_level_memory(tmp_path):
+    """Test that the streamed estimate scales with the size of the rows"""
+    estimate_level_memory = mokapot.confidence.estimate_level_memory
+    assert estimate_level_memory(tmp_path / "missing.tsv", True) == 0
+
+    sizes = {}
+    for width in [1, 100]:
+        path = tmp_path / f"level_{width}.tsv"
+        pd.DataFrame({
+            "score": np.arange(5000, dtype=float),
+            "peptide": ["A" * width] * 5000,
+        }).to_csv(path, sep="\t", index=False)
+        assert estimate_level_memory(path, False) == 4 * path.stat().st_size
+        with run_with_chunk_size(100):
+            sizes[width] = estimate_level_memory(path, True)
+
+    assert (
+        sizes[1] < sizes[100] < 4 * (tmp_path / "level_100.tsv").stat().st_size
+    )
+    assert sizes[100] - sizes[1] == pytest.approx(2 * 100 * 99, rel=0.1)
+
+
+def test_level_max_workers():
+    level_max_workers = mokapot.confidence.level_max_workers
+    assert level_max_workers(4, "qvality") == 1
+    assert level_max_workers(4, "qvality_sampled") == 1
+    assert level_max_workers(4, "hist_nnls") == 4
@@ -6,7 +6,13 @@ import numpy as np
 import pandas as pd
 
 from mokapot import LinearPsmDataset, OnDiskPsmDataset
-from mokapot.dataset.base import update_labels
+from mokapot.dataset.base import (
+    best_feature_properties,
+    count_passing_targets,
+    update_labels,
+)
+from mokapot.dataset.training_matrix import TrainingMatrix
+from mokapot.utils import hash_rows
 
 
 def test_linear_init(psm_df_6):
@@ -57,22 +63,137 @@ def test_update_labels(psm_df_6):
     assert np.array_equal(real_labs, new_labs)
 
 
-def test_hash_row():
-    # Q: what is this meant to test? Only that hashing is constant?
-    # It would be good to have this test (or another) check that its
-    # consistent from the parsing time.
-    x = np.array(
-        ["test.mzML", 870, 5902.639978936955, 890.522815122875], dtype=object
+def test_count_passing_targets():
+    """Test that all features are evaluated like single calls would"""
+    rng = np.random.default_rng(1)
+    targets = rng.random(500) < 0.5
+    features = np.column_stack([
+        targets + rng.normal(size=500),
+        -2 * targets + rng.normal(size=500),
+        rng.integers(0, 3, 500),
+    ])
+    counts = count_passing_targets(features, targets, eval_fdr=0.1)
+    threaded = count_passing_targets(
+        features, targets, eval_fdr=0.1, max_workers=2
     )
-    assert OnDiskPsmDataset._hash_row(x) == 4196757312
-
-    x = np.array(
-        [
-            "test.mzML",
-            np.int64(870),
-            np.float64(5902.639978936955),
-            np.float64(890.522815122875),
-        ],
-        dtype=object,
+    np.testing.assert_array_equal(counts, threaded)
+    for col in range(features.shape[1]):
+        for row, desc in enumerate((True, False)):
+            labels = update_labels(features[:, col], targets, 0.1, desc)
+            assert counts[row, col] == (labels == 1).sum()
+
+    best = best_feature_properties(counts, ("a", "b", "c"), 0.1)
+    assert (best.name, best.descending) == ("b", False)
+    assert best.positives == counts[1, 1]
+
+
+def test_find_best_feature(psm_df_builder):
+    """Test that the best feature and its labels are found"""
+    data = psm_df_builder(100, 100, score_diffs=[1.0, 5.0])
+    dataset = LinearPsmDataset(
+        psms=data.df,
+        target_column="target",
+        spectrum_columns=["specid"],
+        peptide_column="peptide",
+        feature_columns=list(data.score_cols),
+        copy_data=True,
+    )
+    result = dataset.find_best_feature(eval_fdr=0.05)
+    assert result.feature.name == data.score_cols[1]
+    assert result.feature.descending
+    assert (result.new_labels == 1).sum() == result.feature.positives
+
+
+def test_hash_rows():
+    """Test that spectrum hashes are stable and do not depend on dtypes"""
+    df = pd.DataFrame({
+        "file": ["test.mzML", "test.mzML"],
+        "scan": [870, 871],
+        "expmass": [5902.639978936955, 5902.639978936955],
+    })
+    hashes = hash_rows(df)
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == 4668913202425239280
+    assert hashes[0] != hashes[1]
+
+    df = df.astype({"file": "category", "scan": float})
+    np.testing.assert_array_equal(hash_rows(df), hashes)
+
+
+def test_split_groups_spectra(psm_df_1000):
+    """Test that PSMs of a spectrum end up in the same fold"""
+    pin_file, df, _, score_cols = psm_df_1000
+    spectrum_columns = ["scannr", "expmass"]
+    dataset = OnDiskPsmDataset(
+        pin_file,
+        target_column="target",
+        spectrum_columns=spectrum_columns,
+        peptide_column="peptide",
+        feature_columns=list(score_cols),
+        extra_confidence_level_columns=[],
+        spectra_dataframe=df[spectrum_columns + ["target"]].copy(),
     )
-    assert OnDiskPsmDataset._hash_row(x) == 4196757312
+    folds = dataset._split(3, np.random.default_rng(42))
+    assert len(folds) == 3
+    assert all(300 <= len(idx) <= 367 for idx in folds)
+    all_idx = np.concatenate(folds)
+    assert np.array_equal(np.sort(all_idx), np.arange(len(df)))
+
+    fold_ids = np.empty(len(df), dtype=int)
+    for fold, idx in enumerate(folds):
+        fold_ids[idx] = fold
+    num_folds = (
+        df.assign(fold=fold_ids).groupby(spectrum_columns)["fold"].nunique()
+    )
+    assert (num_folds == 1).all()
+
+    # The folds are reproducible for a given seed
+    other = dataset._split(3, np.random.default_rng(42))
+    for idx, other_idx in zip(folds, other):
+        np.testing.assert_array_equal(idx, other_idx)
+
+
+def test_training_matrix(psm_df_builder, tmp_path):
+    """Test that the fold training sets are selected from a single matrix"""
+    datasets = []
+    for seed in (1, 2):
+        data = psm_df_builder(30, 30, score_diffs=[5.0])
+        datasets.append(
+            LinearPsmDataset(
+                psms=data.df,
+                target_column="target",
+                spectrum_columns=["specid"],
+                peptide_column="peptide",
+                feature_columns=list(data.score_cols),
+                copy_data=True,
+                rng=seed,
+            )
+        )
+    train_idx = [
+        [np.array([5, 1, 42, 17]), np.array([0, 59])],
+        [np.arange(20, 40), np.array([], dtype=int)],
+    ]
+    matrix = TrainingMatrix.from_datasets(
+        datasets, train_idx, chunk_size=7, memmap_dir=tmp_path
+    )
+    assert matrix.features.dtype == np.float32
+    assert len(matrix) == 24 + 2
+    assert matrix.memmap_path.exists()
+
+    for fold, fold_idx in enumerate(train_idx):
+        fold_data = matrix.fold_dataset(fold)
+        expected = pd.concat([
+            dataset.data.iloc[idx] for dataset, idx in zip(datasets, fold_idx)
+        ])
+        np.testing.assert_array_equal(
+            fold_data.features.values,
+            expected[list(datasets[0].feature_columns)].to_numpy(np.float32),
+        )
+        np.testing.assert_array_equal(
+            fold_data.targets, expected["target"].to_numpy(bool)
+        )
+        num_features = len(matrix.feature_columns)
+        assert matrix.fold_memory(fold) == len(expected) * num_features * 20
+
+    matrix.close()
+    assert not matrix.memmap_path.exists()
@@ -0,0 +1,94 @@
+"""Tests for the external sort used by the confidence pipeline"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mokapot.tabular_data.external_sort import ExternalSorter
+
+
+@pytest.fixture
+def unsorted_df():
+    rng = np.random.default_rng(42)
+    n = 1000
+    return pd.DataFrame({
+        "score": rng.integers(0, 50, n).astype(float),
+        "spec": rng.integers(0, 300, n),
+        "peptide": [f"PEP{i}" for i in rng.integers(0, 200, n)],
+        "pos": np.arange(n),
+    })
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+@pytest.mark.parametrize("memory_budget", [1, 5000, 10**9])
+def test_external_sort(tmp_path, unsorted_df, memory_budget, max_workers):
+    sorter = ExternalSorter(
+        tmp_path,
+        priority_column="score",
+        memory_budget=memory_budget,
+        max_fan_in=3,
+        max_workers=max_workers,
+    )
+    with sorter:
+        for start in range(0, len(unsorted_df), 70):
+            sorter.add(unsorted_df.iloc[start : start + 70])
+        result = sorter.get_sorted_reader().read()
+        assert len(sorter.runs) <= 3
+        assert len(list(tmp_path.glob("*.arrow"))) == len(sorter.runs)
+    assert len(list(tmp_path.glob("*.arrow"))) == 0
+
+    # Ties must stay in the order in which the rows were added
+    expected = unsorted_df.sort_values(
+        "score", ascending=False, kind="stable"
+    ).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_external_sort_deduplication(tmp_path, unsorted_df):
+    with ExternalSorter(
+        tmp_path,
+        priority_column="score",
+        memory_budget=5000,
+        deduplication_columns=["spec"],
+    ) as sorter:
+        for start in range(0, len(unsorted_df), 100):
+            sorter.add(unsorted_df.iloc[start : start + 100])
+        result = sorter.get_sorted_reader().read()
+
+    # Duplicates are only dropped within runs, the first one of all
+    # duplicates must always be kept though
+    assert result["score"].is_monotonic_decreasing
+    expected = unsorted_df.sort_values(
+        "score", ascending=False, kind="stable"
+    ).drop_duplicates("spec")
+    first = result.drop_duplicates("spec")
+    pd.testing.assert_frame_equal(
+        first.reset_index(drop=True), expected.reset_index(drop=True)
+    )
+    assert len(result) < len(unsorted_df)
+
+
+def test_external_sort_empty(tmp_path, unsorted_df):
+    with ExternalSorter(tmp_path, priority_column="score") as sorter:
+        with pytest.raises(ValueError, match="No data"):
+            sorter.get_sorted_reader()
+        sorter.add(unsorted_df.iloc[:0])
+        result = sorter.get_sorted_reader().read()
+    assert len(result) == 0
+    assert result.columns.tolist() == unsorted_df.columns.tolist()
+
+
+def test_external_sort_categorical(tmp_path, unsorted_df):
+    unsorted_df["peptide"] = unsorted_df["peptide"].astype("category")
+    with ExternalSorter(
+        tmp_path, priority_column="score", memory_budget=5000
+    ) as sorter:
+        for start in range(0, len(unsorted_df), 100):
+            sorter.add(unsorted_df.iloc[start : start + 100])
+        result = sorter.get_sorted_reader().read()
+
+    expected = unsorted_df.sort_values(
+        "score", ascending=False, kind="stable"
+    ).reset_index(drop=True)
+    expected["peptide"] = expected["peptide"].astype(object)
+    pd.testing.assert_frame_equal(result, expected)
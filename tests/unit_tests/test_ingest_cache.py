@@ -0,0 +1,59 @@
+"""Test the ingest cache for PIN files"""
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import mokapot
+from mokapot.parsers.ingest_cache import CachedPinReader, IngestCache
+
+
+@pytest.fixture
+def pin(tmp_path):
+    """A copy of a PIN file"""
+    pin = tmp_path / "test.pin"
+    shutil.copy(Path("data", "10k_psms_test.pin"), pin)
+    return pin
+
+
+def test_read_pin_cached(pin, tmp_path):
+    """Test that a PIN file is read from the cache on the second run"""
+    cache_dir = tmp_path / "cache"
+    (parsed,) = mokapot.read_pin(pin, max_workers=1, cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+    (cached,) = mokapot.read_pin(pin, max_workers=1, cache_dir=cache_dir)
+    assert isinstance(cached.reader, CachedPinReader)
+    assert cached.get_default_extension() == parsed.get_default_extension()
+    assert cached.column_groups == parsed.column_groups
+    pd.testing.assert_frame_equal(
+        cached.spectra_dataframe, parsed.spectra_dataframe
+    )
+    pd.testing.assert_frame_equal(cached.read_data(), parsed.read_data())
+
+    # Different parser options make a new entry
+    mokapot.read_pin(
+        pin,
+        max_workers=1,
+        cache_dir=cache_dir,
+        charge_column="missedCleavages",
+    )
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_ingest_cache_eviction(pin, tmp_path):
+    """Test that the least recently used entries are evicted"""
+    (dataset,) = mokapot.read_pin(pin, max_workers=1)
+    cache = IngestCache(tmp_path / "cache", max_size=1)
+
+    keys = [cache.get_key(pin, {"option": i}) for i in range(2)]
+    assert keys[0] != keys[1]
+    for key in keys:
+        assert cache.store(key, dataset, pin, [])
+
+    # Only the entry that was just added is kept
+    assert cache.load(keys[0]) is None
+    assert cache.load(keys[1]) is not None
+    assert len(list(cache.cache_dir.iterdir())) == 3
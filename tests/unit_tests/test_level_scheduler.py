@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from mokapot.level_scheduler import MemoryBudget, run_level_tasks
+
+
+def test_run_level_tasks(caplog):
+    logger = logging.getLogger("mokapot.test_level_scheduler")
+    levels = ["psms", "peptides", "precursors", "proteins"]
+    barrier = threading.Barrier(len(levels), timeout=10)
+
+    def task(level):
+        logger.info("Start %s", level)
+        # All tasks must run at the same time to pass the barrier. Later
+        # levels log first.
+        barrier.wait()
+        time.sleep(0.01 * (len(levels) - levels.index(level)))
+        logger.info("End %s", level)
+        return level.upper()
+
+    with caplog.at_level(logging.INFO):
+        results = run_level_tasks(
+            {level: lambda level=level: task(level) for level in levels},
+            max_workers=len(levels),
+        )
+
+    assert results == {level: level.upper() for level in levels}
+    messages = [
+        r.getMessage() for r in caplog.records if r.name == logger.name
+    ]
+    expected = [
+        f"{what} {level}" for level in levels for what in "Start End".split()
+    ]
+    assert messages == expected
+
+
+def test_run_level_tasks_memory_budget():
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def task():
+        with lock:
+            running.append(1)
+            max_running.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    levels = ["a", "b", "c", "d"]
+    run_level_tasks(
+        {level: task for level in levels},
+        max_workers=4,
+        memory_estimates={level: 60 for level in levels},
+        memory_budget=100,
+    )
+    assert max(max_running) == 1
+
+    max_running.clear()
+    run_level_tasks(
+        {level: task for level in levels},
+        max_workers=4,
+        memory_estimates={level: 50 for level in levels},
+        memory_budget=100,
+    )
+    assert max(max_running) == 2
+
+
+def test_run_level_tasks_error():
+    def fail():
+        raise ValueError("Failed level")
+
+    with pytest.raises(ValueError, match="Failed level"):
+        run_level_tasks({"a": fail, "b": lambda: 1}, max_workers=2)
+
+
+def test_memory_budget_oversized():
+    budget = MemoryBudget(10)
+    with budget.reserve(100):
+        assert budget.in_use == 100
+    assert budget.in_use == 0
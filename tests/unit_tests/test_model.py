@@ -7,6 +7,7 @@ from sklearn.linear_model import LogisticRegression, LogisticRegressionCV
 from sklearn.model_selection import GridSearchCV
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 from sklearn.svm import LinearSVC
+from sklearn.tree import DecisionTreeClassifier
 
 import mokapot
 from mokapot import LinearPsmDataset, utils
@@ -120,6 +121,78 @@ def test_model_fit_large_subset(psms_dataset):
     assert model.is_trained
 
 
+def test_model_fit_warm_start(psms_dataset):
+    """Test warm starts, early stopping and subsampled grid searches"""
+    model = mokapot.Model(
+        LogisticRegression(),
+        train_fdr=0.05,
+        warm_start=True,
+        early_stopping_tol=0.0,
+    )
+    model.fit(psms_dataset)
+    assert model.is_trained
+    assert model.estimator.warm_start
+
+    model = mokapot.PercolatorModel(
+        train_fdr=0.05,
+        early_stopping_tol=0.01,
+        cv_max_samples=100,
+        rng=1,
+    )
+    model.fit(psms_dataset)
+    assert model.is_trained
+    assert isinstance(model.estimator, LinearSVC)
+
+
+def test_linear_scorer(psms_dataset):
+    """Test that the combined linear models match the model predictions"""
+    models = []
+    for scaler in (None, "as-is"):
+        model = mokapot.Model(
+            LogisticRegression(), scaler=scaler, train_fdr=0.05, max_iter=1
+        )
+        models.append(model.fit(psms_dataset))
+    models.append(mokapot.PercolatorModel(train_fdr=0.05, max_iter=1, rng=1))
+    models[-1].fit(psms_dataset)
+
+    scorer = mokapot.model.LinearScorer.from_models(models)
+    scores = scorer.score(psms_dataset.data)
+    assert scores.shape == (len(psms_dataset.data), 3)
+    for i, model in enumerate(models):
+        np.testing.assert_allclose(
+            scores[:, i], model.predict(psms_dataset), rtol=1e-4, atol=1e-4
+        )
+
+    model = mokapot.Model(
+        DecisionTreeClassifier(), train_fdr=0.05, override=True
+    )
+    model.fit(psms_dataset)
+    assert model.linear_coef is None
+    assert mokapot.model.LinearScorer.from_models(models + [model]) is None
+
+
+def test_has_converged():
+    """Test the early stopping criterion"""
+    assert not mokapot.model._has_converged([100], 0.0)
+    assert not mokapot.model._has_converged([100, 100], None)
+    assert mokapot.model._has_converged([90, 100, 100], 0.0)
+    assert mokapot.model._has_converged([100, 101], 0.01)
+    assert not mokapot.model._has_converged([100, 102], 0.01)
+
+
+def test_stratified_subsample():
+    """Test that subsamples keep the proportion of each label"""
+    labels = np.array([0] * 900 + [1] * 100)
+    rng = np.random.default_rng(1)
+    idx = mokapot.model._stratified_subsample(labels, 100, rng)
+    assert len(idx) == 100
+    assert len(np.unique(idx)) == 100
+    assert (labels[idx] == 1).sum() == 10
+
+    idx = mokapot.model._stratified_subsample(labels, 2, rng)
+    assert set(labels[idx]) == {0, 1}
+
+
 def test_model_predict(psms_dataset):
     """Test predictions"""
     from mokapot.column_defs import ColumnGroups
@@ -6,6 +6,8 @@ import pandas as pd
 import pytest
 
 import mokapot
+from mokapot.parsers.pin import scan_features_and_spectra
+from mokapot.tabular_data import DataFrameReader
 
 
 @pytest.fixture
@@ -51,3 +53,33 @@ def test_pin_parsing(std_pin):
 def test_pin_wo_dir():
     """Test a PIN file without a DefaultDirection line"""
     mokapot.read_pin(Path("data", "scope2_FP97AA.pin"), max_workers=4)
+
+
+def test_pin_single_pass(tmp_path):
+    """Test that missing features and spectra are found in one pass"""
+    pin = tmp_path / "test.pin"
+    pin.write_text(
+        "SpecId\tLabel\tfilename\tScanNr\tf1\tf2\tPeptide\tProteins\n"
+        "a\t1\trun1.raw\t1\t0.5\t1\tK.ABC.D\tprot1\n"
+        "b\t-1\trun1.raw\t2\t1.5\t\tK.CBA.D\tdecoy_prot1\n"
+        "c\t1\trun2.raw\t1\t2.5\t3\tK.ABD.D\tprot2\n"
+    )
+    (dataset,) = mokapot.read_pin(pin, max_workers=1)
+    assert dataset.feature_columns == ("f1",)
+    spectra = dataset.spectra_dataframe
+    assert spectra["Label"].tolist() == [True, False, True]
+    assert spectra["ScanNr"].tolist() == [1, 2, 1]
+    # The repeated file names are dictionary encoded
+    assert isinstance(spectra["filename"].dtype, pd.CategoricalDtype)
+    assert spectra["filename"].tolist() == ["run1.raw", "run1.raw", "run2.raw"]
+
+    # Other readers are read chunk-wise with pandas
+    df = pd.read_csv(pin, sep="\t")
+    reader = DataFrameReader(df)
+    df_spectra, features_to_drop = scan_features_and_spectra(
+        reader, ["f1", "f2"], ["filename", "ScanNr", "Label"]
+    )
+    assert features_to_drop == ["f2"]
+    pd.testing.assert_frame_equal(
+        df_spectra, df.loc[:, ["filename", "ScanNr", "Label"]]
+    )
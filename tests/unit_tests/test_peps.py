@@ -197,6 +197,61 @@ def test_fit_nnls_peps():
     assert np.linalg.norm(k0 - n0 * p, np.inf) < 40
 
 
+def test_monotonize_pava():
+    # Zero weights are interpolated from the fitted neighbours
+    x = np.array([0.0, 5.0, 2.0, 7.0, 3.0])
+    w = np.array([1.0, 0.0, 1.0, 0.0, 1.0])
+    y = peps.monotonize_pava(x, w, ascending=True)
+    testing.assert_allclose(y, [0, 1, 2, 2.5, 3])
+
+    # Many points are fitted exactly and quickly
+    rng = np.random.default_rng(42)
+    N = 200_000
+    n = rng.integers(0, 20, size=N).astype(float)
+    k = rng.random(N) * n * np.linspace(0, 1, N)
+    p = peps.fit_nnls(n, k, ascending=True)
+    assert np.all(np.diff(p) >= 0)
+    assert np.all(p >= 0)
+
+    # Block means: within each block of constant p, the weighted
+    # residuals sum up to zero
+    nz = n > 0
+    residual = k[nz] - n[nz] * p[nz]
+    blocks = np.concatenate([[0], np.flatnonzero(np.diff(p[nz])) + 1])
+    testing.assert_allclose(
+        np.add.reduceat(residual, blocks), 0, atol=1e-6 * N
+    )
+
+
+def test_fit_nnls_empty_bins():
+    # Empty bins are interpolated linearly between their neighbours and
+    # take the value of the nearest non-empty bin at the ends. (The former
+    # NNLS solver ramped leading empty bins down to zero instead, giving
+    # [1/6, 1/3, 1/2, 1] for the first case.)
+    n = np.array([0.0, 0.0, 4.0, 4.0])
+    k = np.array([0.0, 0.0, 2.0, 4.0])
+    p = peps.fit_nnls(n, k, ascending=True)
+    testing.assert_allclose(p, [1 / 2, 1 / 2, 1 / 2, 1])
+
+    # Next to a pooled block
+    n = np.array([4.0, 0.0, 4.0, 4.0])
+    k = np.array([0.0, 0.0, 3.0, 1.0])
+    p = peps.fit_nnls(n, k, ascending=True)
+    testing.assert_allclose(p, [0, 1 / 4, 1 / 2, 1 / 2])
+
+    # Empty histogram bins within the score range
+    hist_data = peps.TDHistData(
+        np.arange(9.0),
+        np.array([30, 0, 25, 20, 0, 0, 10, 5]),
+        np.array([20, 0, 10, 5, 0, 0, 1, 0]),
+    )
+    peps_func = peps.peps_func_from_hist_nnls(hist_data, is_tdc=True)
+    testing.assert_allclose(
+        peps_func(np.arange(8) + 0.5),
+        [2 / 3, 8 / 15, 2 / 5, 1 / 4, 1 / 5, 3 / 20, 1 / 10, 0],
+    )
+
+
 @pytest.mark.parametrize("is_tdc", [True, False])
 def test_peps_qvality(is_tdc):
     scores, targets = get_target_decoy_data()
@@ -206,6 +261,32 @@ def test_peps_qvality(is_tdc):
     assert np.all(np.diff(peps_values) * np.diff(scores) <= 0)
 
 
+@pytest.mark.parametrize("is_tdc", [True, False])
+def test_peps_qvality_sampled(is_tdc):
+    scores, targets = get_target_decoy_data()
+    exact = peps.peps_from_scores_qvality(scores, targets, is_tdc)
+
+    # Small datasets are not sampled
+    peps_values = peps.peps_from_scores_qvality_sampled(
+        scores, targets, is_tdc, sample_size=len(scores)
+    )
+    np.testing.assert_allclose(peps_values, exact)
+
+    peps_values = peps.peps_from_scores_qvality_sampled(
+        scores, targets, is_tdc, sample_size=2500
+    )
+    assert np.all(np.diff(peps_values) * np.diff(scores) <= 0)
+    assert np.abs(peps_values - exact).max() < 0.05
+
+    hist_data = peps.TDHistData.from_scores_targets(
+        np.linspace(scores.min(), scores.max(), 501), scores, targets
+    )
+    peps_func = peps.peps_func_from_hist_qvality(
+        hist_data, is_tdc, sample_size=2500
+    )
+    assert np.abs(peps_func(scores) - exact).max() < 0.05
+
+
 @pytest.mark.parametrize("is_tdc", [True, False])
 def test_peps_kde_nnls(is_tdc):
     np.random.seed(
@@ -226,6 +307,29 @@ def test_peps_kde_nnls(is_tdc):
     assert np.all(peps_values <= 1)
     assert np.all(np.diff(peps_values) * np.diff(scores) <= 0)
 
+    # Streaming from a histogram gives about the same peps
+    hist_data = peps.TDHistData.from_scores_targets(
+        np.linspace(scores.min(), scores.max(), 201), scores, targets
+    )
+    peps_func = peps.peps_func_from_hist_kde_nnls(hist_data, is_tdc)
+    assert np.abs(peps_func(scores) - peps_values).max() < 0.02
+
+
+def test_binned_kde():
+    np.random.seed(42)
+    scores, targets = get_target_decoy_data()
+    eval_scores, target_pdf, decoy_pdf = peps.pdfs_from_scores(scores, targets)
+    for pdf, selection in [(target_pdf, targets), (decoy_pdf, ~targets)]:
+        exact = stats.gaussian_kde(scores[selection]).pdf(eval_scores)
+        np.testing.assert_allclose(pdf, exact, atol=1e-3 * exact.max())
+
+    # Linear binning keeps the counts and the mean
+    grid = np.linspace(-1, 2, 7)
+    x = np.array([-2.0, 0.1, 0.3, 0.75, 1.9, 3.0])
+    counts = peps.linear_binning(x, grid)
+    assert counts.sum() == approx(len(x))
+    assert np.sum(counts * grid) == approx(np.sum(np.clip(x, -1, 2)))
+
 
 @pytest.mark.parametrize(
     "seed",
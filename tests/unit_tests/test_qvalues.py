@@ -8,10 +8,14 @@ from scipy import stats
 
 from mokapot.peps import TDHistData, hist_data_from_scores
 from mokapot.qvalues import (
+    StreamingTdc,
     qvalues_from_counts,
     qvalues_from_peps,
     qvalues_func_from_hist,
     tdc,
+    tdc_batch,
+    tdc_count_passing,
+    tdc_threshold,
 )
 
 
@@ -116,6 +120,57 @@ def test_tdc_diff_len():
         tdc(scores, targets)
 
 
+@pytest.mark.parametrize("desc", [True, False])
+def test_tdc_batch(desc_scores, desc):
+    """Test that batched q-values and counts match `tdc` for each column"""
+    scores, target, _ = desc_scores
+    rng = np.random.default_rng(3)
+    target = np.tile(target.astype(bool), 20)
+    scores = np.column_stack([
+        np.tile(scores, 20),
+        rng.integers(0, 4, len(target)),
+        rng.normal(size=len(target)) + target,
+        np.ones(len(target)),
+    ])
+
+    qvals = tdc_batch(scores, target, desc=desc)
+    counts = tdc_count_passing(scores, target, eval_fdr=0.3, desc=desc)
+    assert qvals.shape == scores.shape
+    for col in range(scores.shape[1]):
+        expected = tdc(scores[:, col], target, desc=desc)
+        np.testing.assert_array_equal(qvals[:, col], expected)
+        assert counts[col] == (target & (expected <= 0.3)).sum()
+
+
+@pytest.mark.parametrize("desc", [True, False])
+@pytest.mark.parametrize("eval_fdr", [0.05, 0.3, 1.0])
+def test_tdc_threshold(desc, eval_fdr):
+    """Test that the threshold accepts exactly the targets of `tdc`"""
+    rng = np.random.default_rng(7)
+    target = rng.random(2000) < 0.6
+    sign = 1 if desc else -1
+    scores_list = [
+        sign * (rng.normal(size=2000) + 2 * target),
+        sign * rng.integers(0, 5, 2000),
+        sign * (rng.normal(size=2000) + target).round(1),
+    ]
+    for scores in scores_list:
+        qvals = tdc(scores, target, desc=desc)
+        expected = target & (qvals <= eval_fdr)
+        for num_bins in (1, 16, 4096):
+            threshold = tdc_threshold(
+                scores, target, eval_fdr, desc=desc, num_bins=num_bins
+            )
+            if threshold is None:
+                assert not expected.any()
+                continue
+            keys = scores.astype(np.float32)
+            accepted = keys >= threshold if desc else keys <= threshold
+            np.testing.assert_array_equal(target & accepted, expected)
+
+    assert tdc_threshold(np.ones(3), np.zeros(3, dtype=bool), 0.1) is None
+
+
 @pytest.fixture
 def rand_scores():
     np.random.seed(1240)  # this produced an error with failing iterations
@@ -193,3 +248,40 @@ def test_compare_rand_qvalues_from_hist_vs_count(rand_scores):
     qvals_counts = qvalues_from_counts(scores, targets, is_tdc=True)
 
     np.testing.assert_allclose(qvals_hist, qvals_counts, atol=0.02)
+
+
+@pytest.mark.parametrize("desc", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_streaming_tdc(desc_scores, desc, chunk_size):
+    """Test that the streamed q-values match `tdc`, also for ties"""
+    scores, target, _ = desc_scores
+    rng = np.random.default_rng(5)
+    target = np.tile(target.astype(bool), 5)
+    scores = np.round(np.tile(scores, 5) + rng.normal(size=len(target)), 1)
+    order = np.argsort(-scores if desc else scores, kind="stable")
+    scores, target = scores[order], target[order]
+
+    def chunks():
+        for start in range(0, len(scores), chunk_size):
+            end = start + chunk_size
+            yield scores[start:end], target[start:end]
+
+    streaming_tdc = StreamingTdc(desc=desc)
+    for _ in streaming_tdc.update_from_iterator(chunks()):
+        pass
+    streaming_tdc.finalize()
+    qvals = np.concatenate([
+        streaming_tdc.qvalues(chunk_scores) for chunk_scores, _ in chunks()
+    ])
+
+    expected = tdc(scores, target, desc=desc)
+    np.testing.assert_array_equal(qvals, expected)
+    assert qvals.dtype == expected.dtype
+    assert (
+        streaming_tdc.num_passing_targets(0.1)
+        == (target & (expected <= 0.1)).sum()
+    )
+
+    # Unsorted scores are rejected
+    with pytest.raises(ValueError, match="sorted"):
+        StreamingTdc(desc=desc).add(scores[::-1], target[::-1])
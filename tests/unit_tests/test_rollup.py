@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from mokapot.rollup import find_new_rows
+from mokapot.utils import SeenHashes
+
+
+def test_find_new_rows():
+    """Test that the first row of every entity is found across chunks"""
+    data = pd.DataFrame({
+        "mokapot_score": [3.0, 3.0, 2.0, 2.0, 1.0, 0.5],
+        "peptide": ["B", "C", "A", "A", "A", "C"],
+        "precursor": ["B1", "C1", "A2", "A2", "A1", "C1"],
+    })
+    levels = ["peptide", "precursor"]
+    seen_entities = {level: SeenHashes(exact=True) for level in levels}
+
+    new_rows = find_new_rows(data.iloc[:3], levels, seen_entities)
+    np.testing.assert_array_equal(new_rows["peptide"], [0, 1, 2])
+    np.testing.assert_array_equal(new_rows["precursor"], [0, 1, 2])
+
+    new_rows = find_new_rows(data.iloc[3:], levels, seen_entities)
+    np.testing.assert_array_equal(new_rows["peptide"], [])
+    np.testing.assert_array_equal(new_rows["precursor"], [1])
+    assert len(seen_entities["peptide"]) == 3
+    assert len(seen_entities["precursor"]) == 4
+
+
+def test_find_new_rows_matches_first_seen():
+    """Test that the chunked result equals keeping the first row of each
+    entity"""
+    rng = np.random.default_rng(42)
+    num_rows = 10000
+    data = pd.DataFrame({
+        "mokapot_score": rng.integers(0, 100, num_rows).astype(float),
+        "peptide": rng.integers(0, 500, num_rows).astype(str),
+    })
+    data = data.sort_values(
+        "mokapot_score", ascending=False, kind="stable"
+    ).reset_index(drop=True)
+
+    seen_entities = {"peptide": SeenHashes(exact=True)}
+    found = []
+    for start in range(0, num_rows, 777):
+        chunk = data.iloc[start : start + 777]
+        new_rows = find_new_rows(chunk, ["peptide"], seen_entities)
+        found.append(start + new_rows["peptide"])
+
+    expected = data.drop_duplicates("peptide").index.to_numpy()
+    np.testing.assert_array_equal(np.concatenate(found), expected)
+
+
+def test_find_new_rows_hash_collisions():
+    """Test that distinct entities with the same hash are all kept"""
+    seen = SeenHashes(exact=True)
+    hashes = np.zeros(4, dtype=np.uint64)
+    new_rows = seen.add_new(hashes, keys=np.array(["A", "B", "A", "C"]))
+    np.testing.assert_array_equal(new_rows, [0, 1, 3])
+
+    new_rows = seen.add_new(hashes, keys=np.array(["C", "D", "B", "D"]))
+    np.testing.assert_array_equal(new_rows, [1])
+    assert len(seen) == 4
+
+    # Without the keys, the colliding entities are merged
+    seen = SeenHashes()
+    new_rows = seen.add_new(hashes)
+    np.testing.assert_array_equal(new_rows, [0])
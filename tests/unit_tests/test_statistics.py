@@ -5,7 +5,14 @@ import pytest
 import scipy as sp
 from pytest import approx
 
-from mokapot.statistics import HistData, OnlineStatistics
+from mokapot.peps import TDHistData
+from mokapot.qvalues import tdc
+from mokapot.statistics import (
+    HistData,
+    OnlineStatistics,
+    QuantileSketch,
+    TDQuantileSketch,
+)
 
 
 def test_init():
@@ -86,6 +93,134 @@ def test_max_likelihood_variance():
     assert stats.sd == approx(np.std(vals, ddof=0))
 
 
+def test_merge(tmp_path):
+    rng = np.random.default_rng(7)
+    parts = [100 * rng.random(n) + n for n in [10, 1, 200, 37]]
+    vals = np.concatenate(parts)
+
+    shards = []
+    for part in parts:
+        stats = OnlineStatistics()
+        stats.update(part)
+        shards.append(stats)
+    merged = OnlineStatistics.combine(
+        OnlineStatistics.combine(shards[0], shards[1]),
+        OnlineStatistics.combine(shards[2], shards[3], OnlineStatistics()),
+    )
+
+    assert merged.min == vals.min()
+    assert merged.max == vals.max()
+    assert merged.n == len(vals)
+    assert merged.mean == approx(np.mean(vals))
+    assert merged.var == approx(np.var(vals, ddof=1), rel=1e-12)
+
+    merged.save(tmp_path / "stats.json")
+    assert OnlineStatistics.load(tmp_path / "stats.json") == merged
+    assert OnlineStatistics.load(tmp_path / "stats.json").ddof == 1
+
+
+def test_merge_hist_data(tmp_path):
+    rng = np.random.default_rng(7)
+    bin_edges = np.linspace(-3, 3, 21)
+    scores = rng.normal(size=1000)
+    targets = rng.random(1000) < 0.6
+    hist = TDHistData.from_scores_targets(bin_edges, scores, targets)
+
+    shards = [
+        TDHistData.from_scores_targets(bin_edges, scores[idx], targets[idx])
+        for idx in np.array_split(np.arange(1000), 3)
+    ]
+    merged = TDHistData.combine(*shards)
+    np.testing.assert_array_equal(merged.targets.counts, hist.targets.counts)
+    np.testing.assert_array_equal(merged.decoys.counts, hist.decoys.counts)
+    # The shards are not changed
+    assert shards[0].targets.counts.sum() < hist.targets.counts.sum()
+
+    merged.save(tmp_path / "hist.npz")
+    loaded = TDHistData.load(tmp_path / "hist.npz")
+    np.testing.assert_array_equal(loaded.targets.bin_edges, bin_edges)
+    np.testing.assert_array_equal(loaded.decoys.counts, hist.decoys.counts)
+
+    other = TDHistData.from_scores_targets(bin_edges[1:], scores, targets)
+    with pytest.raises(ValueError, match="bin edges"):
+        merged.merge(other)
+
+
+def test_quantile_sketch():
+    rng = np.random.default_rng(42)
+    x = rng.normal(size=200_000)
+
+    sketch = QuantileSketch(k=256)
+    for chunk in np.array_split(x, 17):
+        sketch.update(chunk)
+    assert sketch.n == len(x)
+    assert sketch.weighted_values()[1].sum() == len(x)
+    assert sum(map(len, sketch.levels)) < 256 * len(sketch.levels)
+
+    probs = np.linspace(0, 1, 21)
+    quantiles = sketch.quantiles(probs)
+    assert quantiles[0] == x.min()
+    assert quantiles[-1] == x.max()
+    np.testing.assert_allclose(
+        sketch.cdf(quantiles[1:-1]), probs[1:-1], atol=0.01
+    )
+
+    # The sketch does not depend on the chunking of the values
+    other = QuantileSketch(k=256)
+    other.update(x)
+    np.testing.assert_array_equal(other.quantiles(probs), quantiles)
+
+    # Merged sketches approximate the union of the values
+    merged = QuantileSketch(k=256)
+    merged.update(x[:50_000])
+    rest = QuantileSketch(k=256)
+    rest.update(x[50_000:])
+    merged.merge(rest)
+    assert merged.n == len(x)
+    np.testing.assert_allclose(
+        merged.cdf(quantiles[1:-1]), probs[1:-1], atol=0.01
+    )
+
+    with pytest.raises(ValueError):
+        QuantileSketch(k=3)
+
+
+def test_td_quantile_sketch_bin_edges():
+    rng = np.random.default_rng(42)
+    scores = np.concatenate([
+        rng.normal(3, 1, 50_000),
+        rng.normal(0, 1, 50_000),
+    ])
+    targets = np.arange(len(scores)) < 50_000
+    # A few extreme scores must not make the bins coarse
+    scores[[0, -1]] = [1000.0, -1000.0]
+
+    sketch = TDQuantileSketch(k=512)
+    sketch.update(scores, targets)
+    edges = sketch.get_bin_edges(eval_fdr=0.01)
+    assert np.all(np.diff(edges) > 0)
+    assert edges[0] == scores.min()
+    assert edges[-1] == scores.max()
+    assert len(edges) <= 500 + 2 * 5 + 1
+
+    stats = OnlineStatistics()
+    stats.update(scores)
+    equal_edges = HistData.get_bin_edges(stats, clip=(50, 500))
+    in_bulk = np.abs(edges - 1.5) < 3
+    assert in_bulk.sum() > 10 * (np.abs(equal_edges - 1.5) < 3).sum()
+
+    # The bins around the FDR threshold have equal widths
+    qvals = tdc(scores, targets, desc=True)
+    threshold = scores[targets & (qvals <= 0.01)].min()
+    widths = np.diff(edges[np.abs(edges - threshold) < 1])
+    np.testing.assert_allclose(widths, widths[0])
+
+    # Without any scores, there is a single bin
+    np.testing.assert_array_equal(
+        TDQuantileSketch().get_bin_edges(), [-0.5, 0.5]
+    )
+
+
 def test_hist_data():
     N = 1000
     x = np.concatenate([np.random.normal(size=N), np.random.normal(2, size=N)])
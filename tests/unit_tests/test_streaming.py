@@ -162,3 +162,39 @@ def test_joined_tabular_data_reader(readers_to_join):
     pd.testing.assert_frame_equal(
         joined_reader.read(["quux", "foo"]), df[["quux", "foo"]]
     )
+
+
+def test_merged_reader_tie_breaking():
+    # Ties are resolved by reader order first and by the position within a
+    # reader second, no matter how the readers are chunked
+    df1 = pd.DataFrame({"score": [5.0, 5.0, 3.0, 1.0], "src": [1, 1, 1, 1]})
+    df2 = pd.DataFrame({"score": [], "src": []})
+    df3 = pd.DataFrame({"score": [6.0, 5.0, 3.0, 3.0], "src": [3, 3, 3, 3]})
+    df1["pos"] = range(len(df1))
+    df2["pos"] = range(len(df2))
+    df3["pos"] = range(len(df3))
+    df2 = df2.astype(df1.dtypes)
+    readers = [DataFrameReader(df) for df in (df1, df2, df3)]
+
+    expected = pd.DataFrame({
+        "score": [6.0, 5.0, 5.0, 5.0, 3.0, 3.0, 3.0, 1.0],
+        "src": [3, 1, 1, 3, 1, 3, 3, 1],
+        "pos": [0, 0, 1, 1, 2, 2, 3, 3],
+    })
+    for reader_chunk_size in [1, 2, 3, 10]:
+        reader = MergedTabularDataReader(
+            readers, "score", reader_chunk_size=reader_chunk_size
+        )
+        pd.testing.assert_frame_equal(reader.read(), expected)
+
+        chunks = list(reader.get_chunked_data_iterator(chunk_size=3))
+        assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks, ignore_index=True), expected
+        )
+
+    # The priority column does not need to be part of the requested columns
+    reader = MergedTabularDataReader(readers, "score", reader_chunk_size=2)
+    pd.testing.assert_frame_equal(
+        reader.read(columns=["src", "pos"]), expected[["src", "pos"]]
+    )
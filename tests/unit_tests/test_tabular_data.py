@@ -6,12 +6,15 @@ import pytest
 from numpy import dtype
 
 from mokapot.tabular_data import (
+    ArrowIpcFileReader,
+    ArrowIpcFileWriter,
     ColumnMappedReader,
     CSVFileReader,
     CSVFileWriter,
     DataFrameReader,
     ParquetFileReader,
     TabularDataReader,
+    TraditionalPinReader,
     auto_finalize,
 )
 
@@ -23,6 +26,9 @@ def test_from_path(tmp_path):
     reader = TabularDataReader.from_path(Path(tmp_path, "test.parquet"))
     assert isinstance(reader, ParquetFileReader)
 
+    reader = TabularDataReader.from_path(Path(tmp_path, "test.arrow"))
+    assert isinstance(reader, ArrowIpcFileReader)
+
     with pytest.warns(UserWarning):
         reader = TabularDataReader.from_path(Path(tmp_path, "test.blah"))
     assert isinstance(reader, CSVFileReader)
@@ -141,6 +147,67 @@ def test_parquet_file_reader():
     assert all(df_from_chunks.index == range(len(df_from_chunks)))
 
 
+def test_arrow_ipc_roundtrip(tmp_path):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "score": rng.normal(size=1000),
+        "target": rng.integers(0, 2, 1000).astype(bool),
+        "peptide": [f"PEP{i}" for i in range(1000)],
+        "pos": np.arange(1000),
+    })
+    path = tmp_path / "test.arrow"
+    writer = ArrowIpcFileWriter(
+        path,
+        columns=df.columns.tolist(),
+        column_types=df.dtypes.tolist(),
+    )
+    with writer:
+        writer.append_data(df.iloc[:600])
+        writer.append_data(df.iloc[600:])
+
+    reader = TabularDataReader.from_path(path)
+    assert isinstance(reader, ArrowIpcFileReader)
+    assert reader.get_column_names() == df.columns.tolist()
+    assert reader.get_column_types() == df.dtypes.tolist()
+    pd.testing.assert_frame_equal(reader.read(), df)
+
+    chunks = list(reader.get_chunked_data_iterator(chunk_size=256))
+    assert [len(chunk) for chunk in chunks] == [256, 256, 88, 256, 144]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+    chunks = reader.get_chunked_data_iterator(256, columns=["pos"])
+    assert next(chunks).columns.tolist() == ["pos"]
+
+
+def test_traditional_pin_reader(tmp_path):
+    lines = ["SpecId\tLabel\tScanNr\tfeat\tPeptide\tProteins"]
+    lines.append("DefaultDirection\t-\t-\t1\t-\t-")
+    for i in range(100):
+        proteins = "\t".join(f"prot{j}" for j in range(i % 3 + 1))
+        lines.append(f"psm{i}\t{i % 2}\t{i}\t{i / 2}\tPEP{i}\t{proteins}")
+    path = tmp_path / "test.pin"
+    path.write_text("\n".join(lines) + "\n")
+
+    reader = TabularDataReader.from_path(path)
+    assert isinstance(reader, TraditionalPinReader)
+    assert reader.get_column_names()[-1] == "Proteins"
+    df = reader.read()
+    assert len(df) == 100
+    assert df["Proteins"].iloc[:3].tolist() == [
+        "prot0",
+        "prot0:prot1",
+        "prot0:prot1:prot2",
+    ]
+    assert df["feat"].dtype == np.float64
+
+    chunks = list(reader.get_chunked_data_iterator(chunk_size=30))
+    assert [len(chunk) for chunk in chunks] == [30, 30, 30, 10]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+    reader = TraditionalPinReader(path, max_workers=2)
+    chunks = reader.get_chunked_data_iterator(30, columns=["Proteins", "feat"])
+    pd.testing.assert_frame_equal(pd.concat(chunks), df[["Proteins", "feat"]])
+
+
 def test_dataframe_reader(psm_df_6):
     reader = DataFrameReader(psm_df_6)
     names = reader.get_column_names()